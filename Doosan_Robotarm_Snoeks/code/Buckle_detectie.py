@@ -3,14 +3,23 @@ import numpy as np
 import json
 import os
 import time
+import queue
+from vision_channel import VisionPublisher
+from camera import WebcamCamera, ThreadedCamera
 
 # ================= CONFIG =================
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "..", "data")
 PIXEL_JSON = os.path.join(DATA_DIR, "buckle_positions_pixels.json")
+# alleen nog ter controle; de backend krijgt detecties via vision_channel
 OUTPUT_JSON = os.path.join(DATA_DIR, "latest_buckle_detection.json")
 
+# Langlopende service: de GUI start hem één keer, de camera blijft open.
+# "detect" verwerkt direct een vers frame; na "start" ook elke INTERVAL_SEC,
+# tot "pause". De camera leest in een eigen thread door, ook gepauzeerd.
 INTERVAL_SEC = 2.0
+WARMUP_SEC = 1.0
+FRAME_TIMEOUT_SEC = 1.0
 CALIBRATION_MODE = False  # <-- zet op True om opnieuw te calibreren
 
 ROWS = 2
@@ -52,12 +61,8 @@ def load_json(path):
 
 
 # ---------------- Webcam ----------------
-cap = cv2.VideoCapture(CAMERA_INDEX, cv2.CAP_DSHOW)
-cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAMERA_WIDTH)
-cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAMERA_HEIGHT)
-
-if not cap.isOpened():
-    raise RuntimeError("Webcam kon niet worden geopend")
+# achtergrondthread houdt alleen het nieuwste frame vast
+cam = ThreadedCamera(WebcamCamera(CAMERA_INDEX, CAMERA_WIDTH, CAMERA_HEIGHT)).start()
 
 
 # ---------------- Detectie ----------------
@@ -90,9 +95,10 @@ def run_calibration():
 
     samples = []
 
+    frame_time = 0.0
     for _ in range(15):
-        ret, frame = cap.read()
-        if not ret:
+        frame, frame_time = cam.wait_frame(after=frame_time, timeout=FRAME_TIMEOUT_SEC)
+        if frame is None:
             continue
         samples.extend(detect_buckles(frame))
         time.sleep(0.1)
@@ -133,65 +139,119 @@ def approach_mm(n):
     return x, y + MM_APPROACH_DY
 
 
+# ---------------- Slot matching ----------------
+def load_slots(slots):
+    # eenmalig: pixels als (S, 2)-array en de bijbehorende nummers
+    pixels = np.array([b["pixel"] for b in slots], dtype=np.float32).reshape(-1, 2)
+    numbers = np.array([b["n"] for b in slots], dtype=np.int32)
+    return pixels, numbers
+
+
+def match_slots(centers):
+    # bezetting van alle slots tegelijk: afstandsmatrix (S, C) tegen de tolerantie
+    if len(centers) == 0:
+        return np.zeros(len(slot_numbers), dtype=bool)
+    c = np.asarray(centers, dtype=np.float32).reshape(-1, 2)
+    d2 = ((slot_pixels[:, None, :] - c[None, :, :]) ** 2).sum(axis=2)
+    return (d2 < MATCH_TOLERANCE_PX ** 2).any(axis=1)
+
+
+def build_result(frame, frame_time):
+    occupied = match_slots(detect_buckles(frame))
+
+    result = {
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "frame_time": frame_time,
+        "buckle_found": False,
+        "buckle_number": None,
+        "start_position": None,
+        "grip_position": None
+    }
+
+    if occupied.any():
+        n = int(slot_numbers[occupied].min())
+
+        ax, ay = approach_mm(n)
+        sx, sy = buckle_mm(n)
+
+        result.update({
+            "buckle_found": True,
+            "buckle_number": n,
+            "start_position": {
+                "x": ax, "y": ay, "z": Z_CONST,
+                "rx": RX_CONST, "ry": RY_CONST, "rz": RZ_CONST
+            },
+            "grip_position": {
+                "x": sx, "y": sy, "z": Z_CONST,
+                "rx": RX_CONST, "ry": RY_CONST, "rz": RZ_CONST
+            }
+        })
+    return result
+
+
+def grab_fresh_frame(requested_at):
+    # eerste frame dat na de vraag is opgenomen, nooit een ouder frame
+    frame, frame_time = cam.wait_frame(after=requested_at, timeout=FRAME_TIMEOUT_SEC)
+    return frame is not None, frame, frame_time or time.time()
+
+
 # ================= START =================
 if CALIBRATION_MODE:
     run_calibration()
 
 pixels_buffer = load_json(PIXEL_JSON)
+slot_pixels, slot_numbers = load_slots(pixels_buffer)
 
-print("Vision service gestart – JSON update elke 2 seconden")
+# belichting laten stabiliseren voordat er iemand om een detectie vraagt
+time.sleep(WARMUP_SEC)
+
+publisher = VisionPublisher().start()
+print(f"Vision service gestart op poort {publisher.port} (gepauzeerd)")
 
 try:
+    streaming = False
+    next_tick = time.time()
     while True:
-        t0 = time.time()
+        # gepauzeerd met een korte timeout, zodat Ctrl+C blijft werken
+        wait_s = max(0.0, next_tick - time.time()) if streaming else 0.5
+        try:
+            cmd, arg = publisher.requests.get(timeout=wait_s)
+        except queue.Empty:
+            cmd, arg = None, None
+        requested_at = time.time()
+
+        if cmd == "quit":
+            break
+        if cmd == "start":
+            streaming = True
+            next_tick = time.time()
+            continue
+        if cmd == "pause":
+            streaming = False
+            continue
+        if cmd is None and not streaming:
+            continue
+        if cmd is None:
+            next_tick = time.time() + INTERVAL_SEC
 
-        ret, frame = cap.read()
+        request_id = arg if cmd == "detect" else None
+        ret, frame, frame_time = grab_fresh_frame(requested_at)
         if not ret:
-            time.sleep(INTERVAL_SEC)
+            if request_id is not None:
+                publisher.publish({"frame_time": frame_time, "buckle_found": False, "request_id": request_id,
+                                   "error": "geen frame"})
             continue
 
-        centers = detect_buckles(frame)
-
-        found = []
-        for b in pixels_buffer:
-            for c in centers:
-                if np.linalg.norm(np.array(b["pixel"]) - np.array(c)) < MATCH_TOLERANCE_PX:
-                    found.append(b)
-                    break
-
-        result = {
-            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-            "buckle_found": False,
-            "buckle_number": None,
-            "start_position": None,
-            "grip_position": None
-        }
-
-        if found:
-            b = min(found, key=lambda x: x["n"])
-            n = b["n"]
-
-            ax, ay = approach_mm(n)
-            sx, sy = buckle_mm(n)
-
-            result.update({
-                "buckle_found": True,
-                "buckle_number": n,
-                "start_position": {
-                    "x": ax, "y": ay, "z": Z_CONST,
-                    "rx": RX_CONST, "ry": RY_CONST, "rz": RZ_CONST
-                },
-                "grip_position": {
-                    "x": sx, "y": sy, "z": Z_CONST,
-                    "rx": RX_CONST, "ry": RY_CONST, "rz": RZ_CONST
-                }
-            })
-
+        result = build_result(frame, frame_time)
+        if request_id is not None:
+            result["request_id"] = request_id
+        publisher.publish(result)
         atomic_write_json(OUTPUT_JSON, result)
-        time.sleep(max(0.0, INTERVAL_SEC - (time.time() - t0)))
 
 except KeyboardInterrupt:
-    print("Vision service gestopt")
+    pass
 
 finally:
-    cap.release()
+    print("Vision service gestopt")
+    publisher.close()
+    cam.stop()
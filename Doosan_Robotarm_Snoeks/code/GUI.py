@@ -11,6 +11,7 @@ from tkinter import messagebox, simpledialog
 from calibrate_buckles import calibrate_pixels
 from database import validate_workorder_exists
 from backend import load_config,DoosanGatewayClient,ROBOT_IP,PORT,is_robot_enabled
+from vision_channel import VisionService
 
 cfg = load_config()
 Snoeks_Red = cfg.get("Snoeks_Red") or cfg.get("SNOEKS_RED", "#c90000")
@@ -72,7 +73,11 @@ class RobotGUI:
             print(f"Couldn't load window icon: {e}")
             self.logo_image = None
 
+        # vision-proces één keer starten; camera blijft warm tot afsluiten
+        self.vision_service = VisionService().start()
+
         self.gateway = DoosanGatewayClient()
+        self.gateway.vision_service = self.vision_service
         self.program = RobotProgram(self.gateway)
 
         self.sequence_thread = None
@@ -551,6 +556,7 @@ class RobotGUI:
             pass
 
         self.gateway = DoosanGatewayClient()
+        self.gateway.vision_service = self.vision_service
         self.program = RobotProgram(self.gateway)
         self.append_status("Ready. Reconnect with the robot.")
 
@@ -602,23 +608,18 @@ class RobotGUI:
 
     def _update_status_from_robot(self):
         try:
-            try:
-                force_value = self.gateway.get_tool_force(0)
-                self.forcevar.set(f"Force: {force_value:.2f} N")
-            except Exception:
-                pass
+            if self.gateway.sock is not None:
+                # force, TCP en alle DI's in één round trip
+                status = self.gateway.get_status()
+                self.forcevar.set(f"Force: {status.force:.2f} N")
 
-            try:
-                tcp_pose = self.gateway.get_tcppose()
-                x, y, z, rx, ry, rz = tcp_pose
+                x, y, z, rx, ry, rz = status.tcp_pose
                 self.tcpposevar.set(
                     f"TCP: x={x:.1f} y={y:.1f} z={z:.1f} "
                     f"rx={rx:.1f} ry={ry:.1f} rz={rz:.1f}"
                 )
-            except Exception:
-                pass
 
-            self._refresh_di()
+                self._refresh_di(status.di_mask)
 
         except Exception as e:
             if self._is_connection_lost_error(e):
@@ -735,6 +736,7 @@ class RobotGUI:
                 self._set_disconnected_state(str(e))
 
     def on_exit(self):
+        self.vision_service.stop()
         self.root.destroy()
 
     def on_home(self):
@@ -761,10 +763,14 @@ class RobotGUI:
         try:
             basedir = os.path.dirname(os.path.abspath(__file__))
             script = os.path.join(basedir, "calibrate_buckles.py")
+            # de calibratie heeft dezelfde camera nodig
+            self.vision_service.stop()
             subprocess.run([sys.executable, script], check=True)
             self.append_status("Buckle-calibration done.")
         except Exception as e:
             messagebox.showerror("Calibration error", "camera not connected, try reconnecting the USB.")
+        finally:
+            self.vision_service.start()
 
     def _on_do_toggled(self, index: int, var: ctk.IntVar):
         value = int(var.get())
@@ -785,8 +791,8 @@ class RobotGUI:
             self.append_status("Can't reset DO, robot not connected.")
             return
         try:
-            for i, var in enumerate(self.do_vars, start=1):
-                self.gateway.set_digital_output(i, 0)
+            self.gateway.set_digital_outputs({i: 0 for i in range(1, self.num_do + 1)})
+            for var in self.do_vars:
                 var.set(0)
             self.append_status("All DO turned off.")
         except Exception as e:
@@ -806,19 +812,14 @@ class RobotGUI:
             if self._is_connection_lost_error(e):
                 self._set_disconnected_state(str(e))
 
-    def _refresh_di(self):
-        if self.gateway.sock is None:
-            return
+    def _refresh_di(self, di_mask: int):
         try:
             for i in range(1, self.num_di + 1):
-                try:
-                    val = self.gateway.get_digital_input(i)
-                    self.di_labels[i - 1].configure(
-                        text=f"{i}: {val}",
-                        fg_color=("#333333" if val else Snoeks_Dark),
-                    )
-                except Exception:
-                    self.di_labels[i - 1].configure(text=f"{i}: ?")
+                val = (di_mask >> (i - 1)) & 1
+                self.di_labels[i - 1].configure(
+                    text=f"{i}: {val}",
+                    fg_color=("#333333" if val else Snoeks_Dark),
+                )
         except Exception as e:
             self.append_status(f"Fout bij DI refresh: {e}")
 
@@ -0,0 +1,323 @@
+import time
+import asyncio
+from collections import deque
+from backend import ROBOT_IP, PORT, TELEMETRY_PORT, RobotStatus, DoosanGatewayClient
+
+
+class _AsyncChannel:
+    """Eén verbinding met de receiver: regels erin, antwoorden in volgorde terug.
+
+    Het protocol heeft geen request-id's: de receiver beantwoordt commando's
+    strikt in volgorde. Elke verzonden regel krijgt daarom een Future in een
+    FIFO; een reader-task koppelt elk binnenkomend antwoord aan de oudste
+    Future. Verloopt een timeout of wordt de aanroeper gecanceld, dan blijft
+    de Future in de rij staan en wordt het late antwoord weggegooid, zodat de
+    koppeling van de volgende antwoorden klopt.
+    """
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._reader_task: asyncio.Task | None = None
+        self._pending: deque[asyncio.Future] = deque()
+        self._send_lock = asyncio.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None
+
+    async def open(self, ip: str, port: int) -> None:
+        if self._writer:
+            return
+        self._reader, self._writer = await asyncio.open_connection(ip, port)
+        self._reader_task = asyncio.create_task(self._read_loop())
+
+    async def close(self) -> None:
+        if self._writer:
+            try:
+                await self.send("quit\n", expect_response=False)
+            except (OSError, RuntimeError):
+                pass
+        self._invalidate(ConnectionError("Robot connection closed"))
+        if self._reader_task:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._reader_task = None
+
+    def _invalidate(self, err: Exception) -> None:
+        # verbinding ongeldig: writer sluiten en alle wachtenden laten falen
+        if self._writer:
+            try:
+                self._writer.close()
+            except OSError:
+                pass
+        self._writer = None
+        self._reader = None
+        while self._pending:
+            fut = self._pending.popleft()
+            if not fut.done():
+                fut.set_exception(err)
+
+    async def _read_loop(self) -> None:
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line or not line.endswith(b"\n"):
+                    raise ConnectionError("Robot connection closed")
+                if not self._pending:
+                    continue  # antwoord zonder openstaand commando
+                fut = self._pending.popleft()
+                if not fut.done():
+                    fut.set_result(line.decode("ascii", errors="ignore").strip())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._invalidate(e)
+
+    async def send(
+        self,
+        msg: str,
+        expect_response: bool = True,
+        timeout: float | None = None,
+    ) -> str | None:
+        if not msg.endswith("\n"):
+            msg += "\n"
+        if not self._writer:
+            raise RuntimeError("Not connected to robot")
+
+        # schrijven en in de rij zetten onder één lock, zodat de volgorde klopt
+        async with self._send_lock:
+            fut = None
+            if expect_response:
+                fut = asyncio.get_running_loop().create_future()
+                self._pending.append(fut)
+            try:
+                self._writer.write(msg.encode("ascii"))
+                await self._writer.drain()
+            except Exception as e:
+                self._invalidate(e)
+                raise
+
+        if fut is None:
+            return None
+        return await asyncio.wait_for(fut, self.timeout if timeout is None else timeout)
+
+
+class AsyncDoosanGatewayClient:
+    """asyncio-variant van DoosanGatewayClient met dezelfde high-level API.
+
+    Net als de sync-client twee verbindingen: commando's op de commando-poort,
+    uitleesvragen via query() op de telemetriepoort. Een get_status() wacht
+    dus niet achter een wait_motion-slice van een andere coroutine. Zonder
+    telemetriepoort (oudere receiver) gaat alles via de commando-poort.
+    """
+
+    def __init__(
+        self,
+        ip: str | None = None,
+        port: int | None = None,
+        telemetry_port: int | None = None,
+        timeout: float = 10.0,
+    ):
+        if port is None:
+            port = PORT
+        if ip is None:
+            ip = ROBOT_IP
+        if telemetry_port is None:
+            telemetry_port = TELEMETRY_PORT
+
+        self.ip: str = ip
+        self.port: int = port
+        self.telemetry_port: int = telemetry_port
+        self.timeout = timeout
+
+        self._cmd = _AsyncChannel(timeout)
+        self._telemetry = _AsyncChannel(timeout)
+
+    # ---------------- Basis socket-API ---------------- #
+
+    @property
+    def connected(self) -> bool:
+        return self._cmd.connected
+
+    async def connect(self) -> None:
+        await self._cmd.open(self.ip, self.port)
+        try:
+            await self._telemetry.open(self.ip, self.telemetry_port)
+        except OSError as e:
+            print(f"Telemetriekanaal niet beschikbaar ({e}), uitlezen via commando-socket.")
+
+    async def close(self) -> None:
+        await self._telemetry.close()
+        await self._cmd.close()
+
+    async def __aenter__(self) -> "AsyncDoosanGatewayClient":
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+        return False
+
+    async def send_raw(
+        self,
+        msg: str,
+        expect_response: bool = True,
+        timeout: float | None = None,
+    ) -> str | None:
+        return await self._cmd.send(msg, expect_response, timeout)
+
+    async def query(self, msg: str, timeout: float | None = None) -> str:
+        # alleen-lezen vraag via het telemetriekanaal, anders via de commando-poort
+        if self._telemetry.connected:
+            try:
+                return await self._telemetry.send(msg, timeout=timeout)
+            except (OSError, ConnectionError, RuntimeError) as e:
+                print(f"Telemetriekanaal weggevallen: {e}")
+        return await self._cmd.send(msg, timeout=timeout)
+
+    # ---------------- High-level helpers ---------------- #
+
+    async def amovel(self, x, y, z, rx, ry, rz, vel, acc):
+        return await self.send_raw(f"amovel {x} {y} {z} {rx} {ry} {rz} {vel} {acc}\n")
+
+    async def amovej(self, j1, j2, j3, j4, j5, j6, vel, acc):
+        return await self.send_raw(f"amovej {j1} {j2} {j3} {j4} {j5} {j6} {vel} {acc}\n")
+
+    async def amovejx(self, x, y, z, rx, ry, rz, vel, acc):
+        return await self.send_raw(f"amovejx {x} {y} {z} {rx} {ry} {rz} {vel} {acc}\n")
+
+    async def stop(self):
+        return await self.send_raw("stop\n")
+
+    async def force_move(self, x, y, z, rx, ry, rz, vel, acc, force_limit: float,
+                         retract_mm: float = 0.0, contact_do: int = 0, timeout: float = 60.0):
+        # zie DoosanGatewayClient.force_move; het antwoord komt pas na de beweging
+        resp = await self.send_raw(
+            f"force_move {x} {y} {z} {rx} {ry} {rz} {vel} {acc} {force_limit} {retract_mm} {int(contact_do)}\n",
+            timeout=timeout,
+        )
+        return DoosanGatewayClient._parse_force_move_resp(resp)
+
+    async def abort_program(self):
+        # via telemetrie, zodat de abort niet achter een wait_motion wacht
+        return await self.query("prog_abort\n")
+
+    async def change_operation_speed(self, speed: int | float):
+        return await self.send_raw(f"change_operation_speed {speed}\n")
+
+    async def set_velx(self, vel: int | float):
+        return await self.send_raw(f"set_velx {vel}\n")
+
+    async def set_accx(self, acc: int | float):
+        return await self.send_raw(f"set_accx {acc}\n")
+
+    async def apply_parameters(self, operation_speed, velx, accx) -> None:
+        # alle drie tegelijk onderweg, antwoorden komen in volgorde terug
+        await asyncio.gather(
+            self.change_operation_speed(operation_speed),
+            self.set_velx(velx),
+            self.set_accx(accx),
+        )
+
+    # ---------------- Digital / analog IO helpers ---------------- #
+
+    async def set_digital_output(self, index: int, value: int):
+        return await self.send_raw(f"digout {index} {int(value)}\n")
+
+    async def get_digital_input(self, index: int) -> int:
+        return DoosanGatewayClient._parse_digin_resp(await self.query(f"digin {index}\n"))
+
+    async def get_digital_input_mask(self) -> int:
+        return DoosanGatewayClient._parse_mask_resp(await self.query("digin_all\n"), "digin_all")
+
+    async def get_digital_inputs(self, *indices: int) -> list[int]:
+        mask = await self.get_digital_input_mask()
+        return [(mask >> (i - 1)) & 1 for i in indices]
+
+    async def wait_digital_inputs(
+        self,
+        values: dict[int, int],
+        mode: str = "all",
+        timeout: float | None = None,
+        slice_timeout: float = 0.5,
+    ) -> bool:
+        # zelfde opzet als de sync-client: wait_digin in stukken; False bij timeout
+        mask, pattern = DoosanGatewayClient._encode_io_mask(values)
+        start = time.monotonic()
+        while True:
+            wait_s = slice_timeout
+            if timeout is not None:
+                wait_s = max(0.0, min(slice_timeout, timeout - (time.monotonic() - start)))
+
+            resp = await self.send_raw(f"wait_digin {mask} {pattern} {wait_s:.3f} {mode}\n", timeout=wait_s + self.timeout)
+            matched, _ = DoosanGatewayClient._parse_wait_digin_resp(resp)
+            if matched:
+                return True
+
+            if timeout is not None and (time.monotonic() - start) >= timeout:
+                return False
+
+    async def set_digital_outputs(self, values: dict[int, int]) -> int:
+        mask, bits = DoosanGatewayClient._encode_io_mask(values)
+        resp = await self.send_raw(f"digout_mask {mask} {bits}\n")
+        return DoosanGatewayClient._parse_mask_resp(resp, "digout_mask")
+
+    async def feeder_start(self, do: int, inputs, on_s: float = 0.5, off_s: float = 0.1):
+        mask, _ = DoosanGatewayClient._encode_io_mask({i: 1 for i in inputs})
+        resp = await self.send_raw(f"feeder_start {int(do)} {mask} {on_s} {off_s}\n")
+        if not resp or not resp.upper().startswith("OK"):
+            raise RuntimeError(f"feeder_start error response: {resp!r}")
+        return resp
+
+    async def feeder_stop(self):
+        return await self.send_raw("feeder_stop\n")
+
+    async def set_analog_output(self, ch: int, value: float):
+        return await self.send_raw(f"anout {ch} {value}\n")
+
+    async def get_analog_input(self, ch: int) -> float:
+        return DoosanGatewayClient._parse_anin_resp(await self.query(f"anin {ch}\n"))
+
+    async def set_lamp(self, ready: bool, moving: bool):
+        await self.set_digital_outputs({
+            DoosanGatewayClient.LAMP_DO_READY: int(ready),
+            DoosanGatewayClient.LAMP_DO_MOVE: int(moving and not ready),
+        })
+
+    # ---------------- Telemetrie ---------------- #
+
+    async def get_tool_force(self, ref: int = 0) -> float:
+        return DoosanGatewayClient._parse_toolforce_resp(await self.query(f"toolforce {int(ref)}\n"))
+
+    async def get_tcppose(self) -> tuple[float, float, float, float, float, float]:
+        return DoosanGatewayClient._parse_tcppose_resp(await self.query("tcp_pose\n"))
+
+    async def get_status(self) -> RobotStatus:
+        resp = await self.query("status\n")
+        if not resp:
+            raise RuntimeError("Empty response from status")
+        return RobotStatus.parse(resp)
+
+    async def wait_until_stopped(self, timeout: float | None = None, slice_timeout: float = 0.5) -> None:
+        # zelfde opzet als de sync-client: wait_motion in stukken, zodat andere
+        # coroutines tussendoor commando's kwijt kunnen
+        start = time.monotonic()
+        while True:
+            wait_s = slice_timeout
+            if timeout is not None:
+                wait_s = max(0.0, min(slice_timeout, timeout - (time.monotonic() - start)))
+
+            resp = await self.send_raw(f"wait_motion {wait_s:.3f}\n", timeout=wait_s + self.timeout)
+            moving = DoosanGatewayClient._parse_check_motion_resp(resp or "")
+            if moving is None:
+                raise RuntimeError(f"wait_motion error response {resp!r}")
+            if moving == 0:
+                return
+
+            if timeout is not None and (time.monotonic() - start) >= timeout:
+                raise TimeoutError("Robot still moving after wait_until_stopped timeout")
@@ -1,13 +1,15 @@
 import os
-import sys
 import time
 import json
 import socket
-import signal
+import queue
 import threading
-import subprocess
+from collections import deque
+from dataclasses import dataclass
+from concurrent.futures import Future
 from barcode_scanner import scan_part_and_trace, BarcodeScanError
 from database import validate_scanned_parts, write_trace_ids, PartNumberError
+from vision_channel import VisionClient, VisionService
 
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -15,6 +17,7 @@ DATA_DIR = os.path.join(BASE_DIR, "..", "data")
 
 CONFIG_FILE = os.path.join(DATA_DIR, "config.json")
 COORD_FILE = os.path.join(DATA_DIR, "coordinates.json")
+SEQUENCE_FILE = os.path.join(DATA_DIR, "sequences.json")
 LATEST_BUCKLE_FILE = os.path.join(DATA_DIR, "latest_buckle_detection.json")
 
 def move_to_detected_buckle(
@@ -25,22 +28,40 @@ def move_to_detected_buckle(
     timeout: float = 15.0,
     stopflag_getter=None,
 ):
-    """Wacht op buckle-detectie (JSON) en voer pick-sequence uit."""
+    """Wacht op een verse buckle-detectie en voer pick-sequence uit."""
     def log(msg: str):
         print(msg)
         if statuscallback:
             statuscallback(msg)
 
-    t0 = time.time()
-    data = None
-    while time.time() - t0 < timeout:
-        if stopflag_getter and stopflag_getter():
-            log("Sequence gestopt tijdens wachten op buckle.")
-            return
-        data = load_latest_buckle()
-        if data and data.get("buckle_found"):
-            break
-        time.sleep(0.5)
+    vision = getattr(gateway, "vision", None)
+    if vision is not None:
+        # De arm staat nu voor de buckles: het vision-proces een vers frame
+        # laten verwerken. Geen buckle gezien? Opnieuw tot de timeout.
+        t0 = time.time()
+        data = None
+        while time.time() - t0 < timeout:
+            data = vision.detect(
+                timeout=max(0.0, timeout - (time.time() - t0)),
+                stopflag_getter=stopflag_getter,
+            )
+            if stopflag_getter and stopflag_getter():
+                log("Sequence gestopt tijdens wachten op buckle.")
+                return
+            if data and data.get("buckle_found"):
+                break
+            time.sleep(0.2)
+    else:
+        t0 = time.time()
+        data = None
+        while time.time() - t0 < timeout:
+            if stopflag_getter and stopflag_getter():
+                log("Sequence gestopt tijdens wachten op buckle.")
+                return
+            data = load_latest_buckle()
+            if data and data.get("buckle_found"):
+                break
+            time.sleep(0.5)
 
     if not data or not data.get("buckle_found"):
         log("Geen buckle gevonden binnen timeout.")
@@ -102,6 +123,7 @@ def load_config():
         return {
             "robot_ip": "192.168.137.50",
             "port": 56666,
+            "telemetry_port": 56667,
             "LAMP_DO_READY": 1,
             "LAMP_DO_MOVE": 2,
             "operation_speed": 50,
@@ -131,6 +153,12 @@ def load_coordinates() -> dict:
     with open(COORD_FILE, "r", encoding="utf-8") as f:
         return json.load(f)
 
+def load_sequences() -> dict:
+    if not os.path.exists(SEQUENCE_FILE):
+        return {}
+    with open(SEQUENCE_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
 def save_coordinates(coords: dict) -> None:
     with open(COORD_FILE, "w", encoding="utf-8") as f:
         json.dump(coords, f, indent=2)
@@ -151,6 +179,8 @@ def is_robot_enabled(self) -> bool:
 _config = load_config()
 ROBOT_IP = _config.get("robot_ip")
 PORT = _config.get("port")
+TELEMETRY_PORT = _config.get("telemetry_port", PORT + 1)
+TELEMETRY_RATE_HZ = _config.get("telemetry_rate_hz", 20)
 
 
 def sensor_amovel(
@@ -162,6 +192,8 @@ def sensor_amovel(
     return_distance=100.0,
     force_limit=30.0,
     statuscallback=None,
+    approach_vel=20.0,
+    approach_acc=50.0,
 ):
 
     def log(msg: str):
@@ -208,55 +240,39 @@ def sensor_amovel(
         brz,
     ]
 
-    log(f"sensor_amovel: eerste beweging naar {target1}")
-    self.gateway.amovel(*target1, 20, 50)
-
-    if self._stop_flag:
-        return
-
-    # -------- force monitor --------
-    log(f"sensor_amovel: force-monitor starten, limiet {force_limit} N")
-    trigger_reached = False
-
-    while not self._stop_flag:
+    # -------- force-begrensde beweging, bewaakt op de controller --------
+    # De controller stopt zelf zodra force_limit bereikt is, zet DO2 (zuiger)
+    # aan en trekt lift_mm terug; de stopafstand hangt dus niet meer van de
+    # netwerk-RTT af.
+    lift_mm = 8.0
+    log(
+        f"sensor_amovel: force_move naar {target1}, limiet {force_limit} N, "
+        f"snelheid {approach_vel}"
+    )
+    try:
+        trigger_reached, contact_pose = self.gateway.force_move(
+            *target1,
+            approach_vel,
+            approach_acc,
+            force_limit,
+            retract_mm=lift_mm,
+            contact_do=2,
+        )
+    except Exception as e:
+        log(f"Fout bij force_move: {e}")
+        self._stop_flag = True
         try:
-            force_value = self.gateway.get_tool_force(0)
-        except Exception as e:
-            log(f"Fout bij uitlezen force: {e}")
-            self._stop_flag = True
             self.gateway.stop()
-            force_value = None
+        except Exception:
+            pass
+        return
 
-        if force_value is not None:
-            log(f"Huidige force: {force_value:.2f} N")
-            if force_value >= force_limit:
-                try:
-                    self.gateway.stop()
-                except Exception as e:
-                    log(f"Fout bij stop-commando: {e}")
-                trigger_reached = True
-                break
+    if self._stop_flag:
+        return
 
     if trigger_reached:
-        self.gateway.set_digital_output(2, 1)
-
-        try:
-            curx, cury, curz, currx, curry, currz = self.gateway.get_tcppose()
-
-            lift_mm = 8.0
-            lift_target = (
-                curx - dx1 * lift_mm,
-                cury - dy1 * lift_mm,
-                curz - dz1 * lift_mm,
-                currx,
-                curry,
-                currz,
-            )
-            self.gateway.change_operation_speed(self.operation_speed)
-            self.gateway.amovel(*lift_target, self.velx, self.accx)
-            self.gateway.wait_until_stopped()
-        except Exception as e:
-            log(f"Fout bij kleine lift-beweging: {e}")
+        cx, cy, cz, crx, cry, crz = contact_pose
+        log(f"sensor_amovel: contact op [{cx:.1f}, {cy:.1f}, {cz:.1f}]")
 
     # -------- tweede beweging vanaf actuele TCP-pose --------
     if trigger_reached:
@@ -299,25 +315,242 @@ def sensor_amovel(
         self.gateway.wait_until_stopped()
 
 def apply_parameters(self):
-    self.gateway.change_operation_speed(self.operation_speed)
-    self.gateway.set_velx(self.velx)
-    self.gateway.set_accx(self.accx)
+    self.gateway.apply_parameters(self.operation_speed, self.velx, self.accx)
+
+
+@dataclass(frozen=True)
+class RobotStatus:
+    """Momentopname van de robot uit één 'status'-antwoord."""
+
+    force: float
+    tcp_pose: tuple[float, float, float, float, float, float]
+    di_mask: int
+    do_mask: int
+    moving: int
+
+    def di(self, index: int) -> int:
+        # DI's zijn 1..16, bit 0 = DI1
+        return (self.di_mask >> (index - 1)) & 1
+
+    def do(self, index: int) -> int:
+        return (self.do_mask >> (index - 1)) & 1
+
+    @classmethod
+    def parse(cls, resp: str) -> "RobotStatus":
+        parts = resp.strip().split()
+        # Verwacht: ["OK", "status", force, x, y, z, rx, ry, rz, di_mask, do_mask, check_motion]
+        if len(parts) != 12 or parts[0].upper() != "OK" or parts[1].lower() != "status":
+            raise RuntimeError(f"Unexpected status response {resp!r}")
+        try:
+            return cls(
+                force=float(parts[2]),
+                tcp_pose=tuple(float(v) for v in parts[3:9]),
+                di_mask=int(parts[9]),
+                do_mask=int(parts[10]),
+                moving=int(parts[11]),
+            )
+        except ValueError:
+            raise RuntimeError(f"Unable to parse status payload in {resp!r}")
+
+
+@dataclass(frozen=True)
+class TelemetrySample:
+    """Eén door de controller gepushte sample (zie 'subscribe').
+
+    Velden die niet in het abonnement zitten zijn None. t is de host-tijd
+    (time.monotonic) waarop de sample binnenkwam.
+    """
+
+    seq: int
+    t: float
+    moving: int | None = None
+    force: float | None = None
+    tcp_pose: tuple[float, float, float, float, float, float] | None = None
+    di_mask: int | None = None
+    do_mask: int | None = None
+
+    def to_status(self) -> RobotStatus | None:
+        if None in (self.moving, self.force, self.tcp_pose, self.di_mask, self.do_mask):
+            return None
+        return RobotStatus(self.force, self.tcp_pose, self.di_mask, self.do_mask, self.moving)
+
+    @classmethod
+    def parse(cls, line: str, t: float) -> "TelemetrySample":
+        # Verwacht: STREAM <seq> motion=0 force=1.2 pose=x,y,z,rx,ry,rz di=3 do=0
+        parts = line.strip().split()
+        if len(parts) < 2 or parts[0] != "STREAM":
+            raise RuntimeError(f"Unexpected stream line {line!r}")
+        values = {}
+        try:
+            for item in parts[2:]:
+                key, _, val = item.partition("=")
+                if key == "motion":
+                    values["moving"] = int(val)
+                elif key == "force":
+                    values["force"] = float(val)
+                elif key == "pose":
+                    values["tcp_pose"] = tuple(float(v) for v in val.split(","))
+                elif key == "di":
+                    values["di_mask"] = int(val)
+                elif key == "do":
+                    values["do_mask"] = int(val)
+            return cls(seq=int(parts[1]), t=t, **values)
+        except ValueError:
+            raise RuntimeError(f"Unable to parse stream line {line!r}")
+
+
+@dataclass(frozen=True)
+class ProgramEvent:
+    """Voortgang van een opgeslagen programma, gepusht via de stream."""
+
+    seq: int
+    program: str
+    kind: str  # start | step | done | aborted | error
+    step: int
+    info: str  # start: aantal stappen, step: staptype
+
+    @classmethod
+    def parse(cls, line: str) -> "ProgramEvent":
+        # Verwacht: EVENT <seq> <naam> <kind> <stap> <info>
+        parts = line.strip().split()
+        if len(parts) != 6 or parts[0] != "EVENT":
+            raise RuntimeError(f"Unexpected event line {line!r}")
+        try:
+            return cls(int(parts[1]), parts[2], parts[3], int(parts[4]), parts[5])
+        except ValueError:
+            raise RuntimeError(f"Unable to parse event line {line!r}")
+
+
+class FramedReader:
+    """Leest precies één antwoord per aanroep van een socket.
+
+    Antwoorden van de controller eindigen op een terminator (newline). Alles
+    wat na de terminator binnenkomt blijft in de buffer staan voor het
+    volgende antwoord, zodat samengevoegde of gesplitste TCP-pakketten geen
+    verkeerd geparste antwoorden meer opleveren.
+    """
+
+    def __init__(self, sock: socket.socket, terminator: bytes = b"\n", bufsize: int = 4096):
+        self.sock = sock
+        self.terminator = terminator
+        self.bufsize = bufsize
+        self._buf = bytearray()
+
+    def read_reply(self) -> str:
+        while True:
+            idx = self._buf.find(self.terminator)
+            if idx >= 0:
+                line = bytes(self._buf[:idx])
+                del self._buf[:idx + len(self.terminator)]
+                return line.decode("ascii", errors="ignore").rstrip("\r")
+
+            data = self.sock.recv(self.bufsize)
+            if not data:
+                # lege read = verbinding verbroken
+                raise ConnectionError("Robot connection closed")
+            self._buf += data
+
+
+class CommandPipeline:
+    """Verzamelt commando's en verstuurt ze in één sendall.
+
+    Elk commando krijgt een Future die (in volgorde) resolved zodra het
+    antwoord van de controller binnen is. Gebruik als context manager:
+    bij het verlaten van het blok wordt automatisch geflusht.
+    """
+
+    def __init__(self, client: "DoosanGatewayClient"):
+        self.client = client
+        self._pending: list[tuple[str, Future]] = []
+
+    def send(self, msg: str) -> Future:
+        # in één sendall moeten commando's gescheiden zijn door een newline
+        if not msg.endswith("\n"):
+            msg += "\n"
+        fut = Future()
+        self._pending.append((msg, fut))
+        return fut
+
+    def flush(self) -> list[Future]:
+        pending, self._pending = self._pending, []
+        if pending:
+            self.client._send_pipelined(pending)
+        return [fut for _, fut in pending]
+
+    def __enter__(self) -> "CommandPipeline":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        else:
+            for _, fut in self._pending:
+                fut.cancel()
+            self._pending = []
+        return False
+
 
 class DoosanGatewayClient:
-    def __init__(self, ip: str | None = None, port: int | None = None):
+    def __init__(
+        self,
+        ip: str | None = None,
+        port: int | None = None,
+        telemetry_port: int | None = None,
+    ):
         self.gateway = None
         if port is None:
             port = PORT
         if ip is None:
             ip = ROBOT_IP
+        if telemetry_port is None:
+            telemetry_port = TELEMETRY_PORT
 
         self.ip: str = ip
         self.port: int = port
         self.sock: socket.socket | None = None
-        self.lock = threading.Lock()
+        self._reader: FramedReader | None = None
+        # RLock: close() stuurt 'quit' via send_raw terwijl hij de lock al heeft
+        self.lock = threading.RLock()
+
+        # --- telemetriekanaal: aparte verbinding voor uitlezen ---
+        self.telemetry_port: int = telemetry_port
+        self._tsock: socket.socket | None = None
+        self._treader: FramedReader | None = None
+        self._tlock = threading.Lock()
+
+        # --- telemetriestream (subscribe): laatste sample + beperkte historie ---
+        self._stream_thread: threading.Thread | None = None
+        self._stream_period: float = 0.0
+        self._stream_replies: queue.Queue = queue.Queue()
+        # antwoorden van queries die al opgegeven zijn (timeout); die komen
+        # nog binnen en worden weggegooid
+        self._stream_late = 0
+        self._sample_cond = threading.Condition()
+        self._latest_sample: TelemetrySample | None = None
+        self._samples: deque[TelemetrySample] = deque(maxlen=1000)
+        self._prog_events: deque[ProgramEvent] = deque(maxlen=200)
+
+        # --- opgeslagen programma's: wat deze sessie al geupload is ---
+        self._programs: dict[str, tuple[str, ...]] = {}
+        self._prog_wait_seq = -1
+
+        # optioneel: CycleProfiler (profiler.py) die commando's en wachttijden meet
+        self.profiler = None
+
+        # --- schaduw van wat de controller bevestigd heeft ---
+        # speed/velx/accx en DO's; schrijfacties die niets veranderen worden
+        # overgeslagen. Alleen bijgewerkt na een OK, gewist bij een nieuwe sessie.
+        self._shadow: dict[str, float] = {}
+        self._shadow_do: dict[int, int] = {}
+        # lopende feeder op de controller: (do, di_mask, on_s, off_s); zijn DO
+        # wisselt vanzelf en zit daarom nooit in _shadow_do
+        self._feeder: tuple | None = None
 
         # --- status-poller extra's ---
-        self.vision_proc = None
+        # langlopend vision-proces; normaal door de GUI gestart en hier
+        # toegewezen, anders maakt start_buckle_vision er zelf een
+        self.vision_service: VisionService | None = None
+        self._owns_vision = False
         self._status_lock = threading.Lock()
         self._last_status: str | None = None
         self._poll_thread: threading.Thread | None = None
@@ -332,10 +565,49 @@ class DoosanGatewayClient:
         s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         s.connect((self.ip, self.port))
         self.sock = s
+        self._reader = FramedReader(s)
+        # nieuwe sessie: programma's opnieuw uploaden, schaduw onbekend
+        self._programs = {}
+        self.invalidate_shadow()
+        self._connect_telemetry()
+
+    def _connect_telemetry(self) -> None:
+        # Optioneel: een oudere receiver heeft geen telemetriepoort. Dan gaan
+        # alle uitleesvragen gewoon via de commando-socket.
+        with self._tlock:
+            if self._tsock:
+                return
+            try:
+                ts = socket.create_connection((self.ip, self.telemetry_port), timeout=2.0)
+                ts.settimeout(None)
+            except OSError as e:
+                print(f"Telemetriekanaal niet beschikbaar ({e}), uitlezen via commando-socket.")
+                return
+            self._tsock = ts
+            self._treader = FramedReader(ts)
+
+    def _close_telemetry(self) -> None:
+        with self._tlock:
+            if self._tsock:
+                try:
+                    self._tsock.sendall(b"quit\n")
+                except OSError:
+                    pass
+                try:
+                    self._tsock.close()
+                except OSError:
+                    pass
+            self._tsock = None
+            self._treader = None
 
     def close(self) -> None:
         # eerst poller stoppen
         self.stop_status_poller()
+        self._close_telemetry()
+        if self._owns_vision and self.vision_service is not None:
+            self.vision_service.stop()
+            self.vision_service = None
+            self._owns_vision = False
         with self.lock:
             if self.sock:
                 try:
@@ -344,32 +616,186 @@ class DoosanGatewayClient:
                     pass
                 self.sock.close()
                 self.sock = None
+                self._reader = None
+
+    def invalidate_shadow(self) -> None:
+        # bijv. na handmatig bedienen via de teach pendant
+        self._shadow = {}
+        self._shadow_do = {}
+        self._feeder = None
+
+    def _track(self, msg: str, reply: str) -> None:
+        # Werkt de schaduw bij op basis van een verstuurd commando en het antwoord.
+        tokens = msg.split()
+        cmd = tokens[0].lower()
+        ok = reply.upper().startswith("OK")
+        try:
+            if cmd in ("change_operation_speed", "set_velx", "set_accx"):
+                key = {"change_operation_speed": "speed", "set_velx": "velx", "set_accx": "accx"}[cmd]
+                if ok:
+                    self._shadow[key] = float(tokens[1])
+                else:
+                    self._shadow.pop(key, None)
+            elif cmd in ("amovel", "amovejx", "force_move"):
+                # de receiver zet velx/accx op die van de beweging
+                if ok:
+                    self._shadow["velx"] = float(tokens[7])
+                    self._shadow["accx"] = float(tokens[8])
+                else:
+                    self._shadow.pop("velx", None)
+                    self._shadow.pop("accx", None)
+                if cmd == "force_move" and len(tokens) > 11:
+                    self._shadow_do.pop(int(tokens[11]), None)
+            elif cmd == "digout":
+                if ok:
+                    self._shadow_do[int(tokens[1])] = int(tokens[2])
+                else:
+                    self._shadow_do.pop(int(tokens[1]), None)
+            elif cmd == "digout_mask":
+                # het antwoord bevat alle 16 DO's
+                if ok:
+                    mask = self._parse_mask_resp(reply, "digout_mask")
+                    self._shadow_do = {i: (mask >> (i - 1)) & 1 for i in range(1, 17)}
+                else:
+                    self._shadow_do = {}
+            elif cmd == "prog_run":
+                # een programma kan DO-stappen hebben
+                self._shadow_do = {}
+            elif cmd == "feeder_start":
+                self._feeder = (int(tokens[1]), int(tokens[2]), float(tokens[3]), float(tokens[4])) if ok else None
+            elif cmd in ("feeder_stop", "stop"):
+                # de receiver zet de feeder-DO laag
+                if ok and self._feeder:
+                    self._shadow_do[self._feeder[0]] = 0
+                self._feeder = None
+                return
+            if self._feeder:
+                self._shadow_do.pop(self._feeder[0], None)
+        except (ValueError, IndexError, RuntimeError):
+            self._shadow = {}
+            self._shadow_do = {}
+
+    def _invalidate_socket(self) -> None:
+        # bij elke fout: socket ongeldig maken, zodat de GUI dit ziet
+        try:
+            if self.sock:
+                self.sock.close()
+        except OSError:
+            pass
+        self.sock = None
+        self._reader = None
 
     def send_raw(self, msg: str, expect_response: bool = True) -> str | None:
+        # de receiver verwerkt regel voor regel; zonder newline plakt het
+        # volgende commando eraan vast
+        if not msg.endswith("\n"):
+            msg += "\n"
+
         with self.lock:
             if not self.sock:
                 raise RuntimeError("Not connected to robot")
 
+            start = time.perf_counter()
             try:
                 self.sock.sendall(msg.encode("ascii"))
                 if not expect_response:
                     return None
 
-                data = self.sock.recv(4096)
-                if not data:
-                    # lege read = verbinding verbroken
-                    raise ConnectionError("Robot connection closed")
-
-                return data.decode("ascii", errors="ignore")
+                reply = self._reader.read_reply()
+                if self.profiler:
+                    self.profiler.record("cmd", msg.split(None, 1)[0], time.perf_counter() - start, start)
+                self._track(msg, reply)
+                return reply
 
             except Exception as e:
-                # bij elke fout: socket ongeldig maken, zodat de GUI dit ziet
+                self._invalidate_socket()
+                raise e
+
+    def query(self, msg: str) -> str:
+        # Alleen-lezen vraag (status, force, pose, DI, check_motion). Gaat via
+        # het telemetriekanaal zodat hij nooit achter een bewegingscommando
+        # wacht; valt terug op de commando-socket als dat kanaal er niet is.
+        if not msg.endswith("\n"):
+            msg += "\n"
+
+        start = time.perf_counter()
+        with self._tlock:
+            if self._tsock:
                 try:
-                    if self.sock:
-                        self.sock.close()
-                except OSError:
-                    pass
-                self.sock = None
+                    self._tsock.sendall(msg.encode("ascii"))
+                    if self.streaming:
+                        # de stream-reader leest de socket; antwoorden komen via de queue
+                        reply = self._stream_reply()
+                        if reply is None:
+                            # traag antwoord: kanaal en stream houden, deze vraag
+                            # via de commando-socket; het late antwoord vervalt
+                            print(f"Geen telemetrie-antwoord op {msg.strip()!r}, via commando-socket")
+                            self._stream_late += 1
+                    else:
+                        reply = self._treader.read_reply()
+                    if reply is not None:
+                        if self.profiler:
+                            self.profiler.record("query", msg.split(None, 1)[0], time.perf_counter() - start, start)
+                        return reply
+                except Exception as e:
+                    print(f"Telemetriekanaal weggevallen: {e}")
+                    try:
+                        self._tsock.close()
+                    except OSError:
+                        pass
+                    self._tsock = None
+                    self._treader = None
+
+        return self.send_raw(msg)
+
+    def _stream_reply(self, timeout: float = 5.0) -> str | None:
+        # Volgend antwoord uit de stream voor de wachtende query; None bij
+        # timeout. Antwoorden zijn in volgorde, dus eerst de late weggooien.
+        # Aanroepen met _tlock.
+        while True:
+            try:
+                reply = self._stream_replies.get(timeout=timeout)
+            except queue.Empty:
+                return None
+            if isinstance(reply, Exception):
+                raise reply
+            if self._stream_late == 0:
+                return reply
+            self._stream_late -= 1
+
+    def pipeline(self) -> CommandPipeline:
+        return CommandPipeline(self)
+
+    def _send_pipelined(self, pending: list[tuple[str, Future]]) -> None:
+        with self.lock:
+            if not self.sock:
+                err = RuntimeError("Not connected to robot")
+                for _, fut in pending:
+                    fut.set_exception(err)
+                raise err
+
+            idx = 0
+            start = time.perf_counter()
+            try:
+                self.sock.sendall("".join(msg for msg, _ in pending).encode("ascii"))
+
+                # antwoorden komen in dezelfde volgorde terug als de commando's
+                for idx, (msg, fut) in enumerate(pending):
+                    reply = self._reader.read_reply()
+                    self._track(msg, reply)
+                    fut.set_result(reply)
+
+                if self.profiler:
+                    names = sorted({msg.split(None, 1)[0] for msg, _ in pending})
+                    self.profiler.record(
+                        "cmd", f"pipeline[{len(pending)}] {','.join(names)}", time.perf_counter() - start, start
+                    )
+
+            except Exception as e:
+                for _, fut in pending[idx:]:
+                    if not fut.done():
+                        fut.set_exception(e)
+                self._invalidate_socket()
                 raise e
 
     # ---------------- High-level helpers ---------------- #
@@ -386,26 +812,218 @@ class DoosanGatewayClient:
         cmd = f"amovejx {x} {y} {z} {rx} {ry} {rz} {vel} {acc}\n"
         return self.send_raw(cmd)
 
+    def move_path(self, waypoints, radius: float = 0.0) -> int:
+        # Geblend pad: waypoints zijn ("L" | "J", pose/joints, vel, acc[, radius]).
+        # Het hele pad gaat in één round trip naar de controller en start daar
+        # meteen; afwachten met wait_until_stopped. Het laatste punt is exact.
+        with self.pipeline() as pipe:
+            futs = [pipe.send("path_clear\n")]
+            for wp in waypoints:
+                kind, pos, vel, acc = wp[:4]
+                r = wp[4] if len(wp) > 4 else radius
+                coords = " ".join(str(v) for v in pos)
+                futs.append(pipe.send(f"path_add {kind} {coords} {vel} {acc} {r}\n"))
+            futs.append(pipe.send(f"path_run {len(waypoints)}\n"))
+
+        for fut in futs:
+            resp = fut.result()
+            if not resp.upper().startswith("OK"):
+                raise RuntimeError(f"move_path error response {resp!r}")
+        return len(waypoints)
+
+    # ---------------- Opgeslagen programma's ---------------- #
+
+    @staticmethod
+    def _encode_prog_step(step) -> str:
+        # ("L" | "J", pose/joints, vel, acc[, radius]), ("DO", idx, val),
+        # ("WAIT", s) of ("WAITDI", idx, val, timeout)
+        kind = step[0].upper()
+        if kind in ("L", "J"):
+            pos, vel, acc = step[1:4]
+            radius = step[4] if len(step) > 4 else 0.0
+            return f"{kind} {' '.join(str(v) for v in pos)} {vel} {acc} {radius}"
+        if kind == "DO":
+            return f"DO {int(step[1])} {int(step[2])}"
+        if kind == "WAIT":
+            return f"WAIT {step[1]}"
+        if kind == "WAITDI":
+            return f"WAITDI {int(step[1])} {int(step[2])} {step[3]}"
+        raise ValueError(f"Onbekend staptype: {step[0]!r}")
+
+    def upload_program(self, name: str, steps, force: bool = False) -> bool:
+        # Zet een programma onder 'name' op de controller, in één round trip.
+        # Per sessie maar één keer: ongewijzigde programma's worden niet
+        # opnieuw verstuurd. Geeft True terug als er geupload is.
+        lines = tuple(self._encode_prog_step(step) for step in steps)
+        if not force and self._programs.get(name) == lines:
+            return False
+
+        with self.pipeline() as pipe:
+            futs = [pipe.send(f"prog_begin {name}\n")]
+            futs += [pipe.send(f"prog_add {line}\n") for line in lines]
+            futs.append(pipe.send(f"prog_end {name} {len(lines)}\n"))
+
+        for fut in futs:
+            resp = fut.result()
+            if not resp.upper().startswith("OK"):
+                self._programs.pop(name, None)
+                raise RuntimeError(f"upload_program error response {resp!r}")
+        self._programs[name] = lines
+        return True
+
+    def run_program(self, name: str) -> int:
+        # Start een eerder geupload programma; afwachten met wait_program.
+        with self._sample_cond:
+            if self._prog_events:
+                self._prog_wait_seq = self._prog_events[-1].seq
+        resp = self.send_raw(f"prog_run {name}\n")
+        parts = (resp or "").strip().split()
+        # Verwacht: ["OK", "prog_run", naam, n]
+        if len(parts) != 4 or parts[0].upper() != "OK" or parts[1].lower() != "prog_run":
+            raise RuntimeError(f"prog_run error response {resp!r}")
+        return int(parts[3])
+
+    def program_state(self) -> tuple[str, int, str]:
+        # (naam, huidige stap, running|done|aborted|error|idle)
+        resp = self.query("prog_state\n")
+        parts = (resp or "").strip().split()
+        if len(parts) != 5 or parts[0].upper() != "OK" or parts[1].lower() != "prog_state":
+            raise RuntimeError(f"prog_state error response {resp!r}")
+        try:
+            return parts[2], int(parts[3]), parts[4]
+        except ValueError:
+            raise RuntimeError(f"Unable to parse prog_state payload in {resp!r}")
+
+    def abort_program(self):
+        # via telemetrie, zodat de abort niet achter een wait_motion wacht
+        return self.query("prog_abort\n")
+
+    def _next_program_events(self, after_seq: int, timeout: float) -> list[ProgramEvent]:
+        deadline = time.monotonic() + timeout
+        with self._sample_cond:
+            while True:
+                events = [ev for ev in self._prog_events if ev.seq > after_seq]
+                remaining = deadline - time.monotonic()
+                if events or remaining <= 0 or not self.streaming:
+                    return events
+                self._sample_cond.wait(remaining)
+
+    def wait_program(
+        self,
+        name: str,
+        timeout: float | None = None,
+        on_step=None,
+        poll_interval: float = 0.1,
+    ) -> str:
+        # Wacht tot programma 'name' klaar is en geeft done/aborted/error terug.
+        # Met een lopende stream komen de stappen als EVENT binnen; anders (en
+        # als vangnet als er even niets binnenkomt) wordt prog_state gevraagd.
+        # on_step(i) wordt per nieuwe stap één keer aangeroepen.
+        deadline = None if timeout is None else time.monotonic() + timeout
+        after_seq = self._prog_wait_seq
+        started = False
+        last_step = -1
+
+        def report(step: int):
+            nonlocal last_step
+            if step > last_step:
+                last_step = step
+                if on_step:
+                    on_step(step)
+
+        while True:
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Program {name!r} still running after wait_program timeout")
+
+            if self.streaming:
+                events = self._next_program_events(after_seq, timeout=1.0)
+                for ev in events:
+                    after_seq = ev.seq
+                    if ev.program != name:
+                        continue
+                    if ev.kind == "start":
+                        started = True
+                    elif not started:
+                        continue  # staart van een eerdere run
+                    elif ev.kind == "step":
+                        report(ev.step)
+                    else:
+                        return ev.kind
+                if events:
+                    continue
+
+            prog, step, state = self.program_state()
+            if prog == name:
+                if state != "running":
+                    return state
+                report(step)
+            if not self.streaming:
+                time.sleep(poll_interval)
+
     def stop(self):
+        # Eerst via telemetrie afbreken: een force_move houdt de commando-socket
+        # (en self.lock) vast tot hij klaar is, dus 'stop' zou erachter wachten.
+        if self._tsock:
+            try:
+                self.query("abort\n")
+            except (OSError, RuntimeError):
+                pass
         return self.send_raw("stop\n")
 
+    def _unchanged(self, key: str, value: int | float) -> bool:
+        # Aanroepen met self.lock, samen met het versturen: _track werkt de
+        # schaduw vanuit andere threads bij (pipeline, stop uit de GUI).
+        return self._shadow.get(key) == float(value)
+
     def change_operation_speed(self, speed: int | float):
-        return self.send_raw(f"change_operation_speed {speed}\n")
+        with self.lock:
+            if self._unchanged("speed", speed):
+                return "OK change_operation_speed"
+            return self.send_raw(f"change_operation_speed {speed}\n")
 
     def set_velx(self, vel: int | float):
-        return self.send_raw(f"set_velx {vel}\n")
+        with self.lock:
+            if self._unchanged("velx", vel):
+                return "OK set_velx"
+            return self.send_raw(f"set_velx {vel}\n")
 
     def set_accx(self, acc: int | float):
-        return self.send_raw(f"set_accx {acc}\n")
+        with self.lock:
+            if self._unchanged("accx", acc):
+                return "OK set_accx"
+            return self.send_raw(f"set_accx {acc}\n")
+
+    def apply_parameters(self, operation_speed, velx, accx) -> int:
+        # alleen wat afwijkt van de schaduw, in één round trip; geeft het
+        # aantal verstuurde commando's terug
+        sent = 0
+        with self.lock, self.pipeline() as pipe:
+            for key, cmd, value in (
+                ("speed", "change_operation_speed", operation_speed),
+                ("velx", "set_velx", velx),
+                ("accx", "set_accx", accx),
+            ):
+                if not self._unchanged(key, value):
+                    pipe.send(f"{cmd} {value}\n")
+                    sent += 1
+        return sent
 
     # ---------------- Digital / analog IO helpers ---------------- #
 
     def set_digital_output(self, index: int, value: int):
-        cmd = f"digout {index} {int(value)}\n"
-        return self.send_raw(cmd)
+        # schaduw controleren en versturen onder één lock (zie _unchanged)
+        with self.lock:
+            if self._shadow_do.get(index) == int(value):
+                return "OK digout"
+            cmd = f"digout {index} {int(value)}\n"
+            return self.send_raw(cmd)
 
     def get_digital_input(self, index: int) -> int:
-        resp = self.send_raw(f"digin {index}\n")
+        resp = self.query(f"digin {index}\n")
+        return self._parse_digin_resp(resp)
+
+    @staticmethod
+    def _parse_digin_resp(resp: str) -> int:
         if not resp:
             raise RuntimeError("Empty response from digin")
 
@@ -421,12 +1039,153 @@ class DoosanGatewayClient:
         # alles wat geen 'OK ...' is, behandelen als fout van de robot
         raise RuntimeError(f"digin error response: {resp!r}")
 
+    @staticmethod
+    def _parse_mask_resp(resp: str, name: str) -> int:
+        parts = (resp or "").strip().split()
+        # verwacht: "OK <name> <mask>"
+        if len(parts) == 3 and parts[0].upper() == "OK" and parts[1].lower() == name:
+            try:
+                return int(parts[2])
+            except ValueError:
+                raise RuntimeError(f"Unexpected {name} payload: {parts[2]!r} in {resp!r}")
+        raise RuntimeError(f"{name} error response: {resp!r}")
+
+    def get_digital_input_mask(self) -> int:
+        # alle 16 DI's in één round trip, bit 0 = DI1
+        resp = self.query("digin_all\n")
+        return self._parse_mask_resp(resp, "digin_all")
+
+    def get_digital_inputs(self, *indices: int) -> list[int]:
+        mask = self.get_digital_input_mask()
+        return [(mask >> (i - 1)) & 1 for i in indices]
+
+    @staticmethod
+    def _digin_matches(di: int, mask: int, pattern: int, mode: str) -> bool:
+        # zelfde regel als digin_matches in de receiver
+        same = ~(di ^ pattern) & mask
+        return same != 0 if mode == "any" else same == mask
+
+    @staticmethod
+    def _parse_wait_digin_resp(resp: str) -> tuple[bool, int]:
+        parts = (resp or "").strip().split()
+        # verwacht: "OK wait_digin <1/0> <di_mask>"
+        if len(parts) == 4 and parts[0].upper() == "OK" and parts[1].lower() == "wait_digin":
+            try:
+                return parts[2] == "1", int(parts[3])
+            except ValueError:
+                raise RuntimeError(f"Unexpected wait_digin payload in {resp!r}")
+        raise RuntimeError(f"wait_digin error response: {resp!r}")
+
+    def wait_digital_inputs(
+        self,
+        values: dict[int, int],
+        mode: str = "all",
+        timeout: float | None = None,
+        slice_timeout: float = 0.5,
+        stopflag_getter=None,
+    ) -> bool:
+        # Wacht tot de DI's {index: waarde} kloppen ("all") of één ervan ("any").
+        # De controller blokkeert zelf (wait_digin) en reageert binnen zijn
+        # eigen cyclus; in stukken van slice_timeout zodat de socket-lock
+        # tussendoor vrijkomt. False bij timeout of als stopflag_getter() True wordt.
+        mask, pattern = self._encode_io_mask(values)
+        start = time.time()
+        while True:
+            if stopflag_getter and stopflag_getter():
+                return False
+
+            wait_s = slice_timeout
+            if timeout is not None:
+                wait_s = max(0.0, min(slice_timeout, timeout - (time.time() - start)))
+
+            resp = self.send_raw(f"wait_digin {mask} {pattern} {wait_s:.3f} {mode}\n")
+            if resp and resp.strip().upper().startswith("ERR"):
+                # oude receiver zonder wait_digin: terugvallen op pollen
+                remaining = None if timeout is None else max(0.0, timeout - (time.time() - start))
+                return self._poll_digital_inputs(mask, pattern, mode, remaining, stopflag_getter)
+
+            matched, _ = self._parse_wait_digin_resp(resp)
+            if matched:
+                return True
+
+            if timeout is not None and (time.time() - start) >= timeout:
+                return False
+
+    def _poll_digital_inputs(
+        self, mask: int, pattern: int, mode: str, timeout: float | None, stopflag_getter=None,
+        poll_interval: float = 0.1,
+    ) -> bool:
+        start = time.time()
+        while True:
+            if self._digin_matches(self.get_digital_input_mask(), mask, pattern, mode):
+                return True
+            if stopflag_getter and stopflag_getter():
+                return False
+            if timeout is not None and (time.time() - start) >= timeout:
+                return False
+            time.sleep(poll_interval)
+
+    @staticmethod
+    def _encode_io_mask(values: dict[int, int]) -> tuple[int, int]:
+        # {index: waarde} -> (masker van de I/O's, gewenste bits); voor DO's
+        # (digout_mask) en DI's (wait_digin, feeder_start), zelfde codering
+        mask = 0
+        bits = 0
+        for index, value in values.items():
+            mask |= 1 << (index - 1)
+            if value:
+                bits |= 1 << (index - 1)
+        return mask, bits
+
+    def set_digital_outputs(self, values: dict[int, int]) -> int:
+        # zet meerdere DO's atomair in één commando; geeft het nieuwe DO-masker terug
+        with self.lock:
+            changed = {i: v for i, v in values.items() if self._shadow_do.get(i) != int(v)}
+            if not changed and len(self._shadow_do) == 16:
+                return sum(v << (i - 1) for i, v in self._shadow_do.items())
+            mask, bits = self._encode_io_mask(changed or values)
+            resp = self.send_raw(f"digout_mask {mask} {bits}\n")
+        return self._parse_mask_resp(resp, "digout_mask")
+
+    # ---------------- Feeder (pulst een DO op de controller) ---------------- #
+
+    def feeder_start(self, do: int, inputs, on_s: float = 0.5, off_s: float = 0.1) -> str:
+        # Laat de controller DO do pulsen tot alle DI's uit inputs hoog zijn, en
+        # opnieuw zodra er een leegraakt. Loopt naast bewegingen door tot
+        # feeder_stop() of stop(). Nogmaals aanroepen met dezelfde waardes kost niets.
+        mask, _ = self._encode_io_mask({i: 1 for i in inputs})
+        with self.lock:
+            if self._feeder == (int(do), mask, float(on_s), float(off_s)):
+                return "OK feeder_start"
+            resp = self.send_raw(f"feeder_start {int(do)} {mask} {on_s} {off_s}\n")
+        if not resp or not resp.strip().upper().startswith("OK"):
+            raise RuntimeError(f"feeder_start error response: {resp!r}")
+        return resp
+
+    def feeder_stop(self) -> str:
+        return self.send_raw("feeder_stop\n")
+
+    def feeder_state(self) -> tuple[bool, int, int, bool]:
+        # (actief, do, di_mask, buffer vol)
+        resp = self.query("feeder_state\n")
+        parts = (resp or "").strip().split()
+        if len(parts) == 6 and parts[0].upper() == "OK" and parts[1].lower() == "feeder_state":
+            try:
+                return parts[2] == "1", int(parts[3]), int(parts[4]), parts[5] == "1"
+            except ValueError:
+                pass
+        raise RuntimeError(f"feeder_state error response: {resp!r}")
+
     def set_analog_output(self, ch: int, value: float):
         cmd = f"anout {ch} {value}\n"
         return self.send_raw(cmd)
 
     def get_analog_input(self, ch: int) -> float:
-        resp = self.send_raw(f"anin {ch}\n")
+        resp = self.query(f"anin {ch}\n")
+        return self._parse_anin_resp(resp)
+
+    @staticmethod
+    def _parse_anin_resp(resp: str) -> float:
         if not resp:
             raise RuntimeError("Empty response from anin")
         parts = resp.strip().split()
@@ -439,15 +1198,11 @@ class DoosanGatewayClient:
     LAMP_DO_MOVE = _config.get("LAMP_DO_MOVE")  # DO2
 
     def set_lamp(self, ready: bool, moving: bool):
-        # eerst alles uit
-        self.set_digital_output(self.LAMP_DO_READY, 0)  # +1 omdat robot DO's 1..16 zijn
-        self.set_digital_output(self.LAMP_DO_MOVE, 0)
-        if ready:
-            self.set_digital_output(self.LAMP_DO_READY, 1)
-        elif moving:
-            self.set_digital_output(self.LAMP_DO_MOVE, 1)
-
-        self.gateway.set_lamp(False, False)
+        # beide lampen in één keer op hun eindwaarde, dus geen korte 'alles uit'
+        self.set_digital_outputs({
+            self.LAMP_DO_READY: int(ready),  # robot DO's zijn 1..16
+            self.LAMP_DO_MOVE: int(moving and not ready),
+        })
 
     # ---------------- check_motion helpers ---------------- #
 
@@ -465,59 +1220,47 @@ class DoosanGatewayClient:
 
     # ---------------- Status-poller API ---------------- #
 
+    @property
+    def vision(self) -> VisionClient | None:
+        # detecties van het vision-proces; None = geen vision-service
+        return self.vision_service.client if self.vision_service is not None else None
+
     def start_buckle_vision(self, statuscallback=None):
-        if self.vision_proc is not None and self.vision_proc.poll() is None:
-            return
-        basedir = os.path.dirname(os.path.abspath(__file__))
-        script = os.path.join(basedir, "Buckle_detectie.py")
-        try:
-            self.vision_proc = subprocess.Popen(
-                [sys.executable, script],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-            )
-            if statuscallback:
-                statuscallback("Buckle-vision gestart.")
-        except Exception as e:
-            if statuscallback:
-                statuscallback(f"Buckle-vision start fout.")
+        # proces draait al (warm); alleen het periodiek detecteren aanzetten
+        if self.vision_service is None:
+            self.vision_service = VisionService()
+            self._owns_vision = True
+        self.vision_service.start(statuscallback)
+        self.vision_service.resume()
 
     def stop_buckle_vision(self, statuscallback=None):
-        if self.vision_proc is not None:
-            try:
-                # Eerst vriendelijk
-                if self.vision_proc.poll() is None:
-                    try:
-                        os.killpg(self.vision_proc.pid, signal.SIGTERM)
-                    except Exception:
-                        self.vision_proc.terminate()
-                    try:
-                        self.vision_proc.wait(timeout=2.0)
-                    except Exception:
-                        # Hard kill als hij nog leeft
-                        try:
-                            os.killpg(self.vision_proc.pid, signal.SIGKILL)
-                        except Exception:
-                            self.vision_proc.kill()
-            except Exception:
-                pass
-            self.vision_proc = None
+        # pauzeren, niet afsluiten: de volgende buckle-cyclus hoeft niet koud te starten
+        if self.vision_service is not None:
+            self.vision_service.pause()
             if statuscallback:
-                statuscallback("Buckle-vision gestopt.")
+                statuscallback("Buckle-vision gepauzeerd.")
 
 
     def start_status_poller(self, interval: float = 0.1) -> None:
 
-        if self._poll_thread and self._poll_thread.is_alive():
+        if self.streaming or (self._poll_thread and self._poll_thread.is_alive()):
             return
 
+        # met telemetriekanaal laat de controller zelf pushen in plaats van pollen
+        if self._tsock is not None:
+            try:
+                self.subscribe(rate_hz=max(TELEMETRY_RATE_HZ, 1.0 / interval))
+                return
+            except Exception as e:
+                print(f"Subscribe mislukt ({e}), terug naar pollen van check_motion.")
+
         self._poll_stop.clear()
         self._poll_error_reported = False
 
         def _poll():
             while not self._poll_stop.is_set():
                 try:
-                    resp = self.send_raw("check_motion\n")
+                    resp = self.query("check_motion\n")
                     if resp is not None:
                         with self._status_lock:
                             self._last_status = resp.strip()
@@ -535,14 +1278,155 @@ class DoosanGatewayClient:
         self._poll_stop.set()
         if self._poll_thread and self._poll_thread.is_alive():
             self._poll_thread.join(timeout=1.0)
+        self.unsubscribe()
 
     def get_last_status(self) -> str | None:
+        sample = self._fresh_sample()
+        if sample is not None and sample.moving is not None:
+            return f"OK check_motion {sample.moving}"
         with self._status_lock:
             return self._last_status
 
-    def wait_until_stopped(self, poll_interval: float = 0.1, timeout: float | None = None) -> None:
-        import time
+    # ---------------- Telemetriestream ---------------- #
+
+    @property
+    def streaming(self) -> bool:
+        return self._stream_thread is not None and self._stream_thread.is_alive()
+
+    def subscribe(
+        self,
+        rate_hz: float = TELEMETRY_RATE_HZ,
+        fields: tuple[str, ...] = ("motion", "force", "pose", "di", "do"),
+        history: int = 1000,
+    ) -> None:
+        # De controller pusht vanaf nu samples op het telemetriekanaal; force,
+        # pose, DI en check_motion worden daarna lokaal gelezen.
+        if self.streaming:
+            return
+        with self._tlock:
+            if not self._tsock:
+                raise RuntimeError("Telemetry channel not connected")
+            self._tsock.sendall(f"subscribe {rate_hz} {','.join(fields)}\n".encode("ascii"))
+            resp = self._treader.read_reply()
+            if not resp.upper().startswith("OK"):
+                raise RuntimeError(f"subscribe error response {resp!r}")
+
+            self._stream_period = 1.0 / rate_hz
+            self._stream_replies = queue.Queue()
+            self._stream_late = 0
+            with self._sample_cond:
+                self._latest_sample = None
+                self._samples = deque(maxlen=history)
+            self._stream_thread = threading.Thread(
+                target=self._stream_reader, args=(self._treader,), daemon=True
+            )
+            self._stream_thread.start()
+
+    def unsubscribe(self) -> None:
+        if not self.streaming:
+            return
+        try:
+            with self._tlock:
+                if self._tsock:
+                    self._tsock.sendall(b"unsubscribe\n")
+        except OSError:
+            pass
+        self._stream_thread.join(timeout=1.0)
+
+    def _stream_reader(self, reader: FramedReader) -> None:
+        try:
+            while True:
+                line = reader.read_reply()
+                if line.startswith("STREAM"):
+                    try:
+                        sample = TelemetrySample.parse(line, time.monotonic())
+                    except RuntimeError:
+                        continue  # bijv. "STREAM <seq> error" als een DRL-call faalde
+                    with self._sample_cond:
+                        self._latest_sample = sample
+                        self._samples.append(sample)
+                        self._sample_cond.notify_all()
+                elif line.startswith("EVENT"):
+                    try:
+                        event = ProgramEvent.parse(line)
+                    except RuntimeError:
+                        continue
+                    with self._sample_cond:
+                        self._prog_events.append(event)
+                        self._sample_cond.notify_all()
+                elif line.upper().startswith("OK UNSUBSCRIBE"):
+                    return
+                else:
+                    self._stream_replies.put(line)
+        except Exception as e:
+            # verbinding weg: wachtende query laten falen, die ruimt het kanaal op
+            self._stream_replies.put(ConnectionError(f"Telemetry stream closed: {e}"))
+
+    def latest_sample(self) -> TelemetrySample | None:
+        with self._sample_cond:
+            return self._latest_sample
+
+    def sample_history(self) -> list[TelemetrySample]:
+        with self._sample_cond:
+            return list(self._samples)
+
+    def wait_for_sample(self, after_seq: int = -1, timeout: float = 1.0) -> TelemetrySample | None:
+        # blokkeert tot er een sample met seq > after_seq binnen is
+        deadline = time.monotonic() + timeout
+        with self._sample_cond:
+            while self._latest_sample is None or self._latest_sample.seq <= after_seq:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.streaming:
+                    return None
+                self._sample_cond.wait(remaining)
+            return self._latest_sample
+
+    def _fresh_sample(self) -> TelemetrySample | None:
+        # alleen een sample gebruiken als de stream loopt en hij recent is
+        if not self.streaming:
+            return None
+        sample = self.latest_sample()
+        if sample is None:
+            return None
+        if time.monotonic() - sample.t > max(3 * self._stream_period, 0.2):
+            return None
+        return sample
+
+    def wait_until_stopped(
+        self,
+        poll_interval: float = 0.1,
+        timeout: float | None = None,
+        slice_timeout: float = 0.5,
+    ) -> None:
+        # De controller blokkeert zelf tot de beweging klaar is (wait_motion).
+        # We wachten in stukken van slice_timeout zodat de socket-lock tussendoor
+        # vrijkomt, bijv. voor een stop-commando vanuit de GUI.
+        if self.profiler:
+            with self.profiler.measure("motion", "wait_until_stopped"):
+                return self._wait_until_stopped(poll_interval, timeout, slice_timeout)
+        return self._wait_until_stopped(poll_interval, timeout, slice_timeout)
+
+    def _wait_until_stopped(self, poll_interval: float, timeout: float | None, slice_timeout: float) -> None:
+        start = time.time()
+        while True:
+            wait_s = slice_timeout
+            if timeout is not None:
+                wait_s = max(0.0, min(slice_timeout, timeout - (time.time() - start)))
+
+            resp = self.send_raw(f"wait_motion {wait_s:.3f}\n")
+            if resp and resp.strip().upper().startswith("ERR"):
+                # oude receiver zonder wait_motion: terugvallen op pollen
+                remaining = None if timeout is None else max(0.0, timeout - (time.time() - start))
+                return self._poll_until_stopped(poll_interval, remaining)
 
+            moving = self._parse_check_motion_resp(resp or "")
+            if moving == 0:
+                return  # robot staat stil
+
+            if timeout is not None and (time.time() - start) >= timeout:
+                raise TimeoutError("Robot still moving after wait_until_stopped timeout")
+
+    def _poll_until_stopped(self, poll_interval: float = 0.1, timeout: float | None = None) -> None:
         start = time.time()
         while True:
             resp = self.send_raw("check_motion\n")
@@ -555,8 +1439,54 @@ class DoosanGatewayClient:
 
             time.sleep(poll_interval)
 
+    def force_move(
+        self,
+        x, y, z, rx, ry, rz,
+        vel,
+        acc,
+        force_limit: float,
+        retract_mm: float = 0.0,
+        contact_do: int = 0,
+    ) -> tuple[bool, tuple[float, float, float, float, float, float]]:
+        # Lineaire beweging die de controller zelf afbreekt zodra de totale
+        # toolforce >= force_limit. Bij contact zet de controller contact_do
+        # aan (0 = geen) en trekt hij retract_mm terug langs de bewegingsas.
+        # Geeft (contact, pose op het moment van stoppen) terug; stop() breekt
+        # hem af via het telemetriekanaal (RuntimeError "force_move aborted").
+        cmd = (
+            f"force_move {x} {y} {z} {rx} {ry} {rz} {vel} {acc} "
+            f"{force_limit} {retract_mm} {int(contact_do)}\n"
+        )
+        return self._parse_force_move_resp(self.send_raw(cmd))
+
+    @staticmethod
+    def _parse_force_move_resp(resp: str) -> tuple[bool, tuple[float, float, float, float, float, float]]:
+        if not resp:
+            raise RuntimeError("Empty response from force_move")
+
+        parts = resp.strip().split()
+        # Verwacht: ["OK", "force_move", contact, x, y, z, rx, ry, rz]
+        if len(parts) != 9 or parts[0].upper() != "OK" or parts[1].lower() != "force_move":
+            raise RuntimeError(f"force_move error response {resp!r}")
+        try:
+            contact = int(parts[2])
+            pose = tuple(float(v) for v in parts[3:9])
+        except ValueError:
+            raise RuntimeError(f"Unable to parse force_move payload in {resp!r}")
+        if contact == 2:
+            # afgebroken via abort/stop: niet doen alsof het doel bereikt is
+            raise RuntimeError("force_move aborted")
+        return contact == 1, pose
+
     def get_tool_force(self, ref: int = 0) -> float:
-        resp = self.send_raw(f"toolforce {int(ref)}")
+        sample = self._fresh_sample()
+        if ref == 0 and sample is not None and sample.force is not None:
+            return sample.force
+        resp = self.query(f"toolforce {int(ref)}")
+        return self._parse_toolforce_resp(resp)
+
+    @staticmethod
+    def _parse_toolforce_resp(resp: str) -> float:
         if not resp:
             raise RuntimeError("Empty response from toolforce")
         parts = resp.strip().split()
@@ -569,7 +1499,14 @@ class DoosanGatewayClient:
         raise RuntimeError(f"toolforce error response {resp!r}")
 
     def get_tcppose(self):
-        resp = self.send_raw("tcp_pose", expect_response=True)
+        sample = self._fresh_sample()
+        if sample is not None and sample.tcp_pose is not None:
+            return sample.tcp_pose
+        resp = self.query("tcp_pose")
+        return self._parse_tcppose_resp(resp)
+
+    @staticmethod
+    def _parse_tcppose_resp(resp: str) -> tuple[float, float, float, float, float, float]:
         if not resp:
             raise RuntimeError("Empty response from tcppose")
 
@@ -590,51 +1527,91 @@ class DoosanGatewayClient:
 
         return x, y, z, rx, ry, rz
 
-def scan_and_validate_single(program, kind: str, statuscallback=None):
-    def log(msg: str):
-        print(msg)
-        if statuscallback:
-            statuscallback(msg)
+    def get_status(self) -> RobotStatus:
+        # force + TCP-pose + alle DI/DO + check_motion in één round trip,
+        # of helemaal geen als de telemetriestream loopt
+        sample = self._fresh_sample()
+        if sample is not None:
+            status = sample.to_status()
+            if status is not None:
+                return status
+        resp = self.query("status\n")
+        if not resp:
+            raise RuntimeError("Empty response from status")
+        return RobotStatus.parse(resp)
 
+class MissingWorkorderError(Exception):
+    pass
+
+
+# camera: één scan tegelijk, ook als er een op de achtergrond loopt voor
+# het volgende product; Workorders.xlsx: nooit tegelijk lezen en schrijven
+_scan_lock = threading.Lock()
+_workbook_lock = threading.Lock()
+
+
+def scan_and_validate(program, kind: str, log=print, cancel=None) -> tuple[str, str]:
+    # Scan en controle tegen de workorder; geeft (part, trace) terug. Schrijft
+    # niets weg: dat doet commit_trace_id() pas als het part echt geplaatst
+    # wordt. Gooit een exception bij een fout, zodat hij ook als
+    # achtergrondtaak kan draaien; cancel (threading.Event) breekt de scan af.
     if not getattr(program, "workorder_id", None):
-        log("Geen workorder ingesteld; sequence wordt afgebroken.")
-        program.stopflag = True
-        return
+        raise MissingWorkorderError("Geen workorder ingesteld")
 
-    try:
+    with _scan_lock:
         log(f"Scan {kind} barcode (P/H)...")
-        part, trace = scan_part_and_trace()
+        part, trace = scan_part_and_trace(cancel=cancel)
 
-        frame = part if kind == "frame" else None
-        belt = part if kind == "seatbelts" else None
-        buckle = part if kind == "buckles" else None
+    frame = part if kind == "frame" else None
+    belt = part if kind == "seatbelts" else None
+    buckle = part if kind == "buckles" else None
 
+    with _workbook_lock:
         validate_scanned_parts(
             workorder_id=program.workorder_id,
             scanned_frame_part=frame,
             scanned_belt_part=belt,
             scanned_buckle_part=buckle,
         )
-        log(f"{kind} partnummer is geldig voor workorder {program.workorder_id}.")
+    log(f"{kind} partnummer is geldig voor workorder {program.workorder_id}.")
+    return part, trace
 
-        frametrace = trace if kind == "frame" else None
-        belttrace = trace if kind == "seatbelts" else None
-        buckletrace = trace if kind == "buckles" else None
 
+def commit_trace_id(program, kind: str, trace: str, log=print) -> None:
+    # traceID van een gescand en gecontroleerd part vastleggen bij de workorder
+    frametrace = trace if kind == "frame" else None
+    belttrace = trace if kind == "seatbelts" else None
+    buckletrace = trace if kind == "buckles" else None
+
+    with _workbook_lock:
         write_trace_ids(
             workorder_id=program.workorder_id,
             frame_trace=frametrace,
             belt_trace=belttrace,
             buckle_trace=buckletrace,
         )
-        log(f"{kind} traceID opgeslagen in Workorders.xlsx.")
+    log(f"{kind} traceID opgeslagen in Workorders.xlsx.")
 
-    except BarcodeScanError as e:
-        log(f"Barcode scan fout ({kind}): {e}")
-        program._stop_flag = True
-    except PartNumberError as e:
-        log(f"Partnummer mismatch ({kind}): {e}")
-        program._stop_flag = True
+
+def scan_error_message(kind: str, e: Exception) -> str:
+    if isinstance(e, MissingWorkorderError):
+        return "Geen workorder ingesteld; sequence wordt afgebroken."
+    if isinstance(e, BarcodeScanError):
+        return f"Barcode scan fout ({kind}): {e}"
+    if isinstance(e, PartNumberError):
+        return f"Partnummer mismatch ({kind}): {e}"
+    return f"Onbekende fout bij {kind}-scan: {e}"
+
+
+def scan_and_validate_single(program, kind: str, statuscallback=None):
+    def log(msg: str):
+        print(msg)
+        if statuscallback:
+            statuscallback(msg)
+
+    try:
+        _, trace = scan_and_validate(program, kind, log)
+        commit_trace_id(program, kind, trace, log)
     except Exception as e:
-        log(f"Onbekende fout bij {kind}-scan: {e}")
+        log(scan_error_message(kind, e))
         program._stop_flag = True
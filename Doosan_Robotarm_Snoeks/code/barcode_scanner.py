@@ -1,12 +1,14 @@
 import cv2
 from pyzbar import pyzbar
+from camera import WebcamCamera, ThreadedCamera
 
 webcam_id = 4
 
 class BarcodeScanError(Exception):
     pass
 
-def scan_camera(required_letters=None, zoom_factors=None):
+def scan_camera(required_letters=None, zoom_factors=None, cancel=None):
+    # cancel: threading.Event; gezet = scan afbreken (bijv. na een stop)
     if zoom_factors is None:
         zoom_factors = [1.0, 1.5, 2.0, 3.0]
     if required_letters is None:
@@ -14,19 +16,25 @@ def scan_camera(required_letters=None, zoom_factors=None):
     clahe_clip = 4.0
     clahe_tile = 8
 
-    # Open camera
-    cap = cv2.VideoCapture(webcam_id)
-    if not cap.isOpened():
+    # Open camera; een achtergrondthread leest door, decoderen krijgt steeds het nieuwste frame
+    try:
+        cam = ThreadedCamera(WebcamCamera(webcam_id, api=cv2.CAP_ANY)).start()
+    except RuntimeError:
         raise RuntimeError("Kan de camera niet openen")
 
     print("Camera geopend. Scannen gestart...")
 
     used_barcodes = set()
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
+    frame_time = 0.0
+
+    while cancel is None or not cancel.is_set():
+        # elk frame maar één keer decoderen
+        frame, new_time = cam.wait_frame(after=frame_time, timeout=0.1)
+        if frame is None:
+            if cv2.waitKey(1) == 27:
+                break
             continue
+        frame_time = new_time
 
         annotated = frame.copy()
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
@@ -79,13 +87,15 @@ def scan_camera(required_letters=None, zoom_factors=None):
         if key == 27:  # ESC sluit alles
             break
 
-    cap.release()
+    cam.stop()
     cv2.destroyAllWindows()
     return used_barcodes
 
 
-def scan_part_and_trace(required_letters=("P", "H")):
-    used_barcodes = scan_camera(required_letters=required_letters)
+def scan_part_and_trace(required_letters=("P", "H"), cancel=None):
+    used_barcodes = scan_camera(required_letters=required_letters, cancel=cancel)
+    if cancel is not None and cancel.is_set():
+        raise BarcodeScanError("Scan afgebroken.")
     if not used_barcodes:
         raise BarcodeScanError("Geen barcodes gevonden.")
 
@@ -0,0 +1,218 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import tempfile
+import contextlib
+from backend import DoosanGatewayClient, load_coordinates
+from async_gateway import AsyncDoosanGatewayClient
+from profiler import CycleProfiler, percentile, PERCENTILES
+from robot_simulator import RobotSimulator, SimRobot, trapezoid_time
+
+# staptypes die hardware buiten de robot nodig hebben (camera, scanner)
+HARDWARE_STEP_TYPES = ("vision", "vision_pick", "barcode_scan")
+
+
+def stats(values: list[float]) -> dict:
+    values = sorted(values)
+    result = {"n": len(values), "mean": sum(values) / len(values) if values else 0.0}
+    for pct in PERCENTILES:
+        result[f"p{pct}"] = percentile(values, pct)
+    return result
+
+
+def bench_rtt(gw: DoosanGatewayClient, n: int) -> dict:
+    # round trip per commandosoort; uitleesvragen via query (telemetriekanaal)
+    commands = {
+        "set_velx": lambda: gw.send_raw("set_velx 250"),
+        "digout": lambda: gw.send_raw("digout 8 0"),
+        # send_raw: set_digital_outputs slaat ongewijzigde DO's over (shadow)
+        "digout_mask": lambda: gw.send_raw("digout_mask 384 0"),
+        "check_motion(cmd)": lambda: gw.send_raw("check_motion"),
+        "check_motion(query)": lambda: gw.query("check_motion"),
+        "digin": lambda: gw.get_digital_input(1),
+        "digin_all": lambda: gw.get_digital_input_mask(),
+        "toolforce": lambda: gw.query("toolforce 0"),
+        "tcp_pose": lambda: gw.query("tcp_pose"),
+        "status": lambda: gw.query("status"),
+    }
+    result = {}
+    for name, call in commands.items():
+        samples = []
+        for _ in range(n):
+            t0 = time.perf_counter()
+            call()
+            samples.append(time.perf_counter() - t0)
+        result[name] = stats(samples)
+    return result
+
+
+def bench_throughput(gw: DoosanGatewayClient, n: int) -> dict:
+    # commando's per seconde: één voor één tegenover gepipelined
+    t0 = time.perf_counter()
+    for _ in range(n):
+        gw.send_raw("check_motion")
+    serial = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with gw.pipeline() as pipe:
+        futs = [pipe.send("check_motion") for _ in range(n)]
+    for fut in futs:
+        fut.result()
+    pipelined = time.perf_counter() - t0
+
+    return {
+        "n": n,
+        "serial_cmds_per_s": n / serial,
+        "pipelined_cmds_per_s": n / pipelined,
+    }
+
+
+def bench_wait_until_stopped(gw: DoosanGatewayClient, robot: SimRobot, n: int, distance: float = 50.0) -> dict:
+    # Overhead = gemeten wachttijd - modelduur van de beweging. Vergelijkt
+    # wait_motion op de controller met het oude check_motion-pollen.
+    vel, acc = 250.0, 1000.0
+    model = trapezoid_time(distance, vel, acc)
+    result = {"move_mm": distance, "model_s": model}
+    for label, wait in (
+        ("wait_motion", lambda: gw.wait_until_stopped()),
+        ("poll_check_motion", lambda: gw._poll_until_stopped(poll_interval=0.1)),
+    ):
+        overhead = []
+        for i in range(n):
+            x, y, z, rx, ry, rz = robot.tcp_pose()
+            sign = 1 if i % 2 == 0 else -1
+            t0 = time.perf_counter()
+            gw.amovel(x, y + sign * distance, z, rx, ry, rz, vel, acc)
+            wait()
+            overhead.append(time.perf_counter() - t0 - model)
+        result[label] = stats(overhead)
+    return result
+
+
+def bench_async_status(port: int, telemetry_port: int, robot: SimRobot, n: int, distance: float = 200.0) -> dict:
+    # AsyncDoosanGatewayClient: status vragen terwijl een andere coroutine op
+    # dezelfde event loop op een beweging wacht (wait_motion-slices). Via het
+    # telemetriekanaal tegenover via de commando-poort.
+    async def measure() -> dict:
+        result = {}
+        async with AsyncDoosanGatewayClient("127.0.0.1", port, telemetry_port) as gw:
+            for label, ask in (
+                ("telemetry", lambda: gw.get_status()),
+                ("command", lambda: gw.send_raw("status\n")),
+            ):
+                x, y, z, rx, ry, rz = robot.tcp_pose()
+                sign = 1 if label == "telemetry" else -1
+                await gw.amovel(x, y + sign * distance, z, rx, ry, rz, 100.0, 1000.0)
+                waiter = asyncio.create_task(gw.wait_until_stopped(slice_timeout=0.5))
+                samples = []
+                for _ in range(n):
+                    if waiter.done():
+                        break
+                    t0 = time.perf_counter()
+                    await ask()
+                    samples.append(time.perf_counter() - t0)
+                await waiter
+                result[label] = stats(samples)
+        return result
+
+    return asyncio.run(measure())
+
+
+def bench_sequences(gw: DoosanGatewayClient, names: list[str]) -> dict:
+    # Volledige cyclus per sequence. Vision en barcode hebben een camera nodig
+    # en worden overgeslagen; alles wat de robot doet telt mee.
+    from sequence import RobotProgram
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # eigen profiler meegeven, zodat de standaard-DB nooit geopend wordt
+        profiler = CycleProfiler(os.path.join(tmp, "bench.db"))
+        program = RobotProgram(gw, profiler=profiler)
+        for steps in program.engine.sequences.values():
+            for step in steps:
+                if step.get("type") in HARDWARE_STEP_TYPES:
+                    step["enabled"] = False
+
+        result = {}
+        # statusregels van de sequence naar stderr, stdout is voor de JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            for name in names:
+                program._stop_flag = False
+                t0 = time.perf_counter()
+                ok = program.engine.run(name)
+                result[name] = {"cycle_s": time.perf_counter() - t0, "completed": ok}
+
+        for entry in profiler.report():
+            seq = result.get(entry["product"])
+            if seq is not None:
+                seq.setdefault("breakdown", []).append(entry)
+        gw.profiler = None
+        profiler.close()
+    return result
+
+
+def taught_poses_from_coordinates() -> dict:
+    # pj_naam + p_naam in coordinates.json = dezelfde plek in joints en TCP
+    coords = load_coordinates()
+    taught = {}
+    for key, joints in coords.items():
+        if key.startswith("pj_") and "p_" + key[3:] in coords:
+            taught[tuple(joints)] = coords["p_" + key[3:]]
+    return taught
+
+
+def run(args) -> dict:
+    robot = SimRobot(taught_poses=taught_poses_from_coordinates())
+    with RobotSimulator(port=0, telemetry_port=0, robot=robot, latency=args.latency, jitter=args.jitter, seed=args.seed) as sim:
+        gw = DoosanGatewayClient("127.0.0.1", sim.port, sim.telemetry_port)
+        gw.connect()
+        if args.stream:
+            gw.start_status_poller()
+        try:
+            report = {
+                "meta": {
+                    "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "python": platform.python_version(),
+                    "latency_s": args.latency,
+                    "jitter_s": args.jitter,
+                    "stream": args.stream,
+                },
+                "rtt": bench_rtt(gw, args.n),
+                "throughput": bench_throughput(gw, args.n * 5),
+                "wait_until_stopped": bench_wait_until_stopped(gw, robot, args.moves),
+                "async_status_during_motion": bench_async_status(sim.port, sim.telemetry_port, robot, args.n),
+            }
+            names = [n for n in args.sequences.split(",") if n]
+            if names:
+                report["sequences"] = bench_sequences(gw, names)
+        finally:
+            gw.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DoosanGatewayClient tegen de simulator")
+    parser.add_argument("--latency", type=float, default=0.001, help="vaste vertraging per antwoord (s)")
+    parser.add_argument("--jitter", type=float, default=0.0005, help="extra willekeurige vertraging 0..jitter (s)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("-n", type=int, default=200, help="aantal metingen per commando")
+    parser.add_argument("--moves", type=int, default=10, help="aantal bewegingen voor wait_until_stopped")
+    parser.add_argument("--sequences", default="buckles,armrest,seatbelts", help="komma-gescheiden, leeg = overslaan")
+    parser.add_argument("--stream", action="store_true", help="telemetriestream aanzetten zoals de GUI")
+    parser.add_argument("-o", "--output", help="JSON naar dit bestand i.p.v. stdout")
+    args = parser.parse_args()
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ import json
 import os
 import time
 from sklearn.cluster import KMeans
+from camera import WebcamCamera
 
 # ================= CONFIG =================
 
@@ -35,29 +36,6 @@ def rotate_point(p, width, height, rot):
     raise ValueError("Ongeldige camera-rotatie")
 
 
-# ---------------- Webcam camera ----------------
-class WebcamCamera:
-    def __init__(self, index, width, height):
-        self.cap = cv2.VideoCapture(index, cv2.CAP_DSHOW)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
-
-        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-
-        if not self.cap.isOpened():
-            raise RuntimeError("Webcam kon niet worden geopend")
-
-    def get_frame(self):
-        ret, frame = self.cap.read()
-        if not ret:
-            return None
-        return frame
-
-    def stop(self):
-        self.cap.release()
-
-
 # ---------------- JSON helpers ----------------
 def load_json(path):
     if not os.path.exists(path):
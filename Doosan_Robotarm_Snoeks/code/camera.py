@@ -0,0 +1,109 @@
+import time
+import threading
+import cv2
+
+
+class WebcamCamera:
+    def __init__(self, index, width=None, height=None, api=cv2.CAP_DSHOW):
+        self.cap = cv2.VideoCapture(index, api)
+        if width is not None:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        if height is not None:
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+        if not self.cap.isOpened():
+            raise RuntimeError("Webcam kon niet worden geopend")
+
+    def get_frame(self):
+        ret, frame = self.cap.read()
+        if not ret:
+            return None
+        return frame
+
+    def stop(self):
+        self.cap.release()
+
+
+class ThreadedCamera:
+    """WebcamCamera die in een eigen thread continu frames leest.
+
+    Alleen het nieuwste frame wordt bewaard, met de time.time() waarop het
+    binnenkwam. Daardoor ligt er nooit een oud frame in de driverbuffer te
+    wachten en blokkeert latest() nooit op de camera. wait_frame(after=t)
+    geeft het eerste frame dat na t is opgenomen, bijvoorbeeld na een vraag.
+    """
+
+    def __init__(self, camera: WebcamCamera):
+        self.camera = camera
+        self._cond = threading.Condition()
+        self._frame = None
+        self._frame_time = 0.0
+        self._running = False
+        self._thread: threading.Thread | None = None
+
+    @property
+    def width(self) -> int:
+        return self.camera.width
+
+    @property
+    def height(self) -> int:
+        return self.camera.height
+
+    def start(self) -> "ThreadedCamera":
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while self._running:
+            frame = self.camera.get_frame()
+            if frame is None:
+                time.sleep(0.01)
+                continue
+            with self._cond:
+                self._frame = frame
+                self._frame_time = time.time()
+                self._cond.notify_all()
+
+    def latest(self):
+        # (frame, frame_time); (None, 0.0) zolang er nog geen frame is
+        with self._cond:
+            return self._frame, self._frame_time
+
+    def wait_frame(self, after: float | None = None, timeout: float = 2.0):
+        # nieuwste frame van na 'after' (standaard: nu); (None, 0.0) bij timeout
+        after = time.time() if after is None else after
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._frame is None or self._frame_time <= after:
+                wait_s = deadline - time.monotonic()
+                if wait_s <= 0 or not self._running:
+                    return None, 0.0
+                self._cond.wait(wait_s)
+            return self._frame, self._frame_time
+
+    def get_frame(self):
+        # zelfde aanroep als WebcamCamera, maar zonder te wachten op de camera
+        return self.latest()[0]
+
+    def stop(self) -> None:
+        self._running = False
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=2.0)
+        with self._cond:
+            self._cond.notify_all()
+        self.camera.stop()
+
+    def __enter__(self) -> "ThreadedCamera":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
@@ -0,0 +1,210 @@
+import os
+import sys
+import math
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# buiten de repository: per gebruiker (Windows: %LOCALAPPDATA%), zodat een
+# meet-database nooit in data/ of in git terechtkomt
+PROFILE_DIR = os.path.join(
+    os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".local", "share"),
+    "Doosan_Robotarm_Snoeks",
+)
+PROFILE_DB = os.path.join(PROFILE_DIR, "cycle_times.db")
+
+# soorten metingen
+KIND_CMD = "cmd"        # commando versturen tot antwoord van de controller
+KIND_QUERY = "query"    # uitleesvraag (telemetriekanaal)
+KIND_MOTION = "motion"  # wachten tot de beweging klaar is
+KIND_STEP = "step"      # één stap uit de sequence, alles inbegrepen
+KIND_GAP = "gap"        # tijd tussen twee stappen (host-overhead)
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    # nearest-rank op een gesorteerde lijst
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100.0 * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+class CycleProfiler:
+    """Meet commando's en sequence-stappen per run en bewaart ze in SQLite.
+
+    Metingen worden tijdens een run in het geheugen verzameld en pas bij
+    end_run() in één transactie weggeschreven, zodat de sequence zelf geen
+    schijf-I/O ziet. Buiten een run wordt niets vastgelegd.
+    """
+
+    def __init__(self, path: str = PROFILE_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._run_id: int | None = None
+        self._run_start = 0.0
+        self._rows: list[tuple] = []
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY,
+                product TEXT NOT NULL,
+                started REAL NOT NULL,
+                duration REAL
+            );
+            CREATE TABLE IF NOT EXISTS timings (
+                run_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                name TEXT NOT NULL,
+                t REAL NOT NULL,
+                duration REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS timings_run ON timings (run_id);
+            """
+        )
+
+    @property
+    def active(self) -> bool:
+        return self._run_id is not None
+
+    def begin_run(self, product: str) -> bool:
+        # False als er al een run loopt; die telt dan door
+        with self._lock:
+            if self._run_id is not None:
+                return False
+            cur = self._db.execute(
+                "INSERT INTO runs (product, started) VALUES (?, ?)", (product, time.time())
+            )
+            self._db.commit()
+            self._run_id = cur.lastrowid
+            self._run_start = time.perf_counter()
+            self._rows = []
+            return True
+
+    def end_run(self) -> None:
+        with self._lock:
+            if self._run_id is None:
+                return
+            duration = time.perf_counter() - self._run_start
+            self._db.executemany(
+                "INSERT INTO timings (run_id, kind, name, t, duration) VALUES (?, ?, ?, ?, ?)",
+                self._rows,
+            )
+            self._db.execute("UPDATE runs SET duration = ? WHERE id = ?", (duration, self._run_id))
+            self._db.commit()
+            self._run_id = None
+            self._rows = []
+
+    def record(self, kind: str, name: str, duration: float, start: float | None = None) -> None:
+        # start/duration in perf_counter-seconden; t wordt relatief aan de run opgeslagen
+        if self._run_id is None:
+            return
+        with self._lock:
+            if self._run_id is None:
+                return
+            t = (start if start is not None else time.perf_counter() - duration) - self._run_start
+            self._rows.append((self._run_id, kind, name, t, duration))
+
+    @contextmanager
+    def measure(self, kind: str, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(kind, name, time.perf_counter() - start, start)
+
+    def close(self) -> None:
+        self.end_run()
+        with self._lock:
+            self._db.close()
+
+    # ----------------- Rapport -----------------
+
+    def report(self, product: str | None = None, kind: str | None = None) -> list[dict]:
+        # p50/p95/p99 per (product, soort, naam) over alle runs
+        sql = (
+            "SELECT runs.product, timings.kind, timings.name, timings.duration "
+            "FROM timings JOIN runs ON runs.id = timings.run_id"
+        )
+        where, args = [], []
+        if product:
+            where.append("runs.product = ?")
+            args.append(product)
+        if kind:
+            where.append("timings.kind = ?")
+            args.append(kind)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+
+        with self._lock:
+            rows = self._db.execute(sql, args).fetchall()
+
+        groups: dict[tuple[str, str, str], list[float]] = {}
+        for prod, k, name, duration in rows:
+            groups.setdefault((prod, k, name), []).append(duration)
+
+        result = []
+        for (prod, k, name), values in groups.items():
+            values.sort()
+            entry = {
+                "product": prod,
+                "kind": k,
+                "name": name,
+                "count": len(values),
+                "total": sum(values),
+            }
+            for pct in PERCENTILES:
+                entry[f"p{pct}"] = percentile(values, pct)
+            result.append(entry)
+        # grootste tijdvreters bovenaan
+        result.sort(key=lambda e: e["total"], reverse=True)
+        return result
+
+    def run_summary(self, product: str | None = None) -> dict[str, dict]:
+        # cyclustijd per product: aantal runs en p50/p95/p99
+        sql = "SELECT product, duration FROM runs WHERE duration IS NOT NULL"
+        args = []
+        if product:
+            sql += " AND product = ?"
+            args.append(product)
+        with self._lock:
+            rows = self._db.execute(sql, args).fetchall()
+
+        per_product: dict[str, list[float]] = {}
+        for prod, duration in rows:
+            per_product.setdefault(prod, []).append(duration)
+
+        summary = {}
+        for prod, values in per_product.items():
+            values.sort()
+            summary[prod] = {"count": len(values)}
+            for pct in PERCENTILES:
+                summary[prod][f"p{pct}"] = percentile(values, pct)
+        return summary
+
+
+def format_report(profiler: CycleProfiler, product: str | None = None, limit: int = 40) -> str:
+    lines = []
+    for prod, s in sorted(profiler.run_summary(product).items()):
+        lines.append(
+            f"{prod}: {s['count']} runs, cyclus p50 {s['p50']:.2f}s  p95 {s['p95']:.2f}s  p99 {s['p99']:.2f}s"
+        )
+    lines.append("")
+    lines.append(f"{'product':<10} {'soort':<6} {'naam':<44} {'n':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'totaal':>9}")
+    for e in profiler.report(product)[:limit]:
+        lines.append(
+            f"{e['product']:<10} {e['kind']:<6} {e['name'][:44]:<44} {e['count']:>5} "
+            f"{e['p50']:>8.3f} {e['p95']:>8.3f} {e['p99']:>8.3f} {e['total']:>9.2f}"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # python profiler.py [product]
+    prof = CycleProfiler()
+    print(format_report(prof, sys.argv[1] if len(sys.argv) > 1 else None))
+    prof.close()
@@ -1,4 +1,81 @@
 PORT = 56666
+# aparte poort voor telemetrie (alleen uitlezen)
+TELEMETRY_PORT = 56667
+
+# commando's die op het telemetriekanaal mogen; niets wat beweegt of I/O zet
+# (uitzondering: prog_abort en abort, zodat afbreken nooit achter een
+# wait_motion of force_move op de commando-poort wacht)
+TELEMETRY_COMMANDS = [
+    "check_motion", "toolforce", "tcp_pose", "digin", "digin_all", "anin", "status",
+    "prog_state", "prog_abort", "feeder_state", "abort"
+]
+
+# velden die 'subscribe' kan pushen
+STREAM_FIELDS = ["motion", "force", "pose", "di", "do"]
+STREAM_MAX_RATE_HZ = 100.0
+
+# server_socket_read: timeout verlopen zonder data
+SOCKET_READ_TIMEOUT = -3
+# korte read tussen twee stappen van een pad/programma (poll_command_socket)
+SOCKET_POLL_TIMEOUT = 0.001
+
+# check_motion-waarde voor 'bezig'
+MOTION_BUSY = 2
+
+# geblend pad (path_add / path_run); wordt in de hoofdtaak afgespeeld
+path_segments = []
+path_active = False
+path_abort = False
+
+# force_move afbreken (abort via telemetrie, of stop)
+force_abort = False
+
+# opgeslagen programma's (prog_begin / prog_add / prog_end / prog_run)
+# programs[naam] = lijst met stappen; blijft staan tot de controller herstart
+programs = {}
+upload_name = ""
+upload_steps = []
+prog_name = ""
+prog_step = 0
+prog_state = "idle"
+prog_active = False
+prog_abort = False
+
+# commando-socket van de host. Paden en programma's draaien in de hoofdtaak
+# (DRL staat bewegingen alleen daar toe); wat er intussen binnenkomt bewaart
+# poll_command_socket in cmd_pending voor serve_client.
+cmd_sock = None
+cmd_pending = ""
+cmd_lost = False
+
+# voortgangsevents van programma's; gaan mee in de telemetriestream
+prog_events = []
+prog_event_seq = 0
+PROG_EVENT_KEEP = 100
+
+# feeder: DO pulsen zolang de buffer-DI's niet allemaal hoog zijn, in een
+# DRL-thread naast de beweging (feeder_start / feeder_stop)
+feeder_active = False
+feeder_thread = False
+feeder_do = 0
+feeder_mask = 0
+feeder_on_s = 0.5
+feeder_off_s = 0.1
+# hoe vaak de feeder een volle buffer opnieuw controleert
+FEEDER_IDLE_STEP = 0.05
+
+# stapgrootte waarmee wait_motion / wait_digin de status op de controller checken
+WAIT_MOTION_STEP = 0.01
+
+# aantal digitale in- en uitgangen (1..16) in de bitmaskers
+NUM_DIO = 16
+
+# laatst gezette snelheid/versnelling; None = onbekend (na herstart of
+# nieuwe verbinding)
+cur_velx = None
+cur_accx = None
+cur_velj = None
+cur_accj = None
 
 def parse_floats(tokens, start_idx, count):
     vals = []
@@ -6,6 +83,23 @@ def parse_floats(tokens, start_idx, count):
         vals.append(float(tokens[start_idx + i]))
     return vals
 
+def set_motion_params(velx, accx, velj, accj):
+    # Zet alleen wat echt wijzigt; de meeste moves in een sequence gebruiken
+    # dezelfde waardes. None = niet aanraken.
+    global cur_velx, cur_accx, cur_velj, cur_accj
+    if velx is not None and velx != cur_velx:
+        set_velx(velx)
+        cur_velx = velx
+    if accx is not None and accx != cur_accx:
+        set_accx(accx)
+        cur_accx = accx
+    if velj is not None and velj != cur_velj:
+        set_velj(velj)
+        cur_velj = velj
+    if accj is not None and accj != cur_accj:
+        set_accj(accj)
+        cur_accj = accj
+
 def all_outputs_off():
     # Zet DO1 t/m DO4 laag
     try:
@@ -14,9 +108,399 @@ def all_outputs_off():
         set_digital_output(3, 0)
         set_digital_output(4, 0)
     except Exception as e:
-        server_socket_write(sock, b"OK amovel\n")
+        tp_log("Fout bij alle outputs uitzetten")
+
+def read_digin_mask():
+    # bit (i-1) = DI i
+    mask = 0
+    for i in range(1, NUM_DIO + 1):
+        if get_digital_input(i) == 1:
+            mask |= 1 << (i - 1)
+    return mask
+
+def digin_matches(di, mask, pattern, mode):
+    # "all": elk bit uit mask gelijk aan pattern; "any": minstens één
+    same = ~(di ^ pattern) & mask
+    if mode == "any":
+        return same != 0
+    return same == mask
+
+def block_until_digin(mask, pattern, mode, timeout):
+    # wacht lokaal tot de DI's overeenkomen; timeout < 0 = oneindig
+    # geeft (1=match/0=timeout, DI-masker) terug
+    waited = 0.0
+    di = read_digin_mask()
+    while not digin_matches(di, mask, pattern, mode):
+        if timeout >= 0 and waited >= timeout:
+            return 0, di
+        wait(WAIT_MOTION_STEP)
+        waited += WAIT_MOTION_STEP
+        di = read_digin_mask()
+    return 1, di
+
+def read_digout_mask():
+    # bit (i-1) = DO i
+    mask = 0
+    for i in range(1, NUM_DIO + 1):
+        if get_digital_output(i) == 1:
+            mask |= 1 << (i - 1)
+    return mask
+
+def tool_force_total(ref):
+    # DRL-call: get_tool_force(ref) -> lijst/vector met 6 waardes
+    # we sturen de norm van de krachtcomponenten (totale kracht)
+    f = get_tool_force(ref)
+    fx = f[0]
+    fy = f[1]
+    fz = f[2]
+    return (fx*fx + fy*fy + fz*fz) ** 0.5
+
+def stream_sample(fields, seq):
+    # STREAM <seq> motion=0 force=1.234 pose=x,y,z,rx,ry,rz di=<mask> do=<mask>
+    parts = ["STREAM", str(seq)]
+    for field in fields:
+        if field == "motion":
+            parts.append("motion={}".format(int(motion_state())))
+        elif field == "force":
+            parts.append("force={:.3f}".format(tool_force_total(0)))
+        elif field == "pose":
+            cur_posx, sol = get_current_posx()
+            vals = []
+            for i in range(6):
+                vals.append("{:.3f}".format(cur_posx[i]))
+            parts.append("pose=" + ",".join(vals))
+        elif field == "di":
+            parts.append("di={}".format(int(read_digin_mask())))
+        elif field == "do":
+            parts.append("do={}".format(int(read_digout_mask())))
+    return " ".join(parts) + "\n"
+
+def stream_telemetry(sock, rate_hz, fields, allowed):
+    # Pusht samples tot de client 'unsubscribe' of 'quit' stuurt of wegvalt.
+    # De wachttijd tussen samples is een read met timeout, zodat commando's
+    # van de client (bijv. 'status') tussendoor gewoon beantwoord worden.
+    period = 1.0 / rate_hz
+    seq = 0
+    rxbuf = ""
+    # alleen events van na het subscriben doorsturen
+    last_event = prog_event_seq
+    while True:
+        try:
+            msg = stream_sample(fields, seq)
+        except:
+            msg = "STREAM {} error\n".format(seq)
+        for ev in prog_events:
+            if ev[0] > last_event:
+                msg += ev[1]
+                last_event = ev[0]
+        if server_socket_write(sock, msg.encode()) < 0:
+            return
+        seq += 1
+
+        res, rxdata = server_socket_read(sock, -1, period)
+        if res == SOCKET_READ_TIMEOUT:
+            continue
+        if res <= 0:
+            return
+
+        try:
+            rxbuf += rxdata.decode()
+        except:
+            server_socket_write(sock, b"ERR decode\n")
+            continue
+        lines = rxbuf.split("\n")
+        rxbuf = lines.pop()
+        for line in lines:
+            line = line.strip()
+            if line == "":
+                continue
+            cmd = line.split()[0].lower()
+            if cmd == "unsubscribe":
+                server_socket_write(sock, b"OK unsubscribe\n")
+                return
+            if cmd == "quit":
+                server_socket_write(sock, b"OK bye then\n")
+                return
+            if cmd not in allowed:
+                server_socket_write(sock, b"ERR command not allowed on this channel\n")
+                continue
+            handle_command(sock, line)
+
+def force_guarded_move(target, vel, acc, force_limit, retract_mm, contact_do):
+    # Lineaire beweging die op de controller zelf afgebroken wordt zodra de
+    # totale toolforce de limiet haalt. Geeft (contact, pose bij stoppen) terug;
+    # contact = 2 als force_abort gezet is (abort/stop): dan geen DO en niet
+    # terugtrekken.
+    global force_abort
+    force_abort = False
+    start, sol = get_current_posx()
+    dirv = [target[0] - start[0], target[1] - start[1], target[2] - start[2]]
+    length = (dirv[0]*dirv[0] + dirv[1]*dirv[1] + dirv[2]*dirv[2]) ** 0.5
+    if length > 0:
+        dirv = [dirv[0] / length, dirv[1] / length, dirv[2] / length]
+
+    set_motion_params(vel, acc, None, None)
+    amovel(target)
+
+    contact = 0
+    while check_motion() != 0:
+        poll_command_socket()
+        if force_abort:
+            stop(DR_SSTOP)
+            contact = 2
+            break
+        if tool_force_total(0) >= force_limit:
+            stop(DR_QSTOP)
+            contact = 1
+            break
+        wait(WAIT_MOTION_STEP)
+    block_until_stopped(-1.0)
+    # de abort kan de beweging al gestopt hebben voordat de lus hem zag
+    if force_abort:
+        contact = 2
+
+    cur_posx, sol = get_current_posx()
+    pose = []
+    for i in range(6):
+        pose.append(cur_posx[i])
+
+    if contact == 1:
+        if contact_do > 0:
+            set_digital_output(contact_do, 1)
+        if retract_mm > 0:
+            # terug langs de bewegingsas, blokkerend
+            retract = [
+                pose[0] - dirv[0] * retract_mm,
+                pose[1] - dirv[1] * retract_mm,
+                pose[2] - dirv[2] * retract_mm,
+                pose[3], pose[4], pose[5]
+            ]
+            movel(retract)
+    return contact, pose
+
+def handle_subscribe(sock, tokens, allowed):
+    # SUBSCRIBE rate_hz field,field,... -> OK subscribe, daarna STREAM-regels
+    if allowed is None:
+        server_socket_write(sock, b"ERR subscribe only on telemetry channel\n")
+        return
+    if len(tokens) != 3:
+        server_socket_write(sock, b"ERR subscribe needs 2 args\n")
+        return
+    try:
+        rate_hz = float(tokens[1])
+        fields = tokens[2].lower().split(",")
+    except:
+        server_socket_write(sock, b"ERR subscribe invalid args\n")
+        return
+    if rate_hz <= 0 or rate_hz > STREAM_MAX_RATE_HZ:
+        server_socket_write(sock, b"ERR subscribe rate out of range\n")
+        return
+    for field in fields:
+        if field not in STREAM_FIELDS:
+            server_socket_write(sock, b"ERR subscribe unknown field\n")
+            return
+    server_socket_write(sock, b"OK subscribe\n")
+    stream_telemetry(sock, rate_hz, fields, allowed)
+
+def motion_state():
+    # check_motion, maar ook 'bezig' zolang een geblend pad of programma loopt
+    mv = check_motion()
+    if mv == 0 and (path_active or prog_active):
+        return MOTION_BUSY
+    return mv
+
+def poll_command_socket():
+    # Tijdens een pad of programma leest serve_client niet. Tussen twee stappen
+    # kijken we hier of de host weg is of 'stop'/'quit' stuurde; dat breekt
+    # pad, programma en force_move af. Alle regels blijven in cmd_pending staan.
+    global cmd_pending, cmd_lost, path_abort, prog_abort, force_abort
+    if cmd_sock is None or cmd_lost:
+        return
+    res, rxdata = server_socket_read(cmd_sock, -1, SOCKET_POLL_TIMEOUT)
+    if res == SOCKET_READ_TIMEOUT:
+        return
+    if res <= 0:
+        cmd_lost = True
+        path_abort = True
+        prog_abort = True
+        force_abort = True
+        return
+    try:
+        cmd_pending += rxdata.decode()
+    except:
+        return
+    lines = cmd_pending.split("\n")
+    for i in range(len(lines) - 1):
+        word = lines[i].strip().lower()
+        if word == "stop" or word == "quit":
+            path_abort = True
+            prog_abort = True
+            force_abort = True
+
+def run_path():
+    # Speelt path_segments af met blokkerende movel/movej, in de hoofdtaak.
+    # Met radius > 0 keert de call terug zodra het blenden begint, zodat het
+    # volgende segment er vloeiend op aansluit. Het laatste punt is altijd
+    # exact. Afbreken (abort, stop, host weg) gebeurt tussen twee segmenten.
+    global path_active
+    n = len(path_segments)
+    for i in range(n):
+        poll_command_socket()
+        if path_abort:
+            stop(DR_SSTOP)
+            break
+        kind, pos, vel, acc, radius = path_segments[i]
+        if i == n - 1:
+            radius = 0
+        try:
+            if kind == "L":
+                movel(posx(pos[0], pos[1], pos[2], pos[3], pos[4], pos[5]), vel=vel, acc=acc, radius=radius)
+            else:
+                movej(posj(pos[0], pos[1], pos[2], pos[3], pos[4], pos[5]), vel=vel, acc=acc, radius=radius)
+        except:
+            tp_log("error in path segment")
+            break
+    path_active = False
+
+def emit_prog_event(text):
+    # EVENT <seq> <naam> <start|step|done|aborted|error> <stap> <info>
+    # de stream stuurt alles met seq > laatst verstuurd
+    global prog_events, prog_event_seq
+    prog_event_seq += 1
+    prog_events.append([prog_event_seq, "EVENT {} {}\n".format(prog_event_seq, text)])
+    if len(prog_events) > PROG_EVENT_KEEP:
+        prog_events = prog_events[-PROG_EVENT_KEEP:]
+
+def parse_prog_step(tokens):
+    # L|J v1..v6 vel acc radius / DO idx val / WAIT s / WAITDI idx val timeout
+    kind = tokens[0].upper()
+    if kind == "L" or kind == "J":
+        if len(tokens) != 10:
+            return None
+        vals = parse_floats(tokens, 1, 9)
+        return [kind, vals[0:6], vals[6], vals[7], vals[8]]
+    if kind == "DO":
+        if len(tokens) != 3:
+            return None
+        return [kind, int(tokens[1]), int(tokens[2])]
+    if kind == "WAIT":
+        if len(tokens) != 2:
+            return None
+        return [kind, float(tokens[1])]
+    if kind == "WAITDI":
+        if len(tokens) != 4:
+            return None
+        return [kind, int(tokens[1]), int(tokens[2]), float(tokens[3])]
+    return None
+
+def run_program():
+    # Speelt programs[prog_name] af in de hoofdtaak, net als run_path. Een
+    # beweging blendt alleen als de volgende stap ook een beweging is; voor
+    # een DO of wacht staat de robot dus altijd exact op zijn punt.
+    global prog_active, prog_step, prog_state
+    steps = programs[prog_name]
+    n = len(steps)
+    emit_prog_event("{} start 0 {}".format(prog_name, n))
+    result = "done"
+    for i in range(n):
+        poll_command_socket()
+        if prog_abort:
+            stop(DR_SSTOP)
+            result = "aborted"
+            break
+        prog_step = i
+        step = steps[i]
+        kind = step[0]
+        emit_prog_event("{} step {} {}".format(prog_name, i, kind))
+        try:
+            if kind == "L" or kind == "J":
+                pos = step[1]
+                radius = step[4]
+                if i == n - 1 or (steps[i + 1][0] != "L" and steps[i + 1][0] != "J"):
+                    radius = 0
+                if kind == "L":
+                    movel(posx(pos[0], pos[1], pos[2], pos[3], pos[4], pos[5]), vel=step[2], acc=step[3], radius=radius)
+                else:
+                    movej(posj(pos[0], pos[1], pos[2], pos[3], pos[4], pos[5]), vel=step[2], acc=step[3], radius=radius)
+            elif kind == "DO":
+                # de beweging ervoor had radius 0 en is dus al klaar
+                set_digital_output(step[1], step[2])
+            elif kind == "WAIT":
+                waited = 0.0
+                while waited < step[1] and not prog_abort:
+                    wait(WAIT_MOTION_STEP)
+                    waited += WAIT_MOTION_STEP
+                    poll_command_socket()
+            elif kind == "WAITDI":
+                waited = 0.0
+                while get_digital_input(step[1]) != step[2]:
+                    if prog_abort:
+                        break
+                    if step[3] >= 0 and waited >= step[3]:
+                        raise Exception("waitdi timeout")
+                    wait(WAIT_MOTION_STEP)
+                    waited += WAIT_MOTION_STEP
+                    poll_command_socket()
+        except:
+            tp_log("error in program step")
+            result = "error"
+            break
+    if result == "done" and prog_abort:
+        result = "aborted"
+    prog_state = result
+    prog_active = False
+    emit_prog_event("{} {} {} -".format(prog_name, result, prog_step))
+
+def block_until_stopped(timeout):
+    # wacht lokaal op de controller tot de beweging klaar is; timeout < 0 = oneindig
+    waited = 0.0
+    mv = motion_state()
+    while mv != 0:
+        if timeout >= 0 and waited >= timeout:
+            break
+        wait(WAIT_MOTION_STEP)
+        waited += WAIT_MOTION_STEP
+        mv = motion_state()
+    return mv
+
+def run_feeder():
+    # Draait vanaf de eerste feeder_start tot de controller herstart; pulst
+    # alleen zolang feeder_active en de buffer niet vol is. Een puls stopt
+    # vroeg zodra de buffer vol raakt.
+    while True:
+        if not feeder_active or digin_matches(read_digin_mask(), feeder_mask, feeder_mask, "all"):
+            wait(FEEDER_IDLE_STEP)
+            continue
+        do = feeder_do
+        try:
+            set_digital_output(do, 1)
+            block_until_digin(feeder_mask, feeder_mask, "all", feeder_on_s)
+            set_digital_output(do, 0)
+        except:
+            tp_log("error in feeder pulse")
+        wait(feeder_off_s)
+
+def feeder_off():
+    # feeder stoppen en zijn DO laag; een puls die al loopt eindigt zelf ook laag
+    global feeder_active
+    feeder_active = False
+    if feeder_do > 0:
+        set_digital_output(feeder_do, 0)
+
+def stop_from_telemetry():
+    # Direct stoppen vanuit de telemetriethread. Lukt dat niet, dan stopt de
+    # hoofdtaak zelf zodra hij de abort-vlag ziet (tussen twee stappen).
+    try:
+        stop(DR_SSTOP)
+    except:
+        tp_log("stop from telemetry thread failed")
 
 def handle_command(sock, line):
+    global path_segments, path_active, path_abort
+    global upload_name, upload_steps, prog_name, prog_step, prog_state, prog_active, prog_abort
+    global feeder_active, feeder_thread, feeder_do, feeder_mask, feeder_on_s, feeder_off_s
+    global force_abort
+
     tokens = line.split()
     if len(tokens) == 0:
         return
@@ -32,10 +516,7 @@ def handle_command(sock, line):
         x, y, z, rx, ry, rz, vel, acc = vals
         target = [x, y, z, rx, ry, rz]
 
-        set_velj(vel)
-        set_accj(acc)
-        set_velx(vel)
-        set_accx(acc)
+        set_motion_params(vel, acc, vel, acc)
 
         amovel(target)
         server_socket_write(sock, b"OK amovel\n")
@@ -44,15 +525,14 @@ def handle_command(sock, line):
     if cmd == "amovej":
         # verwacht: amovej j1 j2 j3 j4 j5 j6 vel acc
         if len(tokens) != 9:
-            server_socket_write(sock, b"ERR amovej needs 8 args")
+            server_socket_write(sock, b"ERR amovej needs 8 args\n")
             return
         vals = parse_floats(tokens, 1, 8)
         j1, j2, j3, j4, j5, j6, vel, acc = vals
         target = [j1, j2, j3, j4, j5, j6]  # posj
-        set_velj(vel)
-        set_accj(acc)
+        set_motion_params(None, None, vel, acc)
         amovej(target)
-        server_socket_write(sock, b"OK amovej")
+        server_socket_write(sock, b"OK amovej\n")
         return
 
 
@@ -65,10 +545,7 @@ def handle_command(sock, line):
         x, y, z, rx, ry, rz, vel, acc = vals
         target = [x, y, z, rx, ry, rz]
 
-        set_velj(vel)
-        set_accj(acc)
-        set_velx(vel)
-        set_accx(acc)
+        set_motion_params(vel, acc, vel, acc)
 
         amovejx(target)
         server_socket_write(sock, b"OK amovejx\n")
@@ -104,6 +581,44 @@ def handle_command(sock, line):
             server_socket_write(sock, b"ERR digin invalid args\n")
         return
 
+    # DIGIN_ALL -> OK digin_all <mask>  (bit 0 = DI1)
+    if cmd == "digin_all":
+        if len(tokens) != 1:
+            server_socket_write(sock, b"ERR digin_all takes no args\n")
+            return
+        try:
+            msg = "OK digin_all {}\n".format(int(read_digin_mask()))
+            server_socket_write(sock, msg.encode())
+        except:
+            server_socket_write(sock, b"ERR digin_all invalid\n")
+        return
+
+    # DIGOUT_MASK mask values -> OK digout_mask <do_mask>
+    # alleen de DO's waarvan het bit in mask staat worden gezet, in één DRL-call
+    if cmd == "digout_mask":
+        if len(tokens) != 3:
+            server_socket_write(sock, b"ERR digout_mask needs 2 args\n")
+            return
+        try:
+            mask = int(tokens[1])
+            values = int(tokens[2])
+            bit_list = []
+            for i in range(1, NUM_DIO + 1):
+                bit = 1 << (i - 1)
+                if mask & bit:
+                    # DRL: positief = aan, negatief = uit
+                    if values & bit:
+                        bit_list.append(i)
+                    else:
+                        bit_list.append(-i)
+            if len(bit_list) > 0:
+                set_digital_outputs(bit_list)
+            msg = "OK digout_mask {}\n".format(int(read_digout_mask()))
+            server_socket_write(sock, msg.encode())
+        except:
+            server_socket_write(sock, b"ERR digout_mask invalid args\n")
+        return
+
     # ANOUT ch value (bijv. 0..1, 0.0..10.0, afhankelijk van je config)
     if cmd == "anout":
         if len(tokens) != 3:
@@ -136,10 +651,221 @@ def handle_command(sock, line):
 
 
     if cmd == "stop":
+        # een lopend geblend pad of programma mag na de stop niet doorgaan
+        # met de volgende stap
+        path_abort = True
+        prog_abort = True
+        force_abort = True
         stop(DR_SSTOP)
+        feeder_off()
         server_socket_write(sock, b"OK stop\n")
         return
 
+    # PATH_CLEAR -> OK path_clear
+    if cmd == "path_clear":
+        if path_active:
+            server_socket_write(sock, b"ERR path running\n")
+            return
+        path_segments = []
+        server_socket_write(sock, b"OK path_clear\n")
+        return
+
+    # PATH_ADD L|J v1 v2 v3 v4 v5 v6 vel acc radius -> OK path_add <aantal segmenten>
+    if cmd == "path_add":
+        if len(tokens) != 11:
+            server_socket_write(sock, b"ERR path_add needs 10 args\n")
+            return
+        if path_active:
+            server_socket_write(sock, b"ERR path running\n")
+            return
+        kind = tokens[1].upper()
+        if kind != "L" and kind != "J":
+            server_socket_write(sock, b"ERR path_add type must be L or J\n")
+            return
+        try:
+            vals = parse_floats(tokens, 2, 9)
+        except:
+            server_socket_write(sock, b"ERR path_add invalid args\n")
+            return
+        path_segments.append([kind, vals[0:6], vals[6], vals[7], vals[8]])
+        msg = "OK path_add {}\n".format(len(path_segments))
+        server_socket_write(sock, msg.encode())
+        return
+
+    # PATH_RUN n -> OK path_run <n>; afwachten met wait_motion, afbreken via
+    # abort op het telemetriekanaal
+    # n moet gelijk zijn aan het aantal segmenten, zodat een half geupload
+    # pad (een path_add die faalde) nooit gestart wordt
+    if cmd == "path_run":
+        if len(tokens) != 2:
+            server_socket_write(sock, b"ERR path_run needs 1 arg\n")
+            return
+        if path_active:
+            server_socket_write(sock, b"ERR path running\n")
+            return
+        try:
+            expected = int(tokens[1])
+        except:
+            server_socket_write(sock, b"ERR path_run invalid args\n")
+            return
+        if len(path_segments) == 0 or len(path_segments) != expected:
+            server_socket_write(sock, b"ERR path incomplete\n")
+            return
+        path_abort = False
+        path_active = True
+        # eerst antwoorden, dan afspelen; een wait_motion van de host wordt
+        # beantwoord zodra het pad klaar is
+        msg = "OK path_run {}\n".format(len(path_segments))
+        server_socket_write(sock, msg.encode())
+        run_path()
+        return
+
+    # PROG_BEGIN naam -> OK prog_begin; daarna prog_add per stap
+    if cmd == "prog_begin":
+        if len(tokens) != 2:
+            server_socket_write(sock, b"ERR prog_begin needs 1 arg\n")
+            return
+        upload_name = tokens[1]
+        upload_steps = []
+        server_socket_write(sock, b"OK prog_begin\n")
+        return
+
+    # PROG_ADD <stap> -> OK prog_add <aantal stappen>  (zie parse_prog_step)
+    if cmd == "prog_add":
+        if upload_name == "":
+            server_socket_write(sock, b"ERR prog_add without prog_begin\n")
+            return
+        try:
+            step = parse_prog_step(tokens[1:])
+        except:
+            step = None
+        if step is None:
+            # upload ongeldig maken: prog_end slaagt dan nooit
+            upload_name = ""
+            server_socket_write(sock, b"ERR prog_add invalid step\n")
+            return
+        upload_steps.append(step)
+        msg = "OK prog_add {}\n".format(len(upload_steps))
+        server_socket_write(sock, msg.encode())
+        return
+
+    # PROG_END naam n -> OK prog_end <naam> <n>; alleen opslaan als alle n stappen binnen zijn
+    if cmd == "prog_end":
+        if len(tokens) != 3:
+            server_socket_write(sock, b"ERR prog_end needs 2 args\n")
+            return
+        try:
+            expected = int(tokens[2])
+        except:
+            server_socket_write(sock, b"ERR prog_end invalid args\n")
+            return
+        if tokens[1] != upload_name or len(upload_steps) != expected or expected == 0:
+            upload_name = ""
+            server_socket_write(sock, b"ERR program incomplete\n")
+            return
+        if prog_active and prog_name == upload_name:
+            server_socket_write(sock, b"ERR program running\n")
+            return
+        programs[upload_name] = upload_steps
+        msg = "OK prog_end {} {}\n".format(upload_name, len(upload_steps))
+        upload_name = ""
+        upload_steps = []
+        server_socket_write(sock, msg.encode())
+        return
+
+    # PROG_RUN naam -> OK prog_run <naam> <n>; voortgang via EVENT-regels in de stream
+    if cmd == "prog_run":
+        if len(tokens) != 2:
+            server_socket_write(sock, b"ERR prog_run needs 1 arg\n")
+            return
+        if prog_active or path_active:
+            server_socket_write(sock, b"ERR program running\n")
+            return
+        if tokens[1] not in programs:
+            server_socket_write(sock, b"ERR unknown program\n")
+            return
+        prog_name = tokens[1]
+        prog_step = 0
+        prog_state = "running"
+        prog_abort = False
+        prog_active = True
+        # voortgang gaat via de telemetriestream; de commando-poort is bezet
+        # tot het programma klaar is
+        msg = "OK prog_run {} {}\n".format(prog_name, len(programs[prog_name]))
+        server_socket_write(sock, msg.encode())
+        run_program()
+        return
+
+    # PROG_STATE -> OK prog_state <naam|-> <stap> <running|done|aborted|error|idle>
+    if cmd == "prog_state":
+        name = prog_name
+        if name == "":
+            name = "-"
+        msg = "OK prog_state {} {} {}\n".format(name, int(prog_step), prog_state)
+        server_socket_write(sock, msg.encode())
+        return
+
+    # PROG_ABORT -> OK prog_abort; stopt de robot en het lopende programma
+    if cmd == "prog_abort":
+        prog_abort = True
+        stop_from_telemetry()
+        server_socket_write(sock, b"OK prog_abort\n")
+        return
+
+    # ABORT -> OK abort; breekt een lopende force_move, pad of programma af.
+    # Via het telemetriekanaal: de commando-poort zit dan vast in force_move.
+    if cmd == "abort":
+        force_abort = True
+        path_abort = True
+        prog_abort = True
+        stop_from_telemetry()
+        server_socket_write(sock, b"OK abort\n")
+        return
+
+    # FEEDER_START do di_mask on_s off_s -> OK feeder_start
+    # pulst DO do (on_s aan / off_s uit) tot alle DI's uit di_mask hoog zijn,
+    # en weer zodra er een laag wordt; loopt door tot feeder_stop of stop
+    if cmd == "feeder_start":
+        if len(tokens) != 5:
+            server_socket_write(sock, b"ERR feeder_start needs 4 args\n")
+            return
+        try:
+            do = int(tokens[1])
+            mask = int(tokens[2])
+            on_s = float(tokens[3])
+            off_s = float(tokens[4])
+        except:
+            server_socket_write(sock, b"ERR feeder_start invalid args\n")
+            return
+        if do < 1 or do > NUM_DIO or mask == 0 or on_s <= 0 or off_s < 0:
+            server_socket_write(sock, b"ERR feeder_start invalid args\n")
+            return
+        if feeder_active and feeder_do != do:
+            set_digital_output(feeder_do, 0)
+        feeder_do = do
+        feeder_mask = mask
+        feeder_on_s = on_s
+        feeder_off_s = off_s
+        feeder_active = True
+        if not feeder_thread:
+            feeder_thread = True
+            thread_run(run_feeder, loop=False)
+        server_socket_write(sock, b"OK feeder_start\n")
+        return
+
+    # FEEDER_STOP -> OK feeder_stop; DO van de feeder gaat laag
+    if cmd == "feeder_stop":
+        feeder_off()
+        server_socket_write(sock, b"OK feeder_stop\n")
+        return
+
+    # FEEDER_STATE -> OK feeder_state <actief 0/1> <do> <di_mask> <vol 0/1>
+    if cmd == "feeder_state":
+        full = digin_matches(read_digin_mask(), feeder_mask, feeder_mask, "all") and feeder_mask != 0
+        msg = "OK feeder_state {} {} {} {}\n".format(int(feeder_active), int(feeder_do), int(feeder_mask), int(full))
+        server_socket_write(sock, msg.encode())
+        return
+
     if cmd == "change_operation_speed":
         if len(tokens) != 2:
             server_socket_write(sock, b"ERR change_operation_speed needs 1 arg\n")
@@ -154,7 +880,7 @@ def handle_command(sock, line):
             server_socket_write(sock, b"ERR set_velx needs 1 arg\n")
             return
         vel = int(float(tokens[1]))
-        set_velx(vel)
+        set_motion_params(vel, None, None, None)
         server_socket_write(sock, b"OK set_velx\n")
         return
 
@@ -163,7 +889,7 @@ def handle_command(sock, line):
             server_socket_write(sock, b"ERR set_velj needs 1 arg\n")
             return
         vel = int(float(tokens[1]))
-        set_velj(vel)
+        set_motion_params(None, None, vel, None)
         server_socket_write(sock, b"OK set_velj\n")
         return
 
@@ -172,7 +898,7 @@ def handle_command(sock, line):
             server_socket_write(sock, b"ERR set_accx needs 1 arg\n")
             return
         acc = int(float(tokens[1]))
-        set_accx(acc)
+        set_motion_params(None, acc, None, None)
         server_socket_write(sock, b"OK set_accx\n")
         return
 
@@ -181,35 +907,94 @@ def handle_command(sock, line):
             server_socket_write(sock, b"ERR set_accj needs 1 arg\n")
             return
         acc = int(float(tokens[1]))
-        set_accj(acc)
+        set_motion_params(None, None, None, acc)
         server_socket_write(sock, b"OK set_accj\n")
         return
 
     if cmd == "check_motion":
-        mv = check_motion()
+        mv = motion_state()
         msg = "OK check_motion {}\n".format(int(mv))
         server_socket_write(sock, msg.encode())
         return
 
+    # FORCE_MOVE x y z rx ry rz vel acc force_limit retract_mm [contact_do]
+    # -> OK force_move <1=contact/0=doel bereikt/2=afgebroken> <x> <y> <z> <rx> <ry> <rz>
+    if cmd == "force_move":
+        if len(tokens) != 11 and len(tokens) != 12:
+            server_socket_write(sock, b"ERR force_move needs 10 or 11 args\n")
+            return
+        try:
+            vals = parse_floats(tokens, 1, 10)
+            x, y, z, rx, ry, rz, vel, acc, force_limit, retract_mm = vals
+            contact_do = 0
+            if len(tokens) == 12:
+                contact_do = int(tokens[11])
+        except:
+            server_socket_write(sock, b"ERR force_move invalid args\n")
+            return
+        try:
+            contact, pose = force_guarded_move(
+                [x, y, z, rx, ry, rz], vel, acc, force_limit, retract_mm, contact_do
+            )
+            msg = "OK force_move {} {:.3f} {:.3f} {:.3f} {:.3f} {:.3f} {:.3f}\n".format(
+                int(contact), pose[0], pose[1], pose[2], pose[3], pose[4], pose[5]
+            )
+            server_socket_write(sock, msg.encode())
+        except:
+            server_socket_write(sock, b"ERR force_move failed\n")
+        return
+
+    # WAIT_MOTION [timeout] -> OK wait_motion <0/...>  (0 = stil, anders timeout verlopen)
+    if cmd == "wait_motion":
+        if len(tokens) > 2:
+            server_socket_write(sock, b"ERR wait_motion takes at most 1 arg\n")
+            return
+        try:
+            timeout = -1.0
+            if len(tokens) == 2:
+                timeout = float(tokens[1])
+            mv = block_until_stopped(timeout)
+            msg = "OK wait_motion {}\n".format(int(mv))
+            server_socket_write(sock, msg.encode())
+        except:
+            server_socket_write(sock, b"ERR wait_motion invalid args\n")
+        return
+
+    # WAIT_DIGIN mask pattern timeout [all|any] -> OK wait_digin <1=match/0=timeout> <di_mask>
+    # blokkeert tot de DI's uit mask gelijk zijn aan pattern (bit 0 = DI1)
+    if cmd == "wait_digin":
+        if len(tokens) != 4 and len(tokens) != 5:
+            server_socket_write(sock, b"ERR wait_digin needs 3 or 4 args\n")
+            return
+        try:
+            mask = int(tokens[1])
+            pattern = int(tokens[2])
+            timeout = float(tokens[3])
+            mode = "all"
+            if len(tokens) == 5:
+                mode = tokens[4].lower()
+            if mask == 0 or (mode != "all" and mode != "any"):
+                server_socket_write(sock, b"ERR wait_digin invalid args\n")
+                return
+            matched, di = block_until_digin(mask, pattern, mode, timeout)
+            msg = "OK wait_digin {} {}\n".format(int(matched), int(di))
+            server_socket_write(sock, msg.encode())
+        except:
+            server_socket_write(sock, b"ERR wait_digin invalid args\n")
+        return
+
     if cmd == "toolforce":
         # Verwacht: 'toolforce 0' of 'toolforce 1' (ref-frame)
         if len(tokens) != 2:
-            server_socket_write(sock, b"ERR toolforce needs 1 arg")
+            server_socket_write(sock, b"ERR toolforce needs 1 arg\n")
             return
         try:
             ref = int(tokens[1])
-            # DRL-call: get_tool_force(ref) -> lijst/vector met 6 waardes
-            f = get_tool_force(ref)
-            # Neem de norm (totale kracht) of bijv. f[0] als enkel component
-            # Stel dat je de norm wilt sturen:
-            fx = f[0]
-            fy = f[1]
-            fz = f[2]
-            total = (fx*fx + fy*fy + fz*fz) ** 0.5
-            msg = "OK toolforce {}".format(total)
+            total = tool_force_total(ref)
+            msg = "OK toolforce {}\n".format(total)
             server_socket_write(sock, msg.encode())
         except:
-            server_socket_write(sock, b"ERR toolforce invalid args")
+            server_socket_write(sock, b"ERR toolforce invalid args\n")
         return
 
     if cmd == "tcp_pose":
@@ -238,10 +1023,98 @@ def handle_command(sock, line):
             server_socket_write(sock, b"ERR tcppose invalid\n")
         return
 
+    # STATUS -> OK status <force> <x> <y> <z> <rx> <ry> <rz> <di_mask> <do_mask> <check_motion>
+    if cmd == "status":
+        if len(tokens) != 1:
+            server_socket_write(sock, b"ERR status takes no args\n")
+            return
+        try:
+            force = tool_force_total(0)
+            cur_posx, sol = get_current_posx()
+            di_mask = read_digin_mask()
+            do_mask = read_digout_mask()
+            mv = motion_state()
+            msg = "OK status {:.3f} {:.3f} {:.3f} {:.3f} {:.3f} {:.3f} {:.3f} {} {} {}\n".format(
+                force,
+                cur_posx[0], cur_posx[1], cur_posx[2],
+                cur_posx[3], cur_posx[4], cur_posx[5],
+                int(di_mask), int(do_mask), int(mv)
+            )
+            server_socket_write(sock, msg.encode())
+        except Exception:
+            server_socket_write(sock, b"ERR status invalid\n")
+        return
+
     server_socket_write(sock, b"ERR unknown command\n")
 
 
+def serve_client(sock, allowed):
+    # Verwerkt regels van één client tot die 'quit' stuurt of wegvalt.
+    # allowed = None: alle commando's (de commando-poort), anders alleen de genoemde.
+    # Geeft True terug bij 'quit', False bij verbroken verbinding.
+    global cmd_sock, cmd_pending, cmd_lost
+    if allowed is None:
+        cmd_sock = sock
+        cmd_pending = ""
+        cmd_lost = False
+
+    # bytes van een half ontvangen regel blijven staan tot de rest binnen is
+    rxbuf = ""
+    while True:
+        if allowed is None and cmd_pending != "":
+            # binnengekomen tijdens een pad of programma
+            text = cmd_pending
+            cmd_pending = ""
+        elif allowed is None and cmd_lost:
+            return False
+        else:
+            res, rxdata = server_socket_read(sock, -1, -1)
+            if res <= 0:
+                return False
+
+            try:
+                text = rxdata.decode()
+            except:
+                server_socket_write(sock, b"ERR decode\n")
+                continue
+
+        rxbuf += text
+        lines = rxbuf.split("\n")
+        rxbuf = lines.pop()
+        for line in lines:
+            line = line.strip()
+            if line == "":
+                continue
+            if line.lower() == "quit":
+                server_socket_write(sock, b"OK bye then\n")
+                return True
+            tokens = line.split()
+            if tokens[0].lower() == "subscribe":
+                handle_subscribe(sock, tokens, allowed)
+                continue
+            if allowed is not None and tokens[0].lower() not in allowed:
+                server_socket_write(sock, b"ERR command not allowed on this channel\n")
+                continue
+            handle_command(sock, line)
+
+def telemetry_server():
+    # Tweede poort alleen voor uitlezen, zodat statusvragen van de host
+    # nooit in de rij staan voor bewegingscommando's op PORT.
+    while True:
+        tsock = server_socket_open(TELEMETRY_PORT)
+        tp_log("telemetry connected")
+        serve_client(tsock, TELEMETRY_COMMANDS)
+        # telemetrie wegvallen stopt de robot niet
+        try:
+            server_socket_close(tsock)
+        except:
+            tp_log("error while closing telemetry socket")
+
 def main():
+    global path_abort, prog_abort, force_abort, cmd_sock
+    global cur_velx, cur_accx, cur_velj, cur_accj
+    thread_run(telemetry_server, loop=False)
+
     while True:
         try:
             blue_pressed = get_digital_input(3)
@@ -260,44 +1133,38 @@ def main():
         sock = server_socket_open(PORT)
         tp_log("connected")
 
-        while True:
-            res, rxdata = server_socket_read(sock, -1, -1)
-            if res <= 0:
-                tp_log("client disconnected or error, stopping robot and closing socket")
-                try:
-                    stop(DR_SSTOP)
-                except:
-                    tp_log("error while stopping robot after disconnect")
-                try:
-                    server_socket_close(sock)
-                except:
-                    tp_log("error while closing socket after disconnect")
-                break
+        # nieuwe client: niet aannemen dat de vorige snelheden nog staan
+        # (zelfde idee als invalidate_shadow() op de host), dus de eerste
+        # set_motion_params zet ze allemaal opnieuw
+        cur_velx = None
+        cur_accx = None
+        cur_velj = None
+        cur_accj = None
 
-            try:
-                text = rxdata.decode()
-            except:
-                server_socket_write(sock, b"ERR decode\n")
-                continue
+        quit_requested = serve_client(sock, None)
+        if quit_requested:
+            tp_log("client quit, stopping robot and closing socket")
+        else:
+            tp_log("client disconnected or error, stopping robot and closing socket")
+
+        # robot ook netjes stoppen bij quit of wegvallen van de client; een
+        # lopend pad of programma mag daarna niet aan zijn volgende stap beginnen
+        path_abort = True
+        prog_abort = True
+        force_abort = True
+        try:
+            stop(DR_SSTOP)
+        except:
+            tp_log("error while stopping robot after disconnect")
+        try:
+            feeder_off()
+        except:
+            tp_log("error while stopping feeder after disconnect")
+        cmd_sock = None
+        try:
+            server_socket_close(sock)
+        except:
+            tp_log("error while closing socket after disconnect")
+        # terug naar outer loop: wacht op nieuwe client
 
-            lines = text.splitlines()
-            for line in lines:
-                line = line.strip()
-                if line == "":
-                    continue
-                if line.lower() == "quit":
-                    server_socket_write(sock, b"OK bye then\n")
-                    try:
-                        server_socket_close(sock)
-                    except:
-                        tp_log("error while closing socket after quit")
-                    # robot ook netjes stoppen bij quit
-                    try:
-                        stop(DR_SSTOP)
-                    except:
-                        tp_log("error while stopping robot after quit")
-                    # terug naar outer loop: wacht op nieuwe client
-                    break
-                handle_command(sock, line)
-
-main()
\ No newline at end of file
+main()
@@ -0,0 +1,1060 @@
+import math
+import time
+import queue
+import random
+import socket
+import select
+import argparse
+import threading
+
+# zelfde poorten als reciever_code.py
+PORT = 56666
+TELEMETRY_PORT = 56667
+
+TELEMETRY_COMMANDS = [
+    "check_motion", "toolforce", "tcp_pose", "digin", "digin_all", "anin", "status",
+    "prog_state", "prog_abort", "feeder_state", "abort"
+]
+STREAM_FIELDS = ["motion", "force", "pose", "di", "do"]
+STREAM_MAX_RATE_HZ = 100.0
+
+NUM_DIO = 16
+MOTION_BUSY = 2
+SIM_STEP = 0.002
+
+# DI's die standaard hoog zijn, zodat RobotProgram zonder hardware doorloopt:
+# DI1 groene knop, DI2 enable-schakelaar, DI13..16 buffers vol
+DEFAULT_DI_HIGH = (1, 2, 13, 14, 15, 16)
+
+
+def trapezoid_time(distance: float, vel: float, acc: float) -> float:
+    # duur van een beweging met trapeziumprofiel (of driehoek als vmax niet gehaald wordt)
+    if distance <= 0:
+        return 0.0
+    vel = max(vel, 1e-6)
+    acc = max(acc, 1e-6)
+    if distance >= vel * vel / acc:
+        return distance / vel + vel / acc
+    return 2.0 * math.sqrt(distance / acc)
+
+
+def trapezoid_fraction(t: float, distance: float, vel: float, acc: float) -> float:
+    # afgelegd deel (0..1) op tijdstip t
+    if distance <= 0:
+        return 1.0
+    vel = max(vel, 1e-6)
+    acc = max(acc, 1e-6)
+    total = trapezoid_time(distance, vel, acc)
+    if t >= total:
+        return 1.0
+    ta = vel / acc
+    if distance < vel * ta:
+        ta = math.sqrt(distance / acc)
+        vel = acc * ta
+    if t < ta:
+        s = 0.5 * acc * t * t
+    elif t < total - ta:
+        s = 0.5 * acc * ta * ta + vel * (t - ta)
+    else:
+        s = distance - 0.5 * acc * (total - t) ** 2
+    return max(0.0, min(1.0, s / distance))
+
+
+def contact_force(axis: int = 2, surface: float = 0.0, stiffness: float = 2.0, direction: float = 1.0):
+    # Krachtprofiel voor een vlak: 0 N tot de TCP voorbij 'surface' komt
+    # (in 'direction' langs as 'axis'), daarna stiffness N per mm.
+    def profile(pose) -> float:
+        return max(0.0, (pose[axis] - surface) * direction) * stiffness
+    return profile
+
+
+class _Motion:
+    """Eén beweging van start naar target met een trapeziumprofiel."""
+
+    def __init__(self, kind: str, start, target, vel: float, acc: float, cruise: bool = False,
+                 tcp_start=None, tcp_target=None):
+        self.kind = kind  # "L" beweegt de TCP, "J" de joints
+        self.start = list(start)
+        self.target = list(target)
+        # J-beweging naar een aangeleerde pose: TCP beweegt lineair mee
+        self.tcp_start = tcp_start
+        self.tcp_target = tcp_target
+        self.vel = vel
+        self.acc = acc
+        self.t0 = time.monotonic()
+        if kind == "L":
+            self.distance = math.dist(self.start[:3], self.target[:3])
+            if self.distance == 0:
+                self.distance = max(abs(a - b) for a, b in zip(self.start[3:], self.target[3:]))
+        else:
+            self.distance = max(abs(a - b) for a, b in zip(self.start, self.target))
+        # geblend doorloop-punt: geen af- en optrekken
+        self.cruise = cruise
+        if cruise:
+            self.duration = self.distance / max(vel, 1e-6)
+        else:
+            self.duration = trapezoid_time(self.distance, vel, acc)
+
+    def fraction(self, now: float) -> float:
+        t = now - self.t0
+        if self.cruise:
+            return 1.0 if self.duration <= 0 else min(1.0, t / self.duration)
+        return trapezoid_fraction(t, self.distance, self.vel, self.acc)
+
+    def pose_at(self, now: float) -> list[float]:
+        f = self.fraction(now)
+        return [a + (b - a) * f for a, b in zip(self.start, self.target)]
+
+    def tcp_at(self, now: float) -> list[float] | None:
+        if self.tcp_target is None:
+            return None
+        f = self.fraction(now)
+        return [a + (b - a) * f for a, b in zip(self.tcp_start, self.tcp_target)]
+
+    def done(self, now: float) -> bool:
+        return now - self.t0 >= self.duration
+
+
+class SimRobot:
+    """Toestand van de gesimuleerde robot: pose, beweging, I/O en kracht.
+
+    Het bewegingsmodel is puur tijdgebaseerd: een L-beweging interpoleert de
+    TCP-pose, een J-beweging de joints. Er is geen kinematica: de TCP beweegt
+    bij een J-beweging alleen mee als de doel-joints in taught_poses staan
+    (joints -> TCP-pose, bijv. de pj_/p_-paren uit coordinates.json).
+    change_operation_speed schaalt de snelheid in procenten.
+    """
+
+    def __init__(
+        self,
+        tcp_pose=(400.0, 0.0, 400.0, 0.0, 180.0, 0.0),
+        joints=(0.0, 0.0, 90.0, 0.0, 90.0, 0.0),
+        force_profile=None,
+        di_script=None,
+        di_high=DEFAULT_DI_HIGH,
+        taught_poses=None,
+    ):
+        self.lock = threading.RLock()
+        self.taught_poses = {self._joint_key(j): list(p) for j, p in (taught_poses or {}).items()}
+        self.tcp = list(tcp_pose)
+        self.joints = list(joints)
+        self.motion: _Motion | None = None
+
+        self.velx = 250.0
+        self.accx = 1000.0
+        self.velj = 60.0
+        self.accj = 100.0
+        self.speed_pct = 100.0
+
+        self.di = [0] * (NUM_DIO + 1)
+        self.do = [0] * (NUM_DIO + 1)
+        for i in di_high:
+            self.di[i] = 1
+        self.ai: dict[int, float] = {}
+        self.ao: dict[int, float] = {}
+
+        # force_profile(tcp_pose) -> totale kracht in N
+        self.force_profile = force_profile or (lambda pose: 0.0)
+        # di_script: [(t_seconden, index, waarde), ...] vanaf aanmaken van de robot
+        self._di_script = sorted(di_script or [])
+        self._t_start = time.monotonic()
+
+        # geblend pad / opgeslagen programma's, zelfde vlaggen als de receiver
+        self.path_segments: list = []
+        self.path_active = False
+        self.path_abort = False
+        self.programs: dict[str, list] = {}
+        self.prog_name = ""
+        self.prog_step = 0
+        self.prog_state = "idle"
+        self.prog_active = False
+        self.prog_abort = False
+        self.prog_events: list[tuple[int, str]] = []
+        self.prog_event_seq = 0
+        self.force_abort = False
+
+        # feeder (feeder_start / feeder_stop)
+        self.feeder_active = False
+        self.feeder_do = 0
+        self.feeder_mask = 0
+        self.feeder_on_s = 0.5
+        self.feeder_off_s = 0.1
+        self._feeder_thread: threading.Thread | None = None
+
+    # ----------------- Beweging -----------------
+
+    @staticmethod
+    def _joint_key(joints) -> tuple:
+        return tuple(round(float(v), 3) for v in joints)
+
+    def _update(self, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        if self.motion is not None and self.motion.done(now):
+            self._apply(self.motion, now)
+            self.motion = None
+
+    def _apply(self, motion: _Motion, now: float) -> None:
+        pose = motion.pose_at(now)
+        if motion.kind == "L":
+            self.tcp = pose
+        else:
+            self.joints = pose
+            tcp = motion.tcp_at(now)
+            if tcp is not None:
+                self.tcp = tcp
+
+    def start_move(self, kind: str, target, vel: float, acc: float, cruise: bool = False) -> None:
+        with self.lock:
+            self.stop()
+            scale = self.speed_pct / 100.0
+            if kind == "L":
+                self.motion = _Motion(kind, self.tcp, target, vel * scale, acc, cruise)
+            else:
+                taught = self.taught_poses.get(self._joint_key(target))
+                self.motion = _Motion(
+                    kind, self.joints, target, vel * scale, acc, cruise,
+                    tcp_start=list(self.tcp) if taught else None, tcp_target=taught,
+                )
+
+    def stop(self) -> None:
+        # bevriest de robot op de huidige pose
+        with self.lock:
+            if self.motion is not None:
+                self._apply(self.motion, time.monotonic())
+                self.motion = None
+
+    def check_motion(self) -> int:
+        with self.lock:
+            self._update()
+            return 0 if self.motion is None else MOTION_BUSY
+
+    def motion_state(self) -> int:
+        mv = self.check_motion()
+        if mv == 0 and (self.path_active or self.prog_active):
+            return MOTION_BUSY
+        return mv
+
+    def block_until_stopped(self, timeout: float, state=None) -> int:
+        # timeout < 0 = oneindig
+        state = state or self.motion_state
+        deadline = None if timeout < 0 else time.monotonic() + timeout
+        mv = state()
+        while mv != 0:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            time.sleep(SIM_STEP)
+            mv = state()
+        return mv
+
+    def move_blocking(self, kind: str, target, vel: float, acc: float, cruise: bool = False) -> None:
+        self.start_move(kind, target, vel, acc, cruise)
+        self.block_until_stopped(-1.0, self.check_motion)
+
+    def tcp_pose(self) -> list[float]:
+        with self.lock:
+            now = time.monotonic()
+            self._update(now)
+            if self.motion is not None:
+                if self.motion.kind == "L":
+                    return self.motion.pose_at(now)
+                tcp = self.motion.tcp_at(now)
+                if tcp is not None:
+                    return tcp
+            return list(self.tcp)
+
+    def tool_force(self) -> float:
+        return float(self.force_profile(self.tcp_pose()))
+
+    # ----------------- I/O -----------------
+
+    def _run_di_script(self) -> None:
+        elapsed = time.monotonic() - self._t_start
+        while self._di_script and self._di_script[0][0] <= elapsed:
+            _, idx, val = self._di_script.pop(0)
+            self.di[idx] = int(val)
+
+    def get_di(self, idx: int) -> int:
+        with self.lock:
+            self._run_di_script()
+            return self.di[idx]
+
+    def set_di(self, idx: int, value: int) -> None:
+        with self.lock:
+            self.di[idx] = int(value)
+
+    def digin_mask(self) -> int:
+        with self.lock:
+            self._run_di_script()
+            return sum(1 << (i - 1) for i in range(1, NUM_DIO + 1) if self.di[i])
+
+    def digout_mask(self) -> int:
+        with self.lock:
+            return sum(1 << (i - 1) for i in range(1, NUM_DIO + 1) if self.do[i])
+
+    def buffer_full(self) -> bool:
+        return self.feeder_mask != 0 and self.digin_mask() & self.feeder_mask == self.feeder_mask
+
+    # ----------------- Feeder -----------------
+
+    def feeder_start(self, do: int, mask: int, on_s: float, off_s: float) -> None:
+        with self.lock:
+            if self.feeder_active and self.feeder_do != do:
+                self.do[self.feeder_do] = 0
+            self.feeder_do, self.feeder_mask = do, mask
+            self.feeder_on_s, self.feeder_off_s = on_s, off_s
+            self.feeder_active = True
+            if self._feeder_thread is None:
+                self._feeder_thread = threading.Thread(target=self.run_feeder, daemon=True)
+                self._feeder_thread.start()
+
+    def feeder_off(self) -> None:
+        with self.lock:
+            self.feeder_active = False
+            if self.feeder_do > 0:
+                self.do[self.feeder_do] = 0
+
+    def run_feeder(self) -> None:
+        # zoals run_feeder in de receiver: pulsen zolang actief en niet vol
+        while True:
+            if not self.feeder_active or self.buffer_full():
+                time.sleep(0.05)
+                continue
+            do = self.feeder_do
+            self.do[do] = 1
+            deadline = time.monotonic() + self.feeder_on_s
+            while time.monotonic() < deadline and not self.buffer_full():
+                time.sleep(SIM_STEP)
+            self.do[do] = 0
+            time.sleep(self.feeder_off_s)
+
+    # ----------------- Pad en programma's -----------------
+
+    def run_path(self, poll=None) -> None:
+        # zoals de receiver: in de thread van de commando-client, en afbreken
+        # alleen tussen twee segmenten; poll() leest intussen die client
+        n = len(self.path_segments)
+        for i, (kind, pos, vel, acc, radius) in enumerate(self.path_segments):
+            if poll:
+                poll()
+            if self.path_abort:
+                self.stop()
+                break
+            self.move_blocking(kind, pos, vel, acc, cruise=radius > 0 and i < n - 1)
+        self.path_active = False
+
+    def emit_prog_event(self, text: str) -> None:
+        with self.lock:
+            self.prog_event_seq += 1
+            self.prog_events.append((self.prog_event_seq, f"EVENT {self.prog_event_seq} {text}\n"))
+            del self.prog_events[:-100]
+
+    def run_program(self, poll=None) -> None:
+        poll = poll or (lambda: None)
+        steps = self.programs[self.prog_name]
+        n = len(steps)
+        self.emit_prog_event(f"{self.prog_name} start 0 {n}")
+        result = "done"
+        for i, step in enumerate(steps):
+            poll()
+            if self.prog_abort:
+                self.stop()
+                result = "aborted"
+                break
+            self.prog_step = i
+            kind = step[0]
+            self.emit_prog_event(f"{self.prog_name} step {i} {kind}")
+            if kind in ("L", "J"):
+                blend = step[4] > 0 and i < n - 1 and steps[i + 1][0] in ("L", "J")
+                self.move_blocking(kind, step[1], step[2], step[3], cruise=blend)
+            elif kind == "DO":
+                self.do[step[1]] = int(step[2])
+            elif kind == "WAIT":
+                deadline = time.monotonic() + step[1]
+                while time.monotonic() < deadline and not self.prog_abort:
+                    time.sleep(SIM_STEP)
+                    poll()
+            elif kind == "WAITDI":
+                deadline = None if step[3] < 0 else time.monotonic() + step[3]
+                while self.get_di(step[1]) != step[2] and not self.prog_abort:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        result = "error"
+                        break
+                    time.sleep(SIM_STEP)
+                    poll()
+                if result == "error":
+                    break
+        if result == "done" and self.prog_abort:
+            result = "aborted"
+        self.prog_state = result
+        self.prog_active = False
+        self.emit_prog_event(f"{self.prog_name} {result} {self.prog_step} -")
+
+
+class _PendingInput:
+    """Wat een commando-client stuurt terwijl zijn thread een pad of programma
+    afspeelt (poll_command_socket in de receiver)."""
+
+    def __init__(self, conn: socket.socket, robot: SimRobot):
+        self.conn = conn
+        self.robot = robot
+        self.data = b""
+        self.lost = False
+
+    def poll(self) -> None:
+        if self.lost or not select.select([self.conn], [], [], 0)[0]:
+            return
+        try:
+            data = self.conn.recv(4096)
+        except OSError:
+            data = b""
+        robot = self.robot
+        if not data:
+            self.lost = True
+            robot.path_abort = robot.prog_abort = robot.force_abort = True
+            return
+        self.data += data
+        for raw in self.data.split(b"\n")[:-1]:
+            if raw.strip().lower() in (b"stop", b"quit"):
+                robot.path_abort = robot.prog_abort = robot.force_abort = True
+
+    def take(self) -> bytes:
+        data, self.data = self.data, b""
+        return data
+
+
+class _DelayedWriter:
+    """Verstuurt de antwoorden van één verbinding elk na hun eigen vertraging.
+
+    Vertrektijden lopen op (nooit eerder dan het vorige antwoord), dus de
+    volgorde blijft gelijk. Antwoorden op gepipelinede commando's zijn
+    tegelijk onderweg, zoals bij echte netwerkvertraging; de serve-thread
+    wacht zelf niet.
+    """
+
+    def __init__(self, conn: socket.socket):
+        self.conn = conn
+        self.failed = False
+        self._queue: queue.Queue = queue.Queue()
+        self._last_due = 0.0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def put(self, data: bytes, delay: float) -> None:
+        if self.failed:
+            raise ConnectionAbortedError
+        due = max(time.monotonic() + delay, self._last_due)
+        self._last_due = due
+        self._queue.put((due, data))
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            due, data = item
+            wait_s = due - time.monotonic()
+            if wait_s > 0:
+                time.sleep(wait_s)
+            try:
+                self.conn.sendall(data)
+            except OSError:
+                self.failed = True
+                return
+
+    def close(self, timeout: float) -> None:
+        # wat nog onderweg is (bijv. "OK bye then") eerst laten vertrekken
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+
+class RobotSimulator:
+    """TCP-server die het protocol van reciever_code.py spreekt.
+
+    Commando-poort en telemetriepoort zoals op de controller; port=0 kiest
+    een vrije poort (zie .port / .telemetry_port na start()). Elk antwoord
+    wordt latency + uniform(0, jitter) seconden vertraagd; per verbinding
+    lopen die vertragingen door elkaar heen (_DelayedWriter).
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = PORT,
+        telemetry_port: int = TELEMETRY_PORT,
+        robot: SimRobot | None = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        seed: int | None = None,
+    ):
+        self.host = host
+        self.port = port
+        self.telemetry_port = telemetry_port
+        self.robot = robot or SimRobot()
+        self.latency = latency
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._servers: list[socket.socket] = []
+        self._conns: set[socket.socket] = set()
+        self._writers: dict[socket.socket, _DelayedWriter] = {}
+        self._running = threading.Event()
+        self._upload_name = ""
+        self._upload_steps: list = []
+
+    # ----------------- Server -----------------
+
+    def start(self) -> "RobotSimulator":
+        self._running.set()
+        cmd_srv = self._listen(self.port)
+        tel_srv = self._listen(self.telemetry_port)
+        self.port = cmd_srv.getsockname()[1]
+        self.telemetry_port = tel_srv.getsockname()[1]
+        threading.Thread(target=self._accept_loop, args=(cmd_srv, None), daemon=True).start()
+        threading.Thread(target=self._accept_loop, args=(tel_srv, TELEMETRY_COMMANDS), daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._running.clear()
+        for s in self._servers + list(self._conns):
+            try:
+                s.close()
+            except OSError:
+                pass
+        self._servers = []
+        self.robot.stop()
+
+    def __enter__(self) -> "RobotSimulator":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def _listen(self, port: int) -> socket.socket:
+        srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        srv.bind((self.host, port))
+        srv.listen()
+        self._servers.append(srv)
+        return srv
+
+    def _accept_loop(self, srv: socket.socket, allowed) -> None:
+        while self._running.is_set():
+            try:
+                conn, _ = srv.accept()
+            except OSError:
+                return
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._conns.add(conn)
+            threading.Thread(target=self._serve_client, args=(conn, allowed), daemon=True).start()
+
+    def _write(self, conn: socket.socket, text: str, delay: bool = True) -> None:
+        writer = self._writers.get(conn)
+        if writer is None:
+            conn.sendall(text.encode("ascii"))
+            return
+        # ook onvertraagde regels (stream) via de writer, anders halen ze
+        # antwoorden in die nog onderweg zijn
+        wait_s = self.latency + self._rng.uniform(0.0, self.jitter) if delay else 0.0
+        writer.put(text.encode("ascii"), wait_s)
+
+    def _serve_client(self, conn: socket.socket, allowed) -> None:
+        rxbuf = b""
+        pending = _PendingInput(conn, self.robot)
+        if self.latency or self.jitter:
+            self._writers[conn] = _DelayedWriter(conn)
+        try:
+            while self._running.is_set():
+                data = pending.take()
+                if not data:
+                    if pending.lost:
+                        break
+                    data = conn.recv(4096)
+                if not data:
+                    break
+                rxbuf += data
+                lines = rxbuf.split(b"\n")
+                rxbuf = lines.pop()
+                for raw in lines:
+                    line = raw.decode("ascii", errors="ignore").strip()
+                    if not line:
+                        continue
+                    tokens = line.split()
+                    cmd = tokens[0].lower()
+                    if cmd == "quit":
+                        self._write(conn, "OK bye then\n")
+                        raise ConnectionAbortedError
+                    if cmd == "subscribe":
+                        self._subscribe(conn, tokens, allowed)
+                        continue
+                    if allowed is not None and cmd not in allowed:
+                        self._write(conn, "ERR command not allowed on this channel\n")
+                        continue
+                    reply = self.handle_command(tokens)
+                    self._write(conn, reply)
+                    # pad en programma draaien, net als op de controller, in
+                    # de thread van deze client, na het OK
+                    if reply.startswith("OK path_run"):
+                        self.robot.run_path(pending.poll)
+                    elif reply.startswith("OK prog_run"):
+                        self.robot.run_program(pending.poll)
+        except (OSError, ConnectionAbortedError):
+            pass
+        finally:
+            # zoals main() op de controller: commando-client weg = robot stoppen,
+            # ook een lopend pad of programma
+            if allowed is None:
+                self.robot.path_abort = True
+                self.robot.prog_abort = True
+                self.robot.force_abort = True
+                self.robot.stop()
+                self.robot.feeder_off()
+            writer = self._writers.pop(conn, None)
+            if writer is not None:
+                writer.close(self.latency + self.jitter + 1.0)
+            self._conns.discard(conn)
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def _subscribe(self, conn: socket.socket, tokens, allowed) -> None:
+        if allowed is None:
+            self._write(conn, "ERR subscribe only on telemetry channel\n")
+            return
+        if len(tokens) != 3:
+            self._write(conn, "ERR subscribe needs 2 args\n")
+            return
+        try:
+            rate_hz = float(tokens[1])
+            fields = tokens[2].lower().split(",")
+        except ValueError:
+            self._write(conn, "ERR subscribe invalid args\n")
+            return
+        if rate_hz <= 0 or rate_hz > STREAM_MAX_RATE_HZ:
+            self._write(conn, "ERR subscribe rate out of range\n")
+            return
+        if any(f not in STREAM_FIELDS for f in fields):
+            self._write(conn, "ERR subscribe unknown field\n")
+            return
+        self._write(conn, "OK subscribe\n")
+        self._stream(conn, rate_hz, fields, allowed)
+
+    def _stream(self, conn: socket.socket, rate_hz: float, fields, allowed) -> None:
+        robot = self.robot
+        period = 1.0 / rate_hz
+        seq = 0
+        last_event = robot.prog_event_seq
+        rxbuf = b""
+        conn.settimeout(period)
+        try:
+            while self._running.is_set():
+                msg = self._stream_sample(fields, seq)
+                with robot.lock:
+                    for ev_seq, ev in robot.prog_events:
+                        if ev_seq > last_event:
+                            msg += ev
+                            last_event = ev_seq
+                self._write(conn, msg, delay=False)
+                seq += 1
+
+                try:
+                    data = conn.recv(4096)
+                except socket.timeout:
+                    continue
+                if not data:
+                    raise ConnectionAbortedError
+                rxbuf += data
+                lines = rxbuf.split(b"\n")
+                rxbuf = lines.pop()
+                for raw in lines:
+                    line = raw.decode("ascii", errors="ignore").strip()
+                    if not line:
+                        continue
+                    tokens = line.split()
+                    cmd = tokens[0].lower()
+                    if cmd == "unsubscribe":
+                        self._write(conn, "OK unsubscribe\n")
+                        return
+                    if cmd == "quit":
+                        self._write(conn, "OK bye then\n")
+                        raise ConnectionAbortedError
+                    if cmd not in allowed:
+                        self._write(conn, "ERR command not allowed on this channel\n")
+                        continue
+                    self._write(conn, self.handle_command(tokens))
+        finally:
+            conn.settimeout(None)
+
+    def _stream_sample(self, fields, seq: int) -> str:
+        robot = self.robot
+        parts = ["STREAM", str(seq)]
+        for field in fields:
+            if field == "motion":
+                parts.append(f"motion={robot.motion_state()}")
+            elif field == "force":
+                parts.append(f"force={robot.tool_force():.3f}")
+            elif field == "pose":
+                parts.append("pose=" + ",".join(f"{v:.3f}" for v in robot.tcp_pose()))
+            elif field == "di":
+                parts.append(f"di={robot.digin_mask()}")
+            elif field == "do":
+                parts.append(f"do={robot.digout_mask()}")
+        return " ".join(parts) + "\n"
+
+    # ----------------- Commando's -----------------
+
+    def handle_command(self, tokens) -> str:
+        cmd = tokens[0].lower()
+        handler = getattr(self, f"_cmd_{cmd}", None)
+        if handler is None:
+            return "ERR unknown command\n"
+        try:
+            return handler(tokens)
+        except (ValueError, IndexError, KeyError):
+            return f"ERR {cmd} invalid args\n"
+
+    def _move(self, tokens, kind: str, set_x: bool) -> str:
+        cmd = tokens[0].lower()
+        if len(tokens) != 9:
+            return f"ERR {cmd} needs 8 args\n"
+        vals = [float(v) for v in tokens[1:9]]
+        target, vel, acc = vals[:6], vals[6], vals[7]
+        robot = self.robot
+        robot.velj, robot.accj = vel, acc
+        if set_x:
+            robot.velx, robot.accx = vel, acc
+        robot.start_move(kind, target, vel, acc)
+        return f"OK {cmd}\n"
+
+    def _cmd_amovel(self, tokens) -> str:
+        return self._move(tokens, "L", True)
+
+    def _cmd_amovej(self, tokens) -> str:
+        return self._move(tokens, "J", False)
+
+    def _cmd_amovejx(self, tokens) -> str:
+        # joint-interpolatie naar een posx; in dit model gewoon naar de TCP-pose
+        return self._move(tokens, "L", True)
+
+    def _cmd_digout(self, tokens) -> str:
+        if len(tokens) != 3:
+            return "ERR digout needs 2 args\n"
+        with self.robot.lock:
+            self.robot.do[int(tokens[1])] = int(tokens[2])
+        return "OK digout\n"
+
+    def _cmd_digin(self, tokens) -> str:
+        if len(tokens) != 2:
+            return "ERR digin needs 1 arg\n"
+        return f"OK digin {self.robot.get_di(int(tokens[1]))}\n"
+
+    def _cmd_digin_all(self, tokens) -> str:
+        if len(tokens) != 1:
+            return "ERR digin_all takes no args\n"
+        return f"OK digin_all {self.robot.digin_mask()}\n"
+
+    def _cmd_digout_mask(self, tokens) -> str:
+        if len(tokens) != 3:
+            return "ERR digout_mask needs 2 args\n"
+        mask, values = int(tokens[1]), int(tokens[2])
+        with self.robot.lock:
+            for i in range(1, NUM_DIO + 1):
+                bit = 1 << (i - 1)
+                if mask & bit:
+                    self.robot.do[i] = 1 if values & bit else 0
+        return f"OK digout_mask {self.robot.digout_mask()}\n"
+
+    def _cmd_anout(self, tokens) -> str:
+        if len(tokens) != 3:
+            return "ERR anout needs 2 args\n"
+        self.robot.ao[int(tokens[1])] = float(tokens[2])
+        return "OK anout\n"
+
+    def _cmd_anin(self, tokens) -> str:
+        if len(tokens) != 2:
+            return "ERR anin needs 1 arg\n"
+        return f"OK anin {self.robot.ai.get(int(tokens[1]), 0.0)}\n"
+
+    def _cmd_stop(self, tokens) -> str:
+        self.robot.path_abort = True
+        self.robot.prog_abort = True
+        self.robot.force_abort = True
+        self.robot.stop()
+        self.robot.feeder_off()
+        return "OK stop\n"
+
+    def _cmd_feeder_start(self, tokens) -> str:
+        if len(tokens) != 5:
+            return "ERR feeder_start needs 4 args\n"
+        do, mask, on_s, off_s = int(tokens[1]), int(tokens[2]), float(tokens[3]), float(tokens[4])
+        if not 1 <= do <= NUM_DIO or mask == 0 or on_s <= 0 or off_s < 0:
+            return "ERR feeder_start invalid args\n"
+        self.robot.feeder_start(do, mask, on_s, off_s)
+        return "OK feeder_start\n"
+
+    def _cmd_feeder_stop(self, tokens) -> str:
+        self.robot.feeder_off()
+        return "OK feeder_stop\n"
+
+    def _cmd_feeder_state(self, tokens) -> str:
+        r = self.robot
+        return f"OK feeder_state {int(r.feeder_active)} {r.feeder_do} {r.feeder_mask} {int(r.buffer_full())}\n"
+
+    def _cmd_path_clear(self, tokens) -> str:
+        if self.robot.path_active:
+            return "ERR path running\n"
+        self.robot.path_segments = []
+        return "OK path_clear\n"
+
+    def _cmd_path_add(self, tokens) -> str:
+        if len(tokens) != 11:
+            return "ERR path_add needs 10 args\n"
+        if self.robot.path_active:
+            return "ERR path running\n"
+        kind = tokens[1].upper()
+        if kind not in ("L", "J"):
+            return "ERR path_add type must be L or J\n"
+        vals = [float(v) for v in tokens[2:11]]
+        self.robot.path_segments.append((kind, vals[:6], vals[6], vals[7], vals[8]))
+        return f"OK path_add {len(self.robot.path_segments)}\n"
+
+    def _cmd_path_run(self, tokens) -> str:
+        robot = self.robot
+        if len(tokens) != 2:
+            return "ERR path_run needs 1 arg\n"
+        if robot.path_active:
+            return "ERR path running\n"
+        expected = int(tokens[1])
+        if not robot.path_segments or len(robot.path_segments) != expected:
+            return "ERR path incomplete\n"
+        robot.path_abort = False
+        robot.path_active = True
+        return f"OK path_run {len(robot.path_segments)}\n"
+
+    @staticmethod
+    def _parse_prog_step(tokens):
+        kind = tokens[0].upper()
+        if kind in ("L", "J") and len(tokens) == 10:
+            vals = [float(v) for v in tokens[1:10]]
+            return [kind, vals[:6], vals[6], vals[7], vals[8]]
+        if kind == "DO" and len(tokens) == 3:
+            return [kind, int(tokens[1]), int(tokens[2])]
+        if kind == "WAIT" and len(tokens) == 2:
+            return [kind, float(tokens[1])]
+        if kind == "WAITDI" and len(tokens) == 4:
+            return [kind, int(tokens[1]), int(tokens[2]), float(tokens[3])]
+        return None
+
+    def _cmd_prog_begin(self, tokens) -> str:
+        if len(tokens) != 2:
+            return "ERR prog_begin needs 1 arg\n"
+        self._upload_name = tokens[1]
+        self._upload_steps = []
+        return "OK prog_begin\n"
+
+    def _cmd_prog_add(self, tokens) -> str:
+        if not self._upload_name:
+            return "ERR prog_add without prog_begin\n"
+        try:
+            step = self._parse_prog_step(tokens[1:])
+        except (ValueError, IndexError):
+            step = None
+        if step is None:
+            self._upload_name = ""
+            return "ERR prog_add invalid step\n"
+        self._upload_steps.append(step)
+        return f"OK prog_add {len(self._upload_steps)}\n"
+
+    def _cmd_prog_end(self, tokens) -> str:
+        robot = self.robot
+        if len(tokens) != 3:
+            return "ERR prog_end needs 2 args\n"
+        expected = int(tokens[2])
+        if tokens[1] != self._upload_name or len(self._upload_steps) != expected or expected == 0:
+            self._upload_name = ""
+            return "ERR program incomplete\n"
+        if robot.prog_active and robot.prog_name == self._upload_name:
+            return "ERR program running\n"
+        robot.programs[self._upload_name] = self._upload_steps
+        msg = f"OK prog_end {self._upload_name} {len(self._upload_steps)}\n"
+        self._upload_name = ""
+        self._upload_steps = []
+        return msg
+
+    def _cmd_prog_run(self, tokens) -> str:
+        robot = self.robot
+        if len(tokens) != 2:
+            return "ERR prog_run needs 1 arg\n"
+        if robot.prog_active or robot.path_active:
+            return "ERR program running\n"
+        if tokens[1] not in robot.programs:
+            return "ERR unknown program\n"
+        robot.prog_name = tokens[1]
+        robot.prog_step = 0
+        robot.prog_state = "running"
+        robot.prog_abort = False
+        robot.prog_active = True
+        return f"OK prog_run {robot.prog_name} {len(robot.programs[robot.prog_name])}\n"
+
+    def _cmd_prog_state(self, tokens) -> str:
+        robot = self.robot
+        return f"OK prog_state {robot.prog_name or '-'} {robot.prog_step} {robot.prog_state}\n"
+
+    def _cmd_abort(self, tokens) -> str:
+        robot = self.robot
+        robot.force_abort = robot.path_abort = robot.prog_abort = True
+        robot.stop()
+        return "OK abort\n"
+
+    def _cmd_prog_abort(self, tokens) -> str:
+        self.robot.prog_abort = True
+        self.robot.stop()
+        return "OK prog_abort\n"
+
+    def _setter(self, tokens, attr: str) -> str:
+        cmd = tokens[0].lower()
+        if len(tokens) != 2:
+            return f"ERR {cmd} needs 1 arg\n"
+        setattr(self.robot, attr, float(int(float(tokens[1]))))
+        return f"OK {cmd}\n"
+
+    def _cmd_change_operation_speed(self, tokens) -> str:
+        return self._setter(tokens, "speed_pct")
+
+    def _cmd_set_velx(self, tokens) -> str:
+        return self._setter(tokens, "velx")
+
+    def _cmd_set_velj(self, tokens) -> str:
+        return self._setter(tokens, "velj")
+
+    def _cmd_set_accx(self, tokens) -> str:
+        return self._setter(tokens, "accx")
+
+    def _cmd_set_accj(self, tokens) -> str:
+        return self._setter(tokens, "accj")
+
+    def _cmd_check_motion(self, tokens) -> str:
+        return f"OK check_motion {self.robot.motion_state()}\n"
+
+    def _cmd_force_move(self, tokens) -> str:
+        if len(tokens) not in (11, 12):
+            return "ERR force_move needs 10 or 11 args\n"
+        vals = [float(v) for v in tokens[1:11]]
+        target, vel, acc, force_limit, retract_mm = vals[:6], vals[6], vals[7], vals[8], vals[9]
+        contact_do = int(tokens[11]) if len(tokens) == 12 else 0
+        robot = self.robot
+
+        start = robot.tcp_pose()
+        dirv = [t - s for t, s in zip(target[:3], start[:3])]
+        length = math.sqrt(sum(d * d for d in dirv))
+        if length > 0:
+            dirv = [d / length for d in dirv]
+
+        robot.force_abort = False
+        robot.velx, robot.accx = vel, acc
+        robot.start_move("L", target, vel, acc)
+        contact = 0
+        while robot.check_motion() != 0:
+            if robot.force_abort:
+                robot.stop()
+                contact = 2
+                break
+            if robot.tool_force() >= force_limit:
+                robot.stop()
+                contact = 1
+                break
+            time.sleep(SIM_STEP)
+        # de abort kan de beweging al gestopt hebben voordat de lus hem zag
+        if robot.force_abort:
+            contact = 2
+        pose = robot.tcp_pose()
+
+        if contact == 1:
+            if contact_do > 0:
+                robot.do[contact_do] = 1
+            if retract_mm > 0:
+                retract = [pose[i] - dirv[i] * retract_mm for i in range(3)] + pose[3:]
+                robot.move_blocking("L", retract, vel, acc)
+        return "OK force_move {} {}\n".format(contact, " ".join(f"{v:.3f}" for v in pose))
+
+    def _cmd_wait_motion(self, tokens) -> str:
+        if len(tokens) > 2:
+            return "ERR wait_motion takes at most 1 arg\n"
+        timeout = float(tokens[1]) if len(tokens) == 2 else -1.0
+        return f"OK wait_motion {self.robot.block_until_stopped(timeout)}\n"
+
+    def _cmd_wait_digin(self, tokens) -> str:
+        if len(tokens) not in (4, 5):
+            return "ERR wait_digin needs 3 or 4 args\n"
+        mask, pattern, timeout = int(tokens[1]), int(tokens[2]), float(tokens[3])
+        mode = tokens[4].lower() if len(tokens) == 5 else "all"
+        if mask == 0 or mode not in ("all", "any"):
+            return "ERR wait_digin invalid args\n"
+
+        def matches(di: int) -> bool:
+            same = ~(di ^ pattern) & mask
+            return same != 0 if mode == "any" else same == mask
+
+        deadline = None if timeout < 0 else time.monotonic() + timeout
+        di = self.robot.digin_mask()
+        while not matches(di):
+            if deadline is not None and time.monotonic() >= deadline:
+                return f"OK wait_digin 0 {di}\n"
+            time.sleep(SIM_STEP)
+            di = self.robot.digin_mask()
+        return f"OK wait_digin 1 {di}\n"
+
+    def _cmd_toolforce(self, tokens) -> str:
+        if len(tokens) != 2:
+            return "ERR toolforce needs 1 arg\n"
+        int(tokens[1])  # ref-frame wordt gecontroleerd, het model kent er maar één
+        return f"OK toolforce {self.robot.tool_force()}\n"
+
+    def _cmd_tcp_pose(self, tokens) -> str:
+        if len(tokens) != 1:
+            return "ERR tcppose takes no args\n"
+        return "OK tcppose {}\n".format(" ".join(f"{v:.3f}" for v in self.robot.tcp_pose()))
+
+    def _cmd_status(self, tokens) -> str:
+        if len(tokens) != 1:
+            return "ERR status takes no args\n"
+        robot = self.robot
+        pose = " ".join(f"{v:.3f}" for v in robot.tcp_pose())
+        return (
+            f"OK status {robot.tool_force():.3f} {pose} "
+            f"{robot.digin_mask()} {robot.digout_mask()} {robot.motion_state()}\n"
+        )
+
+
+def main():
+    # Start een simulator; zet in config.json robot_ip op 127.0.0.1 om de
+    # GUI er tegenaan te laten praten.
+    parser = argparse.ArgumentParser(description="Doosan receiver simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--telemetry-port", type=int, default=TELEMETRY_PORT)
+    parser.add_argument("--latency", type=float, default=0.0, help="vaste vertraging per antwoord (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra willekeurige vertraging 0..jitter (s)")
+    parser.add_argument("--contact-z", type=float, default=None, help="krachtvlak op deze z (mm), kracht bij z+")
+    args = parser.parse_args()
+
+    force_profile = None
+    if args.contact_z is not None:
+        force_profile = contact_force(axis=2, surface=args.contact_z, stiffness=2.0, direction=1.0)
+
+    sim = RobotSimulator(
+        args.host, args.port, args.telemetry_port,
+        robot=SimRobot(force_profile=force_profile),
+        latency=args.latency,
+        jitter=args.jitter,
+    ).start()
+    print(f"Simulator luistert op {args.host}:{sim.port} (telemetrie {sim.telemetry_port})")
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        sim.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,35 @@
 import time
-from backend import load_config, save_config, load_coordinates, DoosanGatewayClient, is_robot_enabled, sensor_amovel, scan_and_validate_single, move_to_detected_buckle
+from backend import load_config, save_config, load_coordinates, DoosanGatewayClient, is_robot_enabled
+from sequence_engine import SequenceEngine
+from profiler import CycleProfiler, PROFILE_DB
 
 class RobotProgram:
-    def __init__(self, gateway: DoosanGatewayClient):
+    def __init__(self, gateway: DoosanGatewayClient, profiler: CycleProfiler | None = None):
         self.gateway = gateway
         self.config = load_config()
 
         self.operation_speed = self.config.get("operation_speed")
         self.velx = self.config.get("velx")
         self.accx = self.config.get("accx")
+        # blendradius (mm) voor doorloop-punten in geblende paden
+        self.blend_radius = self.config.get("blend_radius", 20.0)
+        # feeder-DO door de controller laten pulsen, naast de beweging
+        self.feeder_background = self.config.get("feeder_background", True)
 
         coord_cfg = load_coordinates()
         for key, value in coord_cfg.items():
             if key.startswith("p_") or key.startswith("pj_"):
                 setattr(self, key, value)
         self._stop_flag = False
+        self.engine = SequenceEngine(self)
+
+        # cyclustijd per stap en commando; standaard naar profiler.PROFILE_DB
+        # (buiten de repo), "profiling_db" in config.json kiest een ander pad.
+        # Een meegegeven profiler (bijv. benchmark.py) vervangt die helemaal.
+        self.profiler = profiler
+        if self.profiler is None and self.config.get("profiling", True):
+            self.profiler = CycleProfiler(self.config.get("profiling_db") or PROFILE_DB)
+        self.gateway.profiler = self.profiler
 
         # QR / product flags
         self.do_seatbelts = False
@@ -33,659 +48,33 @@ class RobotProgram:
         save_config(self.config)
 
     def apply_parameters(self):
-        self.gateway.change_operation_speed(self.operation_speed)
-        self.gateway.set_velx(self.velx)
-        self.gateway.set_accx(self.accx)
+        # alleen gewijzigde parameters, samen in één round trip
+        self.gateway.apply_parameters(self.operation_speed, self.velx, self.accx)
 
     def wait_for_operator_confirm(self, statuscallback=None):
         if statuscallback:
             statuscallback("Wachten op operatorbevestiging (groene knop)...")
 
+        # DI1 of DI4; de controller wacht zelf op de flank (wait_digin)
         while True:
             try:
-                btn1 = self.gateway.get_digital_input(1)
-                btn4 = self.gateway.get_digital_input(4)
+                if self.gateway.wait_digital_inputs({1: 1, 4: 1}, mode="any"):
+                    break
             except Exception:
-                btn1 = 0
-                btn4 = 0
-            if btn1 == 1 or btn4 == 1:
-                if statuscallback:
-                    statuscallback("Groene knop ingedrukt, sequence gaat verder.")
-                break
-            time.sleep(0.1)
+                time.sleep(0.1)
+        if statuscallback:
+            statuscallback("Groene knop ingedrukt, sequence gaat verder.")
 
-    # ----------------- Voorbeeld-sequence -----------------
+    # ----------------- Sequences (data/sequences.json) -----------------
 
     def sequence_buckles(self, statuscallback=None):
-        def log(msg: str):
-            print(msg)
-            if statuscallback:
-                statuscallback(msg)
-
-        self.gateway.start_buckle_vision(statuscallback)
-        #scan_and_validate_single(self, "buckles")
-        self.gateway.set_digital_output(1, 0)
-
-        log("voor buckles")
-        self.gateway.amovej(*self.pj_voor_buckle, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        move_to_detected_buckle(
-            self.gateway,
-            self.velx,
-            self.accx,
-            statuscallback=statuscallback,
-            timeout=15.0,
-            stopflag_getter=lambda: self._stop_flag,
-        )
-
-        log("naar pre home")
-        self.gateway.amovej(*self.pj_pre_home, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("naar home")
-        self.gateway.amovej(*self.pj_home, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("naar tussenstop")
-        self.gateway.amovej(*self.pj_buckle1_tussenstop, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("naar voor frame")
-        self.gateway.amovel(*self.p_buckle1_voor_frame, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("naar in frame")
-        self.gateway.amovel(*self.p_buckle1_in_frame, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        self.gateway.set_digital_output(1, 0)
-
-        log("naar off buckle")
-        self.gateway.amovel(*self.p_buckle1_off_buckle, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("naar tussenstop")
-        self.gateway.amovel(*self.p_buckle1_out_frame, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("naar tussenstop")
-        self.gateway.amovel(*self.p_buckle1_out_frame, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("naar home")
-        self.gateway.amovej(*self.pj_home, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("voor buckles")
-        self.gateway.amovej(*self.pj_voor_buckle, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        move_to_detected_buckle(
-            self.gateway,
-            self.velx,
-            self.accx,
-            statuscallback=statuscallback,
-            timeout=15.0,
-            stopflag_getter=lambda: self._stop_flag,
-        )
-
-        log("naar home")
-        self.gateway.amovej(*self.pj_home, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("naar voor frame 2")
-        self.gateway.amovej(*self.pj_buckle2_voor_frame, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("naar in frame 2")
-        self.gateway.amovel(*self.p_buckle2_in_frame, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("naar down frame 2")
-        self.gateway.amovel(*self.p_buckle2_down_frame, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        self.gateway.set_digital_output(1,0)
-
-        log("naar off buckle")
-        self.gateway.amovel(*self.p_buckle2_off_buckle, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("naar tussenstop")
-        self.gateway.amovej(*self.pj_buckle2_out_frame, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("naar voor frame 2")
-        self.gateway.amovej(*self.pj_home, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("voor buckles")
-        self.gateway.amovej(*self.pj_voor_buckle, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        move_to_detected_buckle(
-            self.gateway,
-            self.velx,
-            self.accx,
-            statuscallback=statuscallback,
-            timeout=15.0,
-            stopflag_getter=lambda: self._stop_flag,
-        )
-
-        self.gateway.stop_buckle_vision(statuscallback)
-
-        log("naar tussenstop 3")
-        self.gateway.amovej(*self.pj_buckle3_tussenstop, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("naar voor frame 3")
-        self.gateway.amovel(*self.p_buckle3_voor_frame, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("naar in frame 3")
-        self.gateway.amovel(*self.p_buckle3_in_frame, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        self.gateway.set_digital_output(1,0)
-
-        log("naar off buckle 3")
-        self.gateway.amovel(*self.p_buckle3_off_buckle, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-
-        log("naar out frame 3")
-        self.gateway.amovel(*self.p_buckle3_out_frame, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("naar tussenstop terug")
-        self.gateway.amovej(*self.pj_buckle3_tussenstop_terug, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("naar home")
-        self.gateway.amovej(*self.pj_home, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
+        return self.engine.run("buckles", statuscallback)
 
     def sequence_armrest(self, statuscallback=None):
-        def log(msg: str):
-            print(msg)
-            if statuscallback:
-                statuscallback(msg)
-
-        while True:
-            buffer_vol = self.gateway.get_digital_input(16)
-
-            if buffer_vol:
-                log("Buffer filled")
-                time.sleep(2)
-                break
-
-            self.gateway.set_digital_output(4, 1)
-            time.sleep(0.5)
-            self.gateway.set_digital_output(4, 0)
-            time.sleep(0.1)
-
-        self.gateway.set_digital_output(4, 0)
-
-        # 1) Naar home
-        log("Naar home")
-        self.gateway.amovej(*self.pj_home, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("Naar armrest pick")
-        self.gateway.amovej(*self.pj_armrest_pick, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        # 3) Naar beneden en zuiger aan
-        sensor_amovel(self, base_pos=self.p_armrest_pick, force_limit=12, direction="z+", pre_distance=250.0, return_direction="y+", return_distance=200.0)
-
-        # 4) Naar tussenstop
-        log("Naar tussenstop armrest")
-        self.gateway.amovej(*self.pj_armrest_tussenstop, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("Naar infront")
-        self.gateway.amovej(*self.pj_armrest_infront, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("Naar inframe")
-        self.gateway.amovel(*self.p_armrest_inframe, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        self.gateway.set_digital_output(2, 0)
-        time.sleep(0.5)
-
-        log("Naar infront")
-        self.gateway.amovej(*self.pj_armrest_infront, self.velx, (self.accx/4))
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        # 4) Naar home
-        log("Naar home")
-        self.gateway.amovej(*self.pj_home, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("Naar armrest pick")
-        self.gateway.amovej(*self.pj_armrest_pick, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        # 3) Naar beneden en zuiger aan
-        sensor_amovel(self, base_pos=self.p_armrest_pick, force_limit=12, direction="z+", pre_distance=250.0,return_direction="y+", return_distance=200.0)
-
-        # 4) Naar tussenstop
-        log("Naar tussenstop armrest")
-        self.gateway.amovej(*self.pj_armrest_tussenstop, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("Naar infront")
-        self.gateway.amovej(*self.pj_armrest_infront2, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("Naar inframe")
-        self.gateway.amovel(*self.p_armrest_inframe2, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("Naar inframe")
-        self.gateway.amovel(*self.p_armrest_inframe_down, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        self.gateway.set_digital_output(2, 0)
-        time.sleep(0.5)
-
-        log("Naar infront")
-        self.gateway.amovej(*self.pj_armrest_infront2, self.velx, (self.accx/4))
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        # 4) Naar tussenstop
-        log("Naar home")
-        self.gateway.amovej(*self.pj_home, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
+        return self.engine.run("armrest", statuscallback)
 
     def sequence_seatbelts(self, statuscallback=None):
-        def log(msg: str):
-            print(msg)
-            if statuscallback:
-                statuscallback(msg)
-
-        #scan_and_validate_single(self, "seatbelts")
-
-        while True:
-            try:
-                s13 = self.gateway.get_digital_input(13)
-                s14 = self.gateway.get_digital_input(14)
-                s15 = self.gateway.get_digital_input(15)
-            except Exception:
-                s13 = s14 = s15 = 0
-
-            if not (s13 and s14 and s15):
-                self.gateway.set_digital_output(4, 1)
-                time.sleep(0.5)
-                self.gateway.set_digital_output(4, 0)
-                time.sleep(0.1)
-
-                continue
-
-            log("Alle seatbelt-buffers gevuld, sequence gaat verder.")
-            self.gateway.set_digital_output(4, 0)
-            break
-
-        self.gateway.set_digital_output(1, 0)
-
-        log("home")
-        self.gateway.amovej(*self.pj_home, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("boven pickup point")
-        self.gateway.amovej(*self.pj_seatbelt_boven_pickup, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("pickup point")
-        self.gateway.amovel(*self.p_seatbelt_pickup, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        self.gateway.set_digital_output(1, 1)
-
-        log("move up")
-        self.gateway.amovel(*self.p_seatbelt_moveup, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("move up v2")
-        self.gateway.amovej(*self.pj_seatbelt_moveupv2, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("passthrough")
-        self.gateway.amovej(*self.pj_seatbelt_passthrough, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("half")
-        self.gateway.amovel(*self.p_seatbelt_half, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("above")
-        self.gateway.amovel(*self.p_seatbelt_aboveholder, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("in")
-        self.gateway.amovel(*self.p_seatbelt_inholder, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        self.gateway.set_digital_output(1, 0)
-
-        log("uit")
-        self.gateway.amovel(*self.p_seatbelt_pre_uit, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("uit")
-        self.gateway.amovel(*self.p_seatbelt_uit, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("boven pickup")
-        self.gateway.amovej(*self.pj_seatbelt2_boven_pickup, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("pickup")
-        self.gateway.amovel(*self.p_seatbelt2_pickup, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        self.gateway.set_digital_output(1, 1)
-
-        log("2 moveup")
-        self.gateway.amovel(*self.p_seatbelt2_moveup, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("2 moveupv2")
-        self.gateway.amovej(*self.pj_seatbelt2_moveupv2, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("2 passthrough")
-        self.gateway.amovej(*self.pj_seatbelt2_passthrough, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("half")
-        self.gateway.amovel(*self.p_seatbelt2_half, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("above")
-        self.gateway.amovel(*self.p_seatbelt2_aboveholder, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("in")
-        self.gateway.amovel(*self.p_seatbelt2_inholder, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        self.gateway.set_digital_output(1, 0)
-
-        log("uit")
-        self.gateway.amovel(*self.p_seatbelt2_pre_uit, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("uit")
-        self.gateway.amovel(*self.p_seatbelt2_uit, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("3 boven pickup")
-        self.gateway.amovej(*self.pj_seatbelt3_boven_pickup, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("3 pickup")
-        self.gateway.amovel(*self.p_seatbelt3_pickup, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        self.gateway.set_digital_output(1, 1)
-
-        log("3 moveup")
-        self.gateway.amovel(*self.p_seatbelt3_moveup, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("3 moveupv2")
-        self.gateway.amovej(*self.pj_seatbelt3_moveupv2, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("3 passthrough")
-        self.gateway.amovej(*self.pj_seatbelt3_passthrough, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("3 doorframe")
-        self.gateway.amovej(*self.pj_seatbelt3_doorframe, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("3 above")
-        self.gateway.amovel(*self.p_seatbelt3_aboveholder, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("3 in")
-        self.gateway.amovel(*self.p_seatbelt3_inholder, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        self.gateway.set_digital_output(1, 0)
-
-        log("3 uit")
-        self.gateway.amovel(*self.p_seatbelt3_pre_uit, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-        log("3 uit")
-        self.gateway.amovel(*self.p_seatbelt3_uit, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
-
-
-        log("home")
-        self.gateway.amovej(*self.pj_home, self.velx, self.accx)
-        self.gateway.wait_until_stopped()
-        if self._stop_flag:
-            log("Sequence gestopt")
-            return
+        return self.engine.run("seatbelts", statuscallback)
 
     def sequence_pick_and_place(self, statuscallback=None):
         def log(msg: str):
@@ -710,8 +99,7 @@ class RobotProgram:
         elif self.do_armrests:
             self.sequence_armrest(statuscallback)
         elif self.do_everything:
-            self.sequence_seatbelts(statuscallback)
-            self.sequence_buckles(statuscallback)
-            self.sequence_armrest(statuscallback)
+            # het volgende product wordt voorbereid tijdens het huidige
+            self.engine.run_pipelined(["seatbelts", "buckles", "armrest"], statuscallback)
         else:
             log("Geen geldig product gekozen uit QR-code, sequence wordt niet uitgevoerd.")
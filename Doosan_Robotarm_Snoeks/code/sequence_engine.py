@@ -0,0 +1,431 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from profiler import KIND_STEP, KIND_GAP
+from backend import (
+    load_sequences, sensor_amovel, scan_and_validate, commit_trace_id, scan_error_message,
+    move_to_detected_buckle,
+)
+
+# pulsduur van de feeder-DO tijdens een di_wait met pulse_do
+PULSE_ON_S = 0.5
+PULSE_OFF_S = 0.1
+# wachttijd na een mislukte wait_digin voor de volgende poging
+DI_POLL_S = 0.1
+# hoe vaak _commit tijdens het wachten op een scan naar de stopvlag kijkt
+SCAN_POLL_S = 0.2
+
+
+class SequenceError(Exception):
+    pass
+
+
+class SequenceEngine:
+    """Voert de sequences uit data/sequences.json uit voor een RobotProgram.
+
+    Een sequence is een lijst stappen met een "type":
+
+    - move: {"target": "pj_home", "blend": true, "acc_scale": 0.25}
+      L of J volgt uit de naam (p_ / pj_). Opeenvolgende moves met
+      "blend": true gaan samen met de eerstvolgende move als één geblend pad.
+    - do: {"index": 1, "value": 0}
+    - sleep: {"seconds": 0.5}
+    - di_wait: {"inputs": [13, 14, 15], "mode": "all", "pulse_do": 4}
+      Met feeder_background pulst de controller de feeder-DO zelf op de
+      achtergrond (feeder_start) en blijft hij de buffer bijvullen.
+    - force_approach: {"base": "p_armrest_pick", "force_limit": 12, ...}
+    - vision: {"action": "start" | "stop"}
+    - vision_pick: {"timeout": 15.0}
+    - barcode_scan: {"part": "seatbelts"}
+      Scan + controle tegen de workorder. Staat er later een barcode_commit
+      voor hetzelfde part, dan draait de scan op de achtergrond verder.
+    - barcode_commit: {"part": "seatbelts"}
+      Wacht op die scan, vlak voor het plaatsen; bij een fout stopt de sequence.
+      Pas hier wordt de traceID in Workorders.xlsx vastgelegd.
+    - program: {"name": "seatbelts", "steps": [...]}
+      move/do/sleep/di_wait-stappen die als opgeslagen programma op de
+      controller draaien; de host volgt alleen de voortgang.
+
+    Elke stap mag "log" (regel voor de statusbalk) en "enabled": false hebben.
+
+    run_pipelined() draait meerdere sequences achter elkaar en bereidt het
+    volgende product voor terwijl het huidige beweegt: feeder, vision
+    opstarten en barcode scan + controle. Dat gebeurt zodra de huidige
+    sequence zijn eigen feeder-wacht en scan voorbij is, want feeder-DO en
+    scanner zijn gedeeld.
+    """
+
+    def __init__(self, program, sequences: dict | None = None):
+        self.program = program
+        self.gateway = program.gateway
+        self.sequences = load_sequences() if sequences is None else sequences
+        # sequence die voorbereid wordt zodra de huidige feeder en scanner vrijgeeft
+        self._next: str | None = None
+        self._next_callback = None
+        # lopende barcode scans: part -> (Future, cancel-Event)
+        self._prepared: dict = {}
+        # parts met een barcode_commit in de lopende sequence
+        self._commit_parts: set[str] = set()
+        self._executor: ThreadPoolExecutor | None = None
+        self._handlers = {
+            "do": self._run_do,
+            "sleep": self._run_sleep,
+            "di_wait": self._run_di_wait,
+            "force_approach": self._run_force_approach,
+            "vision": self._run_vision,
+            "vision_pick": self._run_vision_pick,
+            "barcode_scan": self._run_barcode_scan,
+            "barcode_commit": self._run_barcode_commit,
+            "program": self._run_program,
+        }
+
+    def run(self, name: str, statuscallback=None, next_name: str | None = None) -> bool:
+        # Geeft False terug als de sequence door een stop is afgebroken.
+        # next_name: sequence die hierna komt en al tijdens deze voorbereid wordt.
+        def log(msg: str):
+            print(msg)
+            if statuscallback:
+                statuscallback(msg)
+
+        steps = [step for step in self.sequences.get(name, []) if step.get("enabled", True)]
+        if not steps:
+            raise SequenceError(f"Onbekende of lege sequence: {name!r}")
+
+        self._next = next_name
+        self._next_callback = statuscallback
+        self._commit_parts = {step["part"] for step in steps if step.get("type") == "barcode_commit"}
+        profiler = self.program.profiler
+        own_run = profiler is not None and profiler.begin_run(name)
+        try:
+            return self._run_steps(name, steps, log, statuscallback)
+        finally:
+            # niet gecommitte scans (na een stop) horen niet bij de volgende
+            # cyclus en mogen de scanner niet bezet houden
+            for step in steps:
+                if step.get("type") == "barcode_scan":
+                    self._cancel_scan(step["part"])
+            if own_run:
+                profiler.end_run()
+
+    def run_pipelined(self, names: list[str], statuscallback=None) -> bool:
+        # Sequences na elkaar; de voorbereiding van de volgende overlapt met
+        # de beweging van de huidige. Stopt bij de eerste afgebroken sequence.
+        ok = True
+        try:
+            for i, name in enumerate(names):
+                next_name = names[i + 1] if i + 1 < len(names) else None
+                if not self.run(name, statuscallback, next_name):
+                    ok = False
+                    break
+        finally:
+            self._next = None
+            for part in list(self._prepared):
+                self._cancel_scan(part)
+        return ok
+
+    def _run_steps(self, name: str, steps: list[dict], log, statuscallback) -> bool:
+        profiler = self.program.profiler
+        # na deze stap heeft de sequence feeder en scanner niet meer nodig
+        release_at = max((j for j, step in enumerate(steps) if self._uses_shared(step)), default=-1)
+        if release_at < 0:
+            self._prepare_next()
+        last_end = None
+        i = 0
+        while i < len(steps):
+            if self.program._stop_flag:
+                log("Sequence gestopt")
+                return False
+
+            step = steps[i]
+            kind = step.get("type")
+            start = time.perf_counter()
+            if profiler and last_end is not None:
+                profiler.record(KIND_GAP, self._step_name(i, step), start - last_end, last_end)
+
+            first = i
+            if kind == "move":
+                group = [step]
+                while group[-1].get("blend") and i + 1 < len(steps) and steps[i + 1].get("type") == "move":
+                    i += 1
+                    group.append(steps[i])
+                self._run_moves(group, log)
+            elif kind in self._handlers:
+                self._handlers[kind](step, log, statuscallback)
+            else:
+                raise SequenceError(f"Onbekend staptype {kind!r} in sequence {name!r}")
+
+            last_end = time.perf_counter()
+            if profiler:
+                profiler.record(KIND_STEP, self._step_name(first, step, i - first + 1), last_end - start, start)
+            if first <= release_at <= i and not self.program._stop_flag:
+                self._prepare_next()
+            i += 1
+
+        if self.program._stop_flag:
+            log("Sequence gestopt")
+            return False
+        return True
+
+    def _feeder_step(self, name: str) -> dict | None:
+        for step in self.sequences.get(name, []):
+            if step.get("enabled", True) and step.get("type") == "di_wait" and step.get("pulse_do"):
+                return step
+        return None
+
+    @staticmethod
+    def _uses_shared(step: dict) -> bool:
+        return step.get("type") == "barcode_scan" or (step.get("type") == "di_wait" and bool(step.get("pulse_do")))
+
+    def prime(self, name: str | None) -> None:
+        # Start de feeder voor de di_wait van sequence name, zodat de buffer
+        # al vol is als die sequence bij zijn pick-stap komt.
+        if not name or not self.program.feeder_background:
+            return
+        step = self._feeder_step(name)
+        if step is None:
+            return
+        try:
+            self.gateway.feeder_start(step["pulse_do"], step["inputs"], PULSE_ON_S, PULSE_OFF_S)
+        except Exception as e:
+            print(f"Feeder voor {name} niet gestart: {e}")
+
+    def _prepare_next(self) -> None:
+        name, self._next = self._next, None
+        if name:
+            self.prepare(name, self._next_callback)
+
+    def prepare(self, name: str, statuscallback=None) -> None:
+        # Alles van sequence name wat niet op de robot wacht alvast starten.
+        # De scan draait op de achtergrond; _run_barcode_scan haalt het
+        # resultaat op als de sequence bij die stap is.
+        self.prime(name)
+        for step in self.sequences.get(name, []):
+            if not step.get("enabled", True):
+                continue
+            if step.get("type") == "vision" and step.get("action") == "start":
+                self.gateway.start_buckle_vision(statuscallback)
+            elif step.get("type") == "barcode_scan":
+                self._start_scan(step["part"], statuscallback)
+
+    def _start_scan(self, part: str, statuscallback=None) -> None:
+        # één worker: scans (en Excel) lopen nooit door elkaar
+        if part in self._prepared:
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scan")
+        cancel = threading.Event()
+        future = self._executor.submit(
+            scan_and_validate, self.program, part, self._logger(statuscallback), cancel
+        )
+        self._prepared[part] = (future, cancel)
+
+    def _cancel_scan(self, part: str) -> None:
+        # scan die niet meer gecommit wordt: uit de wachtrij of de camera-lus halen
+        job = self._prepared.pop(part, None)
+        if job is not None:
+            future, cancel = job
+            cancel.set()
+            future.cancel()
+
+    @staticmethod
+    def _logger(statuscallback):
+        def log(msg: str):
+            print(msg)
+            if statuscallback:
+                statuscallback(msg)
+        return log
+
+    @staticmethod
+    def _step_name(index: int, step: dict, count: int = 1) -> str:
+        # stabiele naam per stap, zodat runs met elkaar te vergelijken zijn
+        what = step.get("target") or step.get("name") or step.get("part") or step.get("action") or ""
+        name = f"{index:02d} {step.get('type')} {what}".rstrip()
+        if count > 1:
+            name += f" (+{count - 1})"
+        return name
+
+    # ----------------- Stappen -----------------
+
+    def _pose(self, name: str):
+        pose = getattr(self.program, name, None)
+        if pose is None:
+            raise SequenceError(f"Onbekende coördinaat {name!r}")
+        return pose
+
+    def _waypoint(self, step: dict, radius: float = 0.0):
+        target = step["target"]
+        kind = step.get("kind") or ("J" if target.startswith("pj_") else "L")
+        vel = self.program.velx * step.get("vel_scale", 1.0)
+        acc = self.program.accx * step.get("acc_scale", 1.0)
+        return kind, self._pose(target), vel, acc, radius
+
+    def _run_moves(self, group: list[dict], log) -> None:
+        if group[0].get("log"):
+            log(group[0]["log"])
+
+        if len(group) == 1:
+            kind, pose, vel, acc, _ = self._waypoint(group[0])
+            if kind == "J":
+                self.gateway.amovej(*pose, vel, acc)
+            else:
+                self.gateway.amovel(*pose, vel, acc)
+        else:
+            # doorloop-punten blenden, het laatste punt is exact
+            self.gateway.move_path([self._waypoint(step)[:4] for step in group], radius=self.program.blend_radius)
+        self.gateway.wait_until_stopped()
+
+    def _run_do(self, step: dict, log, statuscallback) -> None:
+        if step.get("log"):
+            log(step["log"])
+        self.gateway.set_digital_output(step["index"], step["value"])
+
+    def _run_sleep(self, step: dict, log, statuscallback) -> None:
+        time.sleep(step["seconds"])
+
+    def _run_di_wait(self, step: dict, log, statuscallback) -> None:
+        # Wacht tot de DI's hoog zijn ("all") of één ervan ("any"). Met
+        # pulse_do wordt die DO gepulst zolang er gewacht wordt (feeder).
+        # Het wachten zelf gebeurt op de controller (wait_digin), ook tijdens
+        # de puls, zodat een volle buffer meteen gezien wordt.
+        values = {i: 1 for i in step["inputs"]}
+        mode = step.get("mode", "all")
+        pulse_do = step.get("pulse_do")
+
+        if pulse_do and self.program.feeder_background:
+            # de controller pulst; hier alleen wachten als de buffer nog niet vol is
+            try:
+                self.gateway.feeder_start(pulse_do, step["inputs"], PULSE_ON_S, PULSE_OFF_S)
+                pulse_do = None
+            except Exception as e:
+                log(f"Feeder op de controller niet beschikbaar ({e}), zelf pulsen")
+
+        matched = self._wait_inputs(values, mode, 0.0)
+        while not matched and not self.program._stop_flag:
+            if pulse_do:
+                self.gateway.set_digital_output(pulse_do, 1)
+                matched = self._wait_inputs(values, mode, PULSE_ON_S)
+                self.gateway.set_digital_output(pulse_do, 0)
+                if not matched:
+                    matched = self._wait_inputs(values, mode, PULSE_OFF_S)
+            else:
+                matched = self._wait_inputs(values, mode, None)
+
+        if step.get("log"):
+            log(step["log"])
+        if pulse_do:
+            self.gateway.set_digital_output(pulse_do, 0)
+
+    def _wait_inputs(self, values: dict[int, int], mode: str, timeout: float | None) -> bool:
+        try:
+            return self.gateway.wait_digital_inputs(
+                values, mode=mode, timeout=timeout, stopflag_getter=lambda: self.program._stop_flag
+            )
+        except Exception:
+            time.sleep(DI_POLL_S)
+            return False
+
+    def _run_force_approach(self, step: dict, log, statuscallback) -> None:
+        if step.get("log"):
+            log(step["log"])
+        kwargs = {
+            key: step[key]
+            for key in ("direction", "pre_distance", "return_direction", "return_distance",
+                        "force_limit", "approach_vel", "approach_acc")
+            if key in step
+        }
+        sensor_amovel(self.program, base_pos=self._pose(step["base"]), statuscallback=statuscallback, **kwargs)
+
+    def _run_vision(self, step: dict, log, statuscallback) -> None:
+        if step["action"] == "start":
+            self.gateway.start_buckle_vision(statuscallback)
+        elif step["action"] == "stop":
+            self.gateway.stop_buckle_vision(statuscallback)
+        else:
+            raise SequenceError(f"Onbekende vision-actie {step['action']!r}")
+
+    def _run_vision_pick(self, step: dict, log, statuscallback) -> None:
+        move_to_detected_buckle(
+            self.gateway,
+            self.program.velx,
+            self.program.accx,
+            statuscallback=statuscallback,
+            timeout=step.get("timeout", 15.0),
+            stopflag_getter=lambda: self.program._stop_flag,
+        )
+
+    def _run_barcode_scan(self, step: dict, log, statuscallback) -> None:
+        # Start de scan (als prepare() dat nog niet deed); zonder
+        # barcode_commit verderop wordt er meteen op gewacht.
+        part = step["part"]
+        self._start_scan(part, statuscallback)
+        if part not in self._commit_parts:
+            self._commit(part, log)
+
+    def _run_barcode_commit(self, step: dict, log, statuscallback) -> None:
+        self._commit(step["part"], log)
+
+    def _commit(self, part: str, log) -> None:
+        if part not in self._prepared:
+            return  # scanstap uitgeschakeld
+        future, _ = self._prepared[part]
+        if not future.done():
+            log(f"Wachten op {part}-scan...")
+        # scan_camera wacht tot beide codes gelezen zijn; een stop moet er
+        # tussendoor kunnen
+        while not wait([future], timeout=SCAN_POLL_S).done:
+            if self.program._stop_flag:
+                self._cancel_scan(part)
+                return
+        self._prepared.pop(part, None)
+        try:
+            _, trace = future.result()
+            # pas nu het part geplaatst wordt hoort de traceID bij de workorder
+            commit_trace_id(self.program, part, trace, log)
+        except Exception as e:
+            log(scan_error_message(part, e))
+            self.program._stop_flag = True
+
+    # ----------------- Opgeslagen programma op de controller -----------------
+
+    def _program_step(self, step: dict):
+        kind = step.get("type")
+        if kind == "move":
+            radius = self.program.blend_radius if step.get("blend") else 0.0
+            return self._waypoint(step, radius)
+        if kind == "do":
+            return "DO", step["index"], step["value"]
+        if kind == "sleep":
+            return "WAIT", step["seconds"]
+        if kind == "di_wait" and len(step["inputs"]) == 1 and not step.get("pulse_do"):
+            return "WAITDI", step["inputs"][0], 1, step.get("timeout", -1)
+        raise SequenceError(f"Stap {kind!r} kan niet op de controller draaien")
+
+    def _run_program(self, step: dict, log, statuscallback) -> None:
+        # Upload (één keer per sessie) en start; stop breekt ook dit af.
+        name = step["name"]
+        steps = [s for s in step["steps"] if s.get("enabled", True)]
+        labels = [s.get("log", "") for s in steps]
+        if self.gateway.upload_program(name, [self._program_step(s) for s in steps]):
+            log(f"Programma {name} naar controller gestuurd")
+
+        profiler = self.program.profiler
+        current = [None, time.perf_counter()]  # lopende stap en zijn starttijd (zoals de host hem ziet)
+
+        def close_step():
+            if profiler and current[0] is not None:
+                start = current[1]
+                profiler.record(KIND_STEP, f"{name}/{self._step_name(current[0], steps[current[0]])}",
+                                time.perf_counter() - start, start)
+
+        def on_step(i: int):
+            close_step()
+            current[0], current[1] = i, time.perf_counter()
+            if labels[i]:
+                log(labels[i])
+
+        self.gateway.run_program(name)
+        state = self.gateway.wait_program(name, on_step=on_step)
+        close_step()
+        if state != "done" and not self.program._stop_flag:
+            log(f"Programma {name} {state}")
+            self.program._stop_flag = True
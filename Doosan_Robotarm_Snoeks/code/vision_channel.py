@@ -0,0 +1,285 @@
+import os
+import sys
+import json
+import time
+import queue
+import socket
+import itertools
+import threading
+import subprocess
+
+# lokaal kanaal tussen Buckle_detectie.py en de backend
+VISION_HOST = "127.0.0.1"
+VISION_PORT = 56670
+VISION_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Buckle_detectie.py")
+
+
+class VisionPublisher:
+    """TCP-server op localhost die elke detectie als JSON-regel pusht.
+
+    Draait in het vision-proces. Elke detectie krijgt een oplopend "seq";
+    "frame_time" (time.time() van het frame) zet de vision-loop zelf, zodat
+    de ontvanger kan zien of een detectie van na zijn vraag is.
+
+    Clients sturen regels die als (commando, argument) in requests komen:
+    "detect <id>" (nu een frame verwerken; het antwoord krijgt "request_id"),
+    "start" / "pause" (periodiek publiceren aan/uit) en "quit".
+    """
+
+    def __init__(self, host: str = VISION_HOST, port: int = VISION_PORT):
+        self.host = host
+        self.port = port
+        self._srv: socket.socket | None = None
+        self._clients: list[socket.socket] = []
+        self._lock = threading.Lock()
+        self._seq = 0
+        self.requests: queue.Queue = queue.Queue()
+
+    def start(self) -> "VisionPublisher":
+        srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        srv.bind((self.host, self.port))
+        srv.listen()
+        self.port = srv.getsockname()[1]
+        self._srv = srv
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return self
+
+    def _accept_loop(self) -> None:
+        while self._srv is not None:
+            try:
+                conn, _ = self._srv.accept()
+            except OSError:
+                return
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with self._lock:
+                self._clients.append(conn)
+            threading.Thread(target=self._read_loop, args=(conn,), daemon=True).start()
+
+    def _read_loop(self, conn: socket.socket) -> None:
+        try:
+            for line in conn.makefile("r", encoding="utf-8"):
+                parts = line.split()
+                if len(parts) == 2 and parts[0] == "detect":
+                    self.requests.put(("detect", parts[1]))
+                elif len(parts) == 1 and parts[0] in ("start", "pause", "quit"):
+                    self.requests.put((parts[0], None))
+        except (OSError, ValueError):
+            pass
+
+    def publish(self, detection: dict) -> None:
+        with self._lock:
+            self._seq += 1
+            line = (json.dumps(dict(detection, seq=self._seq)) + "\n").encode("utf-8")
+            for conn in list(self._clients):
+                try:
+                    conn.sendall(line)
+                except OSError:
+                    self._clients.remove(conn)
+                    conn.close()
+
+    def close(self) -> None:
+        srv, self._srv = self._srv, None
+        if srv is not None:
+            srv.close()
+        with self._lock:
+            for conn in self._clients:
+                conn.close()
+            self._clients = []
+
+
+class VisionClient:
+    """Ontvangt detecties van VisionPublisher in een achtergrondthread.
+
+    Verbindt opnieuw zolang hij niet gesloten is, zodat hij al gestart kan
+    worden voordat het vision-proces luistert. detect() vraagt een verse
+    detectie aan en wacht op precies dat antwoord.
+    """
+
+    def __init__(self, host: str = VISION_HOST, port: int = VISION_PORT, reconnect_interval: float = 0.2):
+        self.host = host
+        self.port = port
+        self.reconnect_interval = reconnect_interval
+        self._cond = threading.Condition()
+        self._latest: dict | None = None
+        self._sock: socket.socket | None = None
+        self._running = False
+        self._thread: threading.Thread | None = None
+        self._request_ids = itertools.count(1)
+        # antwoorden op detect(), los van _latest zodat een periodieke
+        # detectie ertussendoor er geen overschrijft
+        self._answers: dict[str, dict] = {}
+        # "start" of "pause"; wordt na elke (her)verbinding opnieuw gestuurd
+        self._mode: str | None = None
+
+    @property
+    def connected(self) -> bool:
+        return self._sock is not None
+
+    def start(self) -> "VisionClient":
+        self._running = True
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self._running = False
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+        with self._cond:
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        while self._running:
+            try:
+                sock = socket.create_connection((self.host, self.port), timeout=1.0)
+            except OSError:
+                time.sleep(self.reconnect_interval)
+                continue
+            sock.settimeout(None)
+            self._sock = sock
+            if self._mode:
+                self._send(self._mode)
+            try:
+                for line in sock.makefile("r", encoding="utf-8"):
+                    try:
+                        detection = json.loads(line)
+                    except ValueError:
+                        continue
+                    with self._cond:
+                        self._latest = detection
+                        request_id = detection.get("request_id")
+                        if request_id is not None:
+                            self._answers[request_id] = detection
+                            while len(self._answers) > 16:
+                                self._answers.pop(next(iter(self._answers)))
+                        self._cond.notify_all()
+            except (OSError, ValueError):
+                pass
+            finally:
+                self._sock = None
+                sock.close()
+
+    def _send(self, line: str) -> bool:
+        sock = self._sock
+        if sock is None:
+            return False
+        try:
+            sock.sendall((line + "\n").encode("ascii"))
+            return True
+        except OSError:
+            return False
+
+    def set_mode(self, mode: str) -> None:
+        # "start" = periodiek detecteren, "pause" = alleen op verzoek
+        if mode not in ("start", "pause"):
+            raise ValueError(f"Onbekende vision-modus: {mode!r}")
+        self._mode = mode
+        self._send(mode)
+
+    def quit_service(self) -> bool:
+        # vraagt het vision-proces om te stoppen; False als er geen verbinding is
+        return self._send("quit")
+
+    def detect(self, timeout: float = 5.0, stopflag_getter=None) -> dict | None:
+        # Vraagt het vision-proces om nu een vers frame te verwerken en wacht
+        # op dat antwoord. None bij timeout, stop of geen verbinding.
+        deadline = time.monotonic() + timeout
+        while self._sock is None:
+            if time.monotonic() >= deadline or not self._running:
+                return None
+            if stopflag_getter and stopflag_getter():
+                return None
+            time.sleep(0.05)
+        request_id = f"{id(self):x}-{next(self._request_ids)}"
+        if not self._send(f"detect {request_id}"):
+            return None
+        return self._wait_for(lambda: self._answers.pop(request_id, None), deadline, stopflag_getter)
+
+    def latest(self) -> dict | None:
+        with self._cond:
+            return self._latest
+
+    def _wait_for(self, lookup, deadline: float | None, stopflag_getter=None) -> dict | None:
+        # lookup() draait onder de lock, na elke nieuwe detectie
+        with self._cond:
+            while self._running:
+                d = lookup()
+                if d is not None:
+                    return d
+                if stopflag_getter and stopflag_getter():
+                    return None
+                wait_s = 0.1
+                if deadline is not None:
+                    wait_s = min(wait_s, deadline - time.monotonic())
+                    if wait_s <= 0:
+                        return None
+                self._cond.wait(wait_s)
+        return None
+
+
+class VisionService:
+    """Het langlopende vision-proces (Buckle_detectie.py) plus een client erop.
+
+    De GUI start hem één keer; camera en interpreter blijven warm. resume()
+    en pause() zetten het periodiek detecteren aan en uit, detect() vraagt
+    direct een verse detectie. stop() laat het proces netjes afsluiten.
+    """
+
+    def __init__(self, script: str = VISION_SCRIPT, host: str = VISION_HOST, port: int = VISION_PORT):
+        self.script = script
+        self.client = VisionClient(host, port)
+        self.proc: subprocess.Popen | None = None
+
+    @property
+    def running(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    def start(self, statuscallback=None) -> "VisionService":
+        if self.running:
+            return self
+        self.client.start()
+        try:
+            self.proc = subprocess.Popen(
+                [sys.executable, self.script],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            if statuscallback:
+                statuscallback("Buckle-vision gestart.")
+        except Exception:
+            if statuscallback:
+                statuscallback("Buckle-vision start fout.")
+        return self
+
+    def resume(self) -> None:
+        self.client.set_mode("start")
+
+    def pause(self) -> None:
+        self.client.set_mode("pause")
+
+    def detect(self, timeout: float = 5.0, stopflag_getter=None) -> dict | None:
+        return self.client.detect(timeout, stopflag_getter)
+
+    def stop(self, statuscallback=None, timeout: float = 3.0) -> None:
+        proc, self.proc = self.proc, None
+        if proc is not None and proc.poll() is None:
+            self.client.quit_service()
+            try:
+                proc.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                proc.terminate()
+                try:
+                    proc.wait(timeout=2.0)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+        self.client.close()
+        if statuscallback:
+            statuscallback("Buckle-vision gestopt.")
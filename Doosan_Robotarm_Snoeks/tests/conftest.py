@@ -0,0 +1,64 @@
+import os
+import sys
+import socket
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
+
+from robot_simulator import RobotSimulator, SimRobot
+
+
+class LineClient:
+    """Kale protocol-client: regels sturen en antwoorden op newline lezen."""
+
+    def __init__(self, port: int, timeout: float = 10.0):
+        self.sock = socket.create_connection(("127.0.0.1", port), timeout=timeout)
+        self._buf = b""
+
+    def send(self, *lines: str) -> None:
+        self.sock.sendall("".join(line + "\n" for line in lines).encode("ascii"))
+
+    def reply(self) -> str:
+        while b"\n" not in self._buf:
+            data = self.sock.recv(4096)
+            if not data:
+                raise ConnectionError("simulator closed the connection")
+            self._buf += data
+        line, self._buf = self._buf.split(b"\n", 1)
+        return line.decode("ascii")
+
+    def ask(self, line: str) -> str:
+        self.send(line)
+        return self.reply()
+
+    def close(self) -> None:
+        self.sock.close()
+
+
+@pytest.fixture
+def make_sim():
+    # make_sim(robot=..., latency=...) -> gestarte RobotSimulator op vrije poorten
+    sims = []
+
+    def factory(robot: SimRobot | None = None, **kwargs) -> RobotSimulator:
+        sim = RobotSimulator(port=0, telemetry_port=0, robot=robot or SimRobot(), **kwargs).start()
+        sims.append(sim)
+        return sim
+
+    yield factory
+    for sim in sims:
+        sim.stop()
+
+
+@pytest.fixture
+def connect():
+    clients = []
+
+    def factory(port: int) -> LineClient:
+        client = LineClient(port)
+        clients.append(client)
+        return client
+
+    yield factory
+    for client in clients:
+        client.close()
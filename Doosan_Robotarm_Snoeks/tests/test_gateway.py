@@ -0,0 +1,98 @@
+import time
+import threading
+import pytest
+
+# backend importeert de barcode-scanner (OpenCV, pyzbar) en de Excel-database
+for module in ("cv2", "pyzbar", "openpyxl"):
+    pytest.importorskip(module)
+
+from backend import DoosanGatewayClient
+from robot_simulator import SimRobot
+
+START = (400.0, 0.0, 400.0, 0.0, 180.0, 0.0)
+
+
+@pytest.fixture
+def gateway():
+    gateways = []
+
+    def factory(sim) -> DoosanGatewayClient:
+        gw = DoosanGatewayClient("127.0.0.1", sim.port, sim.telemetry_port)
+        gw.connect()
+        gateways.append(gw)
+        return gw
+
+    yield factory
+    for gw in gateways:
+        gw.close()
+
+
+def test_stop_interrupts_force_move(make_sim, gateway):
+    # stop() uit een andere thread (zoals de GUI) mag niet wachten tot de
+    # force_move zijn doel haalt
+    robot = SimRobot(tcp_pose=START)
+    gw = gateway(make_sim(robot))
+
+    errors = []
+
+    def move():
+        try:
+            gw.force_move(400, 0, 300, 0, 180, 0, 20, 1000, 10, retract_mm=8, contact_do=2)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    mover = threading.Thread(target=move)
+    mover.start()
+    time.sleep(0.2)
+    t0 = time.monotonic()
+    assert gw.stop().startswith("OK stop")
+    assert time.monotonic() - t0 < 1.0
+    mover.join(timeout=1.0)
+
+    assert errors == ["force_move aborted"]
+    assert robot.check_motion() == 0
+    assert robot.tcp_pose()[2] > 390.0
+
+
+def test_stop_interrupts_blended_path(make_sim, gateway):
+    robot = SimRobot(tcp_pose=START)
+    gw = gateway(make_sim(robot))
+
+    waypoints = [("L", (400, y, 400, 0, 180, 0), 100, 1000) for y in (40, 140, 240)]
+    gw.move_path(waypoints, radius=10)
+    waiter = threading.Thread(target=gw.wait_until_stopped)
+    waiter.start()
+    time.sleep(0.3)
+
+    t0 = time.monotonic()
+    gw.stop()
+    waiter.join(timeout=1.0)
+    assert not waiter.is_alive()
+    assert time.monotonic() - t0 < 1.0
+    assert robot.check_motion() == 0
+    assert robot.tcp_pose()[1] < 240.0
+
+
+def test_slow_query_keeps_telemetry_stream(make_sim, gateway, monkeypatch):
+    # één traag antwoord: die vraag via de commando-socket, maar het
+    # telemetriekanaal en de stream blijven; het late antwoord vervalt
+    monkeypatch.setattr(DoosanGatewayClient._stream_reply, "__defaults__", (0.3,))
+    sim = make_sim(SimRobot(tcp_pose=START))
+    handle = sim.handle_command
+    slow = [True]
+
+    def slow_status(tokens):
+        if tokens[0] == "status" and slow[0]:
+            slow[0] = False
+            time.sleep(0.6)
+        return handle(tokens)
+
+    sim.handle_command = slow_status
+    gw = gateway(sim)
+    gw.subscribe(50)
+
+    assert gw.query("status").startswith("OK status")
+    time.sleep(0.5)
+    assert gw.query("digin 1") == "OK digin 1"
+    assert gw.query("tcp_pose").startswith("OK tcppose 400.000")
+    assert gw.streaming
@@ -0,0 +1,196 @@
+import time
+import threading
+from robot_simulator import SimRobot, contact_force
+
+START = (400.0, 0.0, 400.0, 0.0, 180.0, 0.0)
+
+
+def pose_of(reply: str) -> list[float]:
+    # "OK force_move <contact> x y z rx ry rz"
+    return [float(v) for v in reply.split()[3:9]]
+
+
+# ---------------- force_move ----------------
+
+def test_force_move_contact_sets_do_and_retracts(make_sim, connect):
+    # vlak op z=350, kracht bij z lager dan dat
+    robot = SimRobot(tcp_pose=START, force_profile=contact_force(axis=2, surface=350.0, stiffness=2.0, direction=-1.0))
+    sim = make_sim(robot)
+    cmd = connect(sim.port)
+
+    reply = cmd.ask("force_move 400 0 300 0 180 0 50 500 10 8 2")
+
+    assert reply.startswith("OK force_move 1 ")
+    contact_z = pose_of(reply)[2]
+    assert 343.0 < contact_z < 346.0
+    assert robot.do[2] == 1
+    # 8 mm terug langs de bewegingsas (omhoog)
+    assert abs(robot.tcp_pose()[2] - (contact_z + 8.0)) < 0.01
+
+
+def test_force_move_without_contact_reaches_target(make_sim, connect):
+    robot = SimRobot(tcp_pose=START, force_profile=contact_force(axis=2, surface=100.0, stiffness=2.0, direction=-1.0))
+    sim = make_sim(robot)
+    cmd = connect(sim.port)
+
+    reply = cmd.ask("force_move 400 0 300 0 180 0 200 1000 10 8 2")
+
+    assert reply.startswith("OK force_move 0 ")
+    assert abs(pose_of(reply)[2] - 300.0) < 0.01
+    assert robot.do[2] == 0
+
+
+def test_abort_on_telemetry_ends_force_move(make_sim, connect):
+    # geen contact: zonder abort zou dit ~5 s duren
+    robot = SimRobot(tcp_pose=START)
+    sim = make_sim(robot)
+    cmd = connect(sim.port)
+    tel = connect(sim.telemetry_port)
+
+    threading.Timer(0.2, lambda: tel.ask("abort")).start()
+    t0 = time.monotonic()
+    reply = cmd.ask("force_move 400 0 300 0 180 0 20 1000 10 8 2")
+
+    assert time.monotonic() - t0 < 1.0
+    assert reply.startswith("OK force_move 2 ")
+    assert robot.check_motion() == 0
+    assert robot.do[2] == 0
+    z = robot.tcp_pose()[2]
+    time.sleep(0.1)
+    assert robot.tcp_pose()[2] == z
+
+
+# ---------------- wegvallen van de commando-client ----------------
+
+def wait_until(predicate, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def assert_standing_still(robot: SimRobot, y_max: float) -> None:
+    y = robot.tcp_pose()[1]
+    time.sleep(0.3)
+    assert robot.check_motion() == 0
+    assert robot.tcp_pose()[1] == y
+    assert y < y_max
+
+
+def test_disconnect_aborts_path(make_sim, connect):
+    robot = SimRobot(tcp_pose=START)
+    sim = make_sim(robot)
+    cmd = connect(sim.port)
+
+    segments = [f"path_add L 400 {y} 400 0 180 0 100 1000 10" for y in (40, 140, 240)]
+    cmd.send("path_clear", *segments, "path_run 3")
+    replies = [cmd.reply() for _ in range(5)]
+    assert replies[-1] == "OK path_run 3"
+
+    time.sleep(0.3)
+    cmd.close()
+
+    # afbreken gebeurt tussen twee segmenten
+    assert wait_until(lambda: not robot.path_active)
+    assert_standing_still(robot, 240.0)
+
+
+def test_disconnect_aborts_program(make_sim, connect):
+    robot = SimRobot(tcp_pose=START)
+    sim = make_sim(robot)
+    cmd = connect(sim.port)
+
+    steps = [f"prog_add L 400 {y} 400 0 180 0 100 1000 10" for y in (40, 140, 240)] + ["prog_add DO 5 1"]
+    cmd.send("prog_begin p", *steps, "prog_end p 4")
+    assert [cmd.reply() for _ in range(6)][-1] == "OK prog_end p 4"
+    assert cmd.ask("prog_run p") == "OK prog_run p 4"
+
+    time.sleep(0.3)
+    cmd.close()
+
+    assert wait_until(lambda: not robot.prog_active)
+    assert robot.prog_state == "aborted"
+    assert robot.do[5] == 0
+    assert_standing_still(robot, 240.0)
+
+
+# ---------------- pad en programma in de thread van de commando-client ----------------
+
+def test_commands_during_path_are_answered_after_it(make_sim, connect):
+    robot = SimRobot(tcp_pose=START)
+    sim = make_sim(robot)
+    cmd = connect(sim.port)
+
+    cmd.send("path_clear", "path_add L 400 50 400 0 180 0 200 1000 10", "path_add L 400 100 400 0 180 0 200 1000 10",
+             "path_run 2", "wait_motion 0", "tcp_pose")
+    replies = [cmd.reply() for _ in range(6)]
+
+    assert replies[3] == "OK path_run 2"
+    # wait_motion wacht in de rij tot het pad klaar is
+    assert replies[4] == "OK wait_motion 0"
+    assert replies[5].startswith("OK tcppose 400.000 100.000 ")
+
+
+def test_stop_on_command_socket_aborts_path(make_sim, connect):
+    robot = SimRobot(tcp_pose=START)
+    sim = make_sim(robot)
+    cmd = connect(sim.port)
+
+    segments = [f"path_add L 400 {y} 400 0 180 0 100 1000 10" for y in (40, 140, 240)]
+    cmd.send("path_clear", *segments, "path_run 3")
+    assert [cmd.reply() for _ in range(5)][-1] == "OK path_run 3"
+
+    time.sleep(0.3)
+    t0 = time.monotonic()
+    assert cmd.ask("stop") == "OK stop"
+    assert time.monotonic() - t0 < 1.0
+    assert not robot.path_active
+    assert_standing_still(robot, 240.0)
+
+
+def test_abort_on_telemetry_ends_program(make_sim, connect):
+    robot = SimRobot(tcp_pose=START)
+    sim = make_sim(robot)
+    cmd = connect(sim.port)
+    tel = connect(sim.telemetry_port)
+
+    cmd.send("prog_begin p", "prog_add L 400 200 400 0 180 0 50 1000 0", "prog_add DO 5 1", "prog_end p 2")
+    assert [cmd.reply() for _ in range(4)][-1] == "OK prog_end p 2"
+    assert cmd.ask("prog_run p") == "OK prog_run p 2"
+
+    time.sleep(0.3)
+    assert tel.ask("abort") == "OK abort"
+
+    assert wait_until(lambda: tel.ask("prog_state") != "OK prog_state p 0 running")
+    assert tel.ask("prog_state") == "OK prog_state p 0 aborted"
+    assert robot.do[5] == 0
+    assert_standing_still(robot, 200.0)
+
+
+# ---------------- latency ----------------
+
+def test_pipelined_replies_keep_order_under_latency(make_sim, connect):
+    sim = make_sim(latency=0.05, jitter=0.02, seed=1)
+    cmd = connect(sim.port)
+
+    # path_add antwoordt met het aantal segmenten: volgorde zichtbaar
+    lines = ["path_clear"] + ["path_add L 400 0 400 0 180 0 50 1000 0"] * 40
+    t0 = time.monotonic()
+    cmd.send(*lines)
+    replies = [cmd.reply() for _ in lines]
+    elapsed = time.monotonic() - t0
+
+    assert replies == ["OK path_clear"] + [f"OK path_add {n}" for n in range(1, 41)]
+    # vertragingen lopen door elkaar: ver onder 40 x 50 ms
+    assert elapsed < 0.5
+
+
+def test_single_reply_still_waits_for_latency(make_sim, connect):
+    sim = make_sim(latency=0.05)
+    cmd = connect(sim.port)
+
+    t0 = time.monotonic()
+    assert cmd.ask("anin 1") == "OK anin 0.0"
+    assert time.monotonic() - t0 >= 0.05